@@ -1,32 +1,294 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox, simpledialog
-import ttkbootstrap as ttk
-from ttkbootstrap.constants import *
-from PIL import Image, ImageTk
-from rembg import remove, new_session
+import time
+PROCESS_START = time.perf_counter()  # Titik nol metrik startup, sebelum import berat
+
+from PIL import Image, ImageOps, ImageColor, ImageSequence, UnidentifiedImageError
 import threading
 import os
 import io
 import sys
 import uuid
 import json
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import glob
+import hashlib
+import struct
+import zlib
+import hmac
+import csv
+import tempfile
+import shutil
+import subprocess
+import socket
+import argparse
+import copy
+import queue
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from datetime import datetime
-import time
+from fractions import Fraction
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 from functools import lru_cache
-import weakref
+import itertools
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+import numpy as np
+
+
+def import_gui_modules():
+    """Import Tk/ttkbootstrap saat mode GUI dimulai.
+
+    Mode headless (batch, watch, serve, cluster) dan worker process tidak
+    memerlukan Tk, jadi tetap jalan di node tanpa Tk/display.
+    """
+    global tk, ttk, filedialog, messagebox, simpledialog, ImageTk
+    import tkinter as tk
+    from tkinter import filedialog, messagebox, simpledialog
+    import ttkbootstrap as ttk
+    from ttkbootstrap import constants
+    from PIL import ImageTk
+    # Setara "from ttkbootstrap.constants import *" (LEFT, BOTH, END, ...)
+    globals().update({name: value for name, value in vars(constants).items() if not name.startswith("_")})
+
+
+DEFAULT_MODEL_NAME = "isnet-general-use"
+SUPPORTED_FORMATS = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff'}
+MAX_FILE_SIZE_MB = 50
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".removebg-cache", "masks")
+DEFAULT_CACHE_SIZE_MB = 512
+MASK_OPTIONS = {"post_process_mask": False}
+STUB_MODEL_NAME = "stub"
+AVAILABLE_MODELS = ("isnet-general-use", "u2net", "u2netp", "u2net_human_seg", "silueta", "isnet-anime")
+# Varian presisi dipilih dengan sufiks nama model, mis. "isnet-general-use:int8"
+MODEL_PRECISIONS = ("fp32", "fp16", "int8")
+# Batas kualitas default untuk rekomendasi compare (terhadap mask baseline)
+DEFAULT_COMPARE_MAX_MAE = 0.01
+DEFAULT_COMPARE_MIN_IOU = 0.95
+MODEL_CHOICES = AVAILABLE_MODELS + tuple(f"{name}:{precision}" for name in AVAILABLE_MODELS
+                                         for precision in MODEL_PRECISIONS[1:])
+DEFAULT_MAX_MODELS = 3
+DEFAULT_MODEL_MEMORY_MB = 1024
+MODEL_MEMORY_FACTOR = 2.0
+# Jalur proxy + strip menghemat buffer kerja (alpha float, RGBA, PNG) tetapi lebih lambat
+# (refinement, encoder PNG Python); hanya layak untuk gambar yang benar-benar besar
+LARGE_IMAGE_MP = 64
+DEFAULT_PROXY_SIDE = 2048
+DEFAULT_TILE_ROWS = 256
+LICENSE_TOKEN_TTL_SECONDS = 7 * 24 * 60 * 60
+# Revalidasi latar yang gagal (offline/error server) hanya ditoleransi sebatas ini
+LICENSE_MAX_REVALIDATION_FAILURES = 5
+LICENSE_REVALIDATION_GRACE_SECONDS = 3 * 24 * 60 * 60
+# Revalidasi latar hanya setelah token melewati fraksi masa berlakunya ini
+LICENSE_REVALIDATION_AFTER = 0.5
+LICENSE_SECRET_FILE = os.path.join(os.path.expanduser("~"), ".removebg", "license-secret")
+
+def parse_a1(reference):
+    """'B12' -> (2, 12); 'D' -> (4, None)."""
+    letters = reference.rstrip("0123456789")
+    column = 0
+    for letter in letters.upper():
+        column = column * 26 + ord(letter) - ord('A') + 1
+    digits = reference[len(letters):]
+    return column, int(digits) if digits else None
+
+
+class LocalWorksheet:
+    """Pengganti worksheet gspread berbasis file CSV lokal untuk pengujian offline.
+
+    Mendukung subset API yang dipakai LicenseManager: get dan batch_update
+    dengan range A1 (mis. 'A2:D', 'B5:D5'), plus find, row_values, dan cell.
+    api_calls menghitung panggilan seperti kuota API Google Sheets. Hanya dipakai
+    lewat LicenseManager(worksheet=...); aplikasi selalu memakai Google Sheet.
+    """
+
+    class Cell:
+        def __init__(self, row, col, value):
+            self.row = row
+            self.col = col
+            self.value = value
+
+    def __init__(self, path=None, rows=None):
+        self.path = path
+        if rows is None and path and os.path.exists(path):
+            with open(path, 'r', newline='', encoding='utf-8') as f:
+                rows = list(csv.reader(f))
+        self.rows = [list(row) for row in rows or []]
+        self.api_calls = 0
+
+    def get(self, range_name):
+        """Nilai range A1 seperti gspread: baris/sel kosong di ujung dipangkas."""
+        self.api_calls += 1
+        start, _, end = range_name.partition(":")
+        first_col, first_row = parse_a1(start)
+        last_col, last_row = parse_a1(end or start)
+        last_row = last_row or len(self.rows)
+        values = []
+        for row in self.rows[(first_row or 1) - 1:last_row]:
+            cells = list(row[first_col - 1:last_col])
+            while cells and cells[-1] == "":
+                cells.pop()
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def find(self, query):
+        self.api_calls += 1
+        for row_index, row in enumerate(self.rows, start=1):
+            for col_index, value in enumerate(row, start=1):
+                if value == query:
+                    return self.Cell(row_index, col_index, value)
+        return None
+
+    def row_values(self, row):
+        self.api_calls += 1
+        values = list(self.rows[row - 1]) if row <= len(self.rows) else []
+        while values and values[-1] == "":
+            values.pop()
+        return values
+
+    def cell(self, row, col):
+        values = self.row_values(row)
+        return self.Cell(row, col, values[col - 1] if col <= len(values) else "")
+
+    def update_cell(self, row, col, value):
+        while len(self.rows) < row:
+            self.rows.append([])
+        values = self.rows[row - 1]
+        while len(values) < col:
+            values.append("")
+        values[col - 1] = value
+
+    def batch_update(self, updates):
+        self.api_calls += 1
+        for update in updates:
+            column, row = parse_a1(update['range'].split(":")[0])
+            for row_offset, values in enumerate(update['values']):
+                for col_offset, value in enumerate(values):
+                    self.update_cell(row + row_offset, column + col_offset, value)
+        self.save()
+
+    def save(self):
+        if self.path:
+            temp_file = self.path + '.tmp'
+            with open(temp_file, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows(self.rows)
+            os.replace(temp_file, self.path)
+
+
+class LicenseIndex:
+    """Index kunci lisensi -> nomor baris, dibangun dari satu bulk fetch kolom A:D.
+
+    Kunci disimpan sebagai hash SHA-256 agar file index lokal tidak membocorkan
+    kunci lain. Validasi cukup membaca satu baris (biaya konstan terhadap ukuran
+    sheet); baris baru diambil secara incremental dari ujung sheet.
+    """
+
+    COLUMNS = ("A", "D")  # key, uuid, keterangan, timestamp
+
+    def __init__(self, worksheet, path=None):
+        self.worksheet = worksheet
+        self.path = path
+        self.rows = {}
+        self.row_count = 0
+        self._load()
+
+    @staticmethod
+    def _digest(key):
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.rows = {digest: int(row) for digest, row in data["rows"].items()}
+            self.row_count = int(data["row_count"])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            self.rows, self.row_count = {}, 0
+
+    def _save(self):
+        if not self.path:
+            return
+        temp_file = self.path + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({"row_count": self.row_count, "rows": self.rows}, f)
+        os.replace(temp_file, self.path)
+
+    def _range(self, first_row, last_row=""):
+        return f"{self.COLUMNS[0]}{first_row}:{self.COLUMNS[1]}{last_row}"
+
+    def refresh(self, full=False):
+        """Ambil baris setelah row_count saja (seat baru); full=True bangun ulang index."""
+        first_row = 1 if full else self.row_count + 1
+        values = self.worksheet.get(self._range(first_row))
+        if full:
+            self.rows = {}
+        for offset, row in enumerate(values):
+            if row and row[0]:
+                self.rows[self._digest(row[0])] = first_row + offset
+        self.row_count = first_row - 1 + len(values)
+        self._save()
+
+    def _read(self, key):
+        row = self.rows.get(self._digest(key))
+        if row is None:
+            return None, []
+        values = self.worksheet.get(self._range(row, row))
+        return row, values[0] if values else []
+
+    def fetch_row(self, key):
+        """(nomor baris, nilai A:D) untuk key, atau (None, []) jika tidak ada di sheet."""
+        if self._digest(key) not in self.rows:
+            self.refresh()
+        row, values = self._read(key)
+        if row is not None and values and values[0] == key:
+            return row, values
+        # Tidak ketemu atau baris bergeser (mis. ada baris dihapus): index usang, bangun ulang sekali
+        self.refresh(full=True)
+        row, values = self._read(key)
+        if row is None or not values or values[0] != key:
+            return None, []
+        return row, values
+
+    def activate(self, key, values):
+        """Aktivasi dengan satu batch write, hanya jika kunci ada dan kolom UUID masih kosong.
+
+        Google Sheets tidak punya compare-and-set, jadi baris dibaca ulang setelah
+        menulis: jika UUID mesin lain yang tersimpan (penulis terakhir menang),
+        aktivasi ini gagal. Penulis yang kalah setelah pembacaan ulang tertangkap
+        saat verifikasi berikutnya karena data lokalnya tidak cocok lagi.
+        Return "activated", "not_found", atau "used".
+        """
+        row, current = self.fetch_row(key)
+        if row is None:
+            return "not_found"
+        if len(current) > 1 and current[1]:
+            return "used"
+        values = list(values)
+        self.worksheet.batch_update([{'range': f'B{row}:D{row}', 'values': [values]}])
+        _, written = self._read(key)
+        if len(written) < 2 or written[1] != str(values[0]):
+            return "used"
+        return "activated"
+
 
 class LicenseManager:
     """Mengelola validasi, aktivasi, dan verifikasi lisensi dengan optimalisasi."""
     
-    def __init__(self, root, app_identifier):
+    def __init__(self, root, app_identifier, worksheet=None, token_ttl=LICENSE_TOKEN_TTL_SECONDS):
         self.root = root
         self.app_identifier = app_identifier
         self.local_license_file = "license-rgb.json"
+        self.token_secret_file = LICENSE_SECRET_FILE
+        self.license_index_file = "license-index.json"
         self.creds_file = self.get_resource_path("service_account.json")
         self.sheet_name = "Lisensi Aplikasi Remove Bg"
-        self.worksheet = None
+        self.worksheet = worksheet
+        self.license_index = None
+        self.token_ttl = token_ttl
+        self.revalidation_thread = None
+        self.last_error = None
         self._machine_uuid = None  # Cache UUID
 
     @lru_cache(maxsize=1)
@@ -44,7 +306,7 @@ class LicenseManager:
             self._machine_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, str(uuid.getnode())))
         return self._machine_uuid
 
-    def connect_to_sheet(self):
+    def connect_to_sheet(self, interactive=True):
         """Optimized Google Sheet connection dengan timeout dan retry."""
         if self.worksheet:
             return True
@@ -52,6 +314,10 @@ class LicenseManager:
         max_retries = 2
         for attempt in range(max_retries):
             try:
+                # Import ditunda: gspread/oauth2client hanya dibutuhkan saat online
+                import gspread
+                from oauth2client.service_account import ServiceAccountCredentials
+
                 scope = [
                     "https://spreadsheets.google.com/feeds",
                     'https://www.googleapis.com/auth/spreadsheets',
@@ -64,17 +330,27 @@ class LicenseManager:
                 self.worksheet = client.open(self.sheet_name).sheet1
                 return True
             except FileNotFoundError:
-                messagebox.showerror("Kesalahan Kredensial", 
+                self.last_error = ("Kesalahan Kredensial",
                     f"File kredensial '{os.path.basename(self.creds_file)}' tidak ditemukan.")
+                if interactive:
+                    messagebox.showerror(*self.last_error)
                 return False
             except Exception as e:
                 if attempt == max_retries - 1:  # Last attempt
-                    messagebox.showerror("Koneksi Gagal", 
+                    self.last_error = ("Koneksi Gagal",
                         f"Tidak dapat terhubung ke Google Sheets setelah {max_retries} percobaan.\n\nError: {e}")
+                    if interactive:
+                        messagebox.showerror(*self.last_error)
                     return False
                 time.sleep(1)  # Wait before retry
         return False
 
+    def get_license_index(self):
+        """Index key->baris untuk worksheet yang terhubung (dibuat saat pertama dipakai)."""
+        if self.license_index is None or self.license_index.worksheet is not self.worksheet:
+            self.license_index = LicenseIndex(self.worksheet, self.license_index_file)
+        return self.license_index
+
     @lru_cache(maxsize=1)
     def get_local_license(self):
         """Cached local license reading."""
@@ -87,15 +363,8 @@ class LicenseManager:
         except (FileNotFoundError, json.JSONDecodeError):
             return None
 
-    def save_local_license(self, key, machine_uuid, keterangan, timestamp):
-        """Optimized local license saving dengan atomic write."""
-        data = {
-            "key": key,
-            "key-1": machine_uuid,
-            "keterangan": keterangan,
-            "timestamp": timestamp
-        }
-        # Atomic write untuk menghindari corruption
+    def _write_local_license(self, data):
+        """Atomic write untuk menghindari corruption."""
         temp_file = self.local_license_file + '.tmp'
         try:
             with open(temp_file, 'w') as f:
@@ -108,49 +377,239 @@ class LicenseManager:
                 os.remove(temp_file)
             raise e
 
+    def save_local_license(self, key, machine_uuid, keterangan, timestamp):
+        """Optimized local license saving dengan atomic write dan token offline."""
+        data = {
+            "key": key,
+            "key-1": machine_uuid,
+            "keterangan": keterangan,
+            "timestamp": timestamp
+        }
+        data["token"] = self._make_token(data)
+        self._write_local_license(data)
+
+    @staticmethod
+    def _local_fields(local_data):
+        """(key, uuid, keterangan, timestamp) dari file lisensi lokal."""
+        # UUID disimpan sebagai "key-1"; "uuid" untuk file versi lama
+        local_uuid = local_data.get("key-1", local_data.get("uuid"))
+        return (local_data.get("key"), local_uuid,
+                local_data.get("keterangan"), local_data.get("timestamp"))
+
+    def _installation_secret(self, create=False):
+        """Secret acak per instalasi (file 0600); None jika belum ada dan create=False."""
+        try:
+            with open(self.token_secret_file, 'rb') as f:
+                secret = f.read()
+            if len(secret) >= 32:
+                return secret
+        except FileNotFoundError:
+            pass
+        if not create:
+            return None
+        os.makedirs(os.path.dirname(os.path.abspath(self.token_secret_file)), exist_ok=True)
+        secret = os.urandom(32)
+        temp_file = f"{self.token_secret_file}.{os.getpid()}.tmp"
+        fd = os.open(temp_file, os.O_CREAT | os.O_WRONLY | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(secret)
+        os.replace(temp_file, self.token_secret_file)
+        return secret
+
+    def _sign(self, payload, secret):
+        """HMAC-SHA256 payload token, terikat ke mesin, aplikasi ini, dan secret instalasi.
+
+        Nilai dari source code saja tidak cukup untuk membuat token.
+        """
+        secret = hashlib.sha256(
+            f"{self.app_identifier}|{self.get_machine_uuid()}|{self.sheet_name}|".encode("utf-8") + secret).digest()
+        message = json.dumps(payload, sort_keys=True).encode("utf-8")
+        return hmac.new(secret, message, hashlib.sha256).hexdigest()
+
+    def _make_token(self, local_data):
+        """Token lisensi bertanda tangan dengan masa berlaku (TTL)."""
+        key, local_uuid, keterangan, timestamp = self._local_fields(local_data)
+        issued_at = time.time()
+        payload = {
+            "key": key,
+            "uuid": local_uuid,
+            "keterangan": keterangan,
+            "timestamp": timestamp,
+            "issued_at": issued_at,
+            "expires_at": issued_at + self.token_ttl,
+        }
+        return {"payload": payload, "signature": self._sign(payload, self._installation_secret(create=True))}
+
+    def has_valid_token(self, local_data):
+        """True jika token ada, tanda tangan cocok, milik mesin ini, dan belum kedaluwarsa.
+
+        Masa berlaku token tidak boleh melebihi token_ttl, apa pun isi payload.
+        """
+        token = local_data.get("token")
+        if not isinstance(token, dict) or not isinstance(token.get("payload"), dict):
+            return False
+        payload = token["payload"]
+        secret = self._installation_secret()
+        if secret is None or not hmac.compare_digest(str(token.get("signature", "")), self._sign(payload, secret)):
+            return False
+        key, local_uuid, keterangan, timestamp = self._local_fields(local_data)
+        if (payload.get("key"), payload.get("uuid"), payload.get("keterangan"),
+                payload.get("timestamp")) != (key, local_uuid, keterangan, timestamp):
+            return False
+        if local_uuid != self.get_machine_uuid():
+            return False
+        issued_at, expires_at = payload.get("issued_at"), payload.get("expires_at")
+        if not isinstance(issued_at, (int, float)) or not isinstance(expires_at, (int, float)):
+            return False
+        if expires_at - issued_at > self.token_ttl:
+            return False
+        return issued_at <= time.time() < expires_at
+
+    def refresh_token(self, local_data):
+        """Perbarui token setelah verifikasi server berhasil (hitungan revalidasi gagal direset)."""
+        data = {name: value for name, value in local_data.items() if name not in ("token", "revalidation")}
+        data["token"] = self._make_token(data)
+        self._write_local_license(data)
+
+    def revoke_token(self):
+        """Hapus token sehingga peluncuran berikutnya wajib verifikasi online."""
+        local_data = self.get_local_license()
+        if local_data and "token" in local_data:
+            self._write_local_license({name: value for name, value in local_data.items()
+                                       if name not in ("token", "revalidation")})
+
+    def record_revalidation_failure(self):
+        """Catat revalidasi yang gagal karena error/offline; token dicabut setelah batasnya terlewati.
+
+        Return True jika token dicabut.
+        """
+        local_data = self.get_local_license()
+        if not local_data or "token" not in local_data:
+            return False
+        now = time.time()
+        state = local_data.get("revalidation") if isinstance(local_data.get("revalidation"), dict) else {}
+        failures = int(state.get("failures", 0)) + 1
+        since = state.get("since", now)
+        if (failures >= LICENSE_MAX_REVALIDATION_FAILURES
+                or now - since >= LICENSE_REVALIDATION_GRACE_SECONDS):
+            self.revoke_token()
+            return True
+        self._write_local_license(dict(local_data, revalidation={"failures": failures, "since": since}))
+        return False
+
+    def verify_with_sheet(self, local_data):
+        """Cocokkan lisensi lokal dengan server tanpa UI.
+
+        Return (status, title, message) dengan status "valid", "invalid", atau "error".
+        """
+        key, local_uuid, local_keterangan, local_timestamp = self._local_fields(local_data)
+        try:
+            # Satu pembacaan baris lewat index, tanpa scan seluruh sheet
+            row, sheet_data = self.get_license_index().fetch_row(key)
+            if row is None:
+                return ("invalid", "Validasi Gagal", "Kunci lisensi lokal tidak ditemukan di server.")
+
+            sheet_uuid = sheet_data[1] if len(sheet_data) > 1 else ""
+            sheet_keterangan = sheet_data[2] if len(sheet_data) > 2 else ""
+            sheet_timestamp = sheet_data[3] if len(sheet_data) > 3 else ""
+
+            # Validate all parameters
+            if (sheet_uuid == local_uuid and
+                sheet_keterangan == local_keterangan and
+                sheet_timestamp == local_timestamp):
+                return ("valid", None, None)
+            return ("invalid", "Validasi Gagal",
+                    "Data lisensi tidak cocok. Kunci mungkin telah digunakan di perangkat lain atau diubah.")
+        except Exception as e:
+            return ("error", "Error Verifikasi", f"Terjadi kesalahan saat verifikasi: {e}")
+
+    def needs_revalidation(self, local_data):
+        """True jika token yang berlaku sudah melewati LICENSE_REVALIDATION_AFTER dari masa berlakunya."""
+        payload = local_data["token"]["payload"]
+        issued_at, expires_at = payload["issued_at"], payload["expires_at"]
+        return time.time() >= issued_at + (expires_at - issued_at) * LICENSE_REVALIDATION_AFTER
+
+    def revalidate_in_background(self, local_data):
+        """Verifikasi ulang ke server tanpa memblokir startup.
+
+        Berhasil -> token diperpanjang; lisensi dicabut di server -> token dihapus
+        sehingga peluncuran berikutnya memblokir; error jaringan -> token tetap,
+        tetapi hanya sampai batas LICENSE_MAX_REVALIDATION_FAILURES /
+        LICENSE_REVALIDATION_GRACE_SECONDS.
+        """
+        def revalidate():
+            if not self.connect_to_sheet(interactive=False):
+                status, message = "error", self.last_error[1] if self.last_error else "koneksi gagal"
+            else:
+                status, _, message = self.verify_with_sheet(local_data)
+            if status == "valid":
+                self.refresh_token(local_data)
+            elif status == "invalid":
+                print(f"License revalidation failed: {message}")
+                self.revoke_token()
+            elif self.record_revalidation_failure():
+                print(f"License revalidation failed too often, token revoked: {message}")
+
+        self.revalidation_thread = threading.Thread(target=revalidate, daemon=True)
+        self.revalidation_thread.start()
+        return self.revalidation_thread
+
+    def validate_async(self, on_done):
+        """Validasi tanpa memblokir UI: jaringan di thread, dialog di thread Tk.
+
+        on_done(is_valid) selalu dipanggil di thread Tk.
+        """
+        local_data = self.get_local_license()
+        if not local_data:
+            # Aktivasi pertama butuh dialog input kunci, jadi tetap sinkron
+            on_done(self.validate())
+            return
+        if self.has_valid_token(local_data):
+            if self.needs_revalidation(local_data):
+                self.revalidate_in_background(local_data)
+            on_done(True)
+            return
+
+        def finish(status, title, message):
+            if status == "valid":
+                self.refresh_token(local_data)
+                on_done(True)
+            else:
+                messagebox.showerror(title, message, parent=self.root)
+                on_done(False)
+
+        def verify():
+            if self.connect_to_sheet(interactive=False):
+                result = self.verify_with_sheet(local_data)
+            else:
+                result = ("error",) + self.last_error
+            self.root.after(0, lambda: finish(*result))
+
+        threading.Thread(target=verify, daemon=True).start()
+
     def validate(self):
         """Optimized license validation."""
         # Check local license first (fastest)
         local_data = self.get_local_license()
+
+        # Token offline masih berlaku: buka langsung; jaringan hanya jika token mendekati kedaluwarsa
+        if local_data and self.has_valid_token(local_data):
+            if self.needs_revalidation(local_data):
+                self.revalidate_in_background(local_data)
+            return True
         
         # Defer Google Sheets connection until absolutely necessary
         if local_data:
             # Only connect if we have local data to verify
             if not self.connect_to_sheet():
                 return False
-            
-            key = local_data.get("key")
-            local_uuid = local_data.get("uuid")
-            local_keterangan = local_data.get("keterangan")
-            local_timestamp = local_data.get("timestamp")
-            
-            try:
-                # Single API call to find and get row data
-                cell = self.worksheet.find(key)
-                if cell is None:
-                    messagebox.showerror("Validasi Gagal", 
-                        "Kunci lisensi lokal tidak ditemukan di server.", parent=self.root)
-                    return False
 
-                # Get all row data in one call
-                sheet_data = self.worksheet.row_values(cell.row)
-                sheet_uuid = sheet_data[1] if len(sheet_data) > 1 else ""
-                sheet_keterangan = sheet_data[2] if len(sheet_data) > 2 else ""
-                sheet_timestamp = sheet_data[3] if len(sheet_data) > 3 else ""
-
-                # Validate all parameters
-                if (sheet_uuid == local_uuid and
-                    sheet_keterangan == local_keterangan and
-                    sheet_timestamp == local_timestamp):
-                    return True
-                else:
-                    messagebox.showerror("Validasi Gagal", 
-                        "Data lisensi tidak cocok. Kunci mungkin telah digunakan di perangkat lain atau diubah.", 
-                        parent=self.root)
-                    return False
-            except Exception as e:
-                messagebox.showerror("Error Verifikasi", f"Terjadi kesalahan saat verifikasi: {e}", parent=self.root)
-                return False
+            status, title, message = self.verify_with_sheet(local_data)
+            if status == "valid":
+                self.refresh_token(local_data)
+                return True
+            messagebox.showerror(title, message, parent=self.root)
+            return False
         else:
             # New activation - connect to sheets
             if not self.connect_to_sheet():
@@ -161,446 +620,4268 @@ class LicenseManager:
                 return False
 
             try:
-                cell = self.worksheet.find(key)
-                if cell is None:
+                machine_uuid = self.get_machine_uuid()
+                keterangan = self.app_identifier
+                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+                # Satu batch write B:D, hanya jika baris kunci masih belum dipakai
+                status = self.get_license_index().activate(key, [machine_uuid, keterangan, timestamp])
+                if status == "not_found":
                     messagebox.showerror("Aktivasi Gagal", "Kunci lisensi tidak valid.", parent=self.root)
                     return False
-
-                sheet_uuid = self.worksheet.cell(cell.row, 2).value
-
-                if not sheet_uuid:
-                    machine_uuid = self.get_machine_uuid()
-                    keterangan = self.app_identifier
-                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-                    # Batch update untuk efisiensi
-                    updates = [
-                        {'range': f'B{cell.row}', 'values': [[machine_uuid]]},
-                        {'range': f'C{cell.row}', 'values': [[keterangan]]},
-                        {'range': f'D{cell.row}', 'values': [[timestamp]]}
-                    ]
-                    self.worksheet.batch_update(updates)
-                    
-                    self.save_local_license(key, machine_uuid, keterangan, timestamp)
-                    messagebox.showinfo("Aktivasi Berhasil", 
-                        "Lisensi berhasil diaktifkan di perangkat ini.", parent=self.root)
-                    return True
-                else:
+                if status == "used":
                     messagebox.showerror("Aktivasi Gagal", "Kunci lisensi ini telah digunakan.", parent=self.root)
                     return False
+
+                self.save_local_license(key, machine_uuid, keterangan, timestamp)
+                messagebox.showinfo("Aktivasi Berhasil",
+                    "Lisensi berhasil diaktifkan di perangkat ini.", parent=self.root)
+                return True
             except Exception as e:
                 messagebox.showerror("Error Aktivasi", f"Terjadi kesalahan saat aktivasi: {e}", parent=self.root)
                 return False
 
 
-class BackgroundRemoverApp:
-    """Optimized Background Remover Application."""
-    
-    def __init__(self, root):
-        self.root = root
-        self.root.title("✨ AI Background Remover Pro")
-        self.root.geometry("900x700")
-        self.root.minsize(800, 600)
+# --- INSTRUMENTATION ---
+def peak_memory_mb():
+    """Peak RSS proses (high-water mark) dalam MB; None jika tidak tersedia."""
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
 
-        # Initialize variables
-        self.input_path = None
-        self.output_image_pil = None
-        self.session = None
-        self._image_cache = weakref.WeakValueDictionary()  # Weak reference cache
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
 
-        # Set icon dengan error handling
-        self._set_icon()
-        
-        # Lazy load AI model
-        self._initialize_ai_model()
-        
-        # Create UI
-        self.create_widgets()
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.PeakWorkingSetSize / (1024 * 1024)
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux melaporkan KB, macOS byte
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
 
-    def _set_icon(self):
-        """Set application icon dengan error handling."""
+
+class StageTimer:
+    """Mencatat durasi setiap tahap pipeline untuk satu gambar."""
+
+    def __init__(self, label=""):
+        self.label = label
+        self.stages = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
         try:
-            icon_path = self.get_resource_path('icon.ico')
-            self.root.iconbitmap(icon_path)
-        except Exception as e:
-            print(f"Icon not found: {e}")
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
 
-    def _initialize_ai_model(self):
-        """Initialize AI model dengan progress feedback."""
-        def load_model():
-            try:
-                self.session = new_session("isnet-general-use")
-                self.root.after(0, self._on_model_loaded)
-            except Exception as e:
-                error_msg = (f"Gagal memuat model AI: {e}\n\n"
-                           "Aplikasi memerlukan koneksi internet saat pertama kali dijalankan "
-                           "untuk mengunduh model. Silakan periksa koneksi Anda dan coba lagi.")
-                self.root.after(0, lambda: messagebox.showerror("Model AI Error", error_msg))
-                self.root.after(0, self.root.destroy)
+    def elapsed(self):
+        return time.perf_counter() - self._start
 
-        # Show loading status
-        self.status_label_temp = ttk.Label(self.root, 
-            text="Memuat model AI, mohon tunggu...", font=("Segoe UI", 12))
-        self.status_label_temp.pack(pady=20)
-        self.root.update_idletasks()
-        
-        # Load model in background
-        threading.Thread(target=load_model, daemon=True).start()
+    def finish(self):
+        """Record akhir: durasi per tahap, total, dan peak RSS proses.
 
-    def _on_model_loaded(self):
-        """Callback ketika model AI selesai dimuat."""
-        if hasattr(self, 'status_label_temp'):
-            self.status_label_temp.destroy()
+        process_peak_memory_mb adalah high-water mark seumur proses (bukan per
+        gambar): di GUI, watch, serve, dan worker pool yang dipakai ulang nilainya
+        tetap sama setelah gambar terbesar. Peak per ukuran gambar diukur oleh
+        bench (proses baru per ukuran).
+        """
+        return {
+            "image": self.label,
+            "timestamp": time.time(),
+            "stages": self.stages,
+            "total": time.perf_counter() - self._start,
+            "process_peak_memory_mb": peak_memory_mb(),
+        }
 
-    @lru_cache(maxsize=1)
-    def get_resource_path(self, relative_path):
-        """Cached resource path."""
-        try:
-            base_path = sys._MEIPASS
-        except Exception:
-            base_path = os.path.abspath(".")
-        return os.path.join(base_path, relative_path)
 
-    def create_widgets(self):
-        """Optimized widget creation."""
-        # Use single main frame
-        main_frame = ttk.Frame(self.root, padding=20)
-        main_frame.pack(fill=BOTH, expand=True)
+def format_stages(stages):
+    """'decode 0.05s, inference 0.80s, ...' untuk log console."""
+    return ", ".join(f"{name} {seconds:.2f}s" for name, seconds in stages.items())
 
-        # Create all sections
-        self.create_header(main_frame)
-        self.create_preview_panels(main_frame)
-        self.create_control_buttons(main_frame)
-        self.create_status_bar(main_frame)
 
-    def create_header(self, parent):
-        """Optimized header creation."""
-        header_frame = ttk.Frame(parent)
-        header_frame.pack(fill=X, pady=(0, 20))
-        
-        # Use single configuration call
-        title_label = ttk.Label(header_frame, 
-            text="🎨 AI Background Remover Pro", 
-            font=("Segoe UI", 24, "bold"), 
-            bootstyle="light")
-        title_label.pack()
-        
-        subtitle_label = ttk.Label(header_frame,
-            text="Hapus background gambar dengan satu klik, didukung oleh AI.",
-            font=("Segoe UI", 11),
-            bootstyle="light")
-        subtitle_label.pack(pady=(5,0))
-        
-        ttk.Separator(header_frame, orient=HORIZONTAL).pack(fill=X, pady=15)
+class MetricsRegistry:
+    """Histogram berjalan per tahap (p50/p95/p99) dengan export JSON-lines atau Prometheus."""
 
-    def create_preview_panels(self, parent):
-        """Optimized preview panels dengan lazy loading."""
-        preview_container = ttk.Frame(parent)
-        preview_container.pack(fill=BOTH, expand=True, pady=(0, 20))
-        preview_container.columnconfigure((0, 1), weight=1)
-        preview_container.rowconfigure(0, weight=1)
+    QUANTILES = (0.5, 0.95, 0.99)
 
-        # Original image panel
-        original_card = ttk.LabelFrame(preview_container, 
-            text="📸 Gambar Asli", padding=15, bootstyle="primary")
-        original_card.grid(row=0, column=0, padx=(0, 10), sticky="nsew")
-        original_card.rowconfigure(0, weight=1)
-        original_card.columnconfigure(0, weight=1)
-        
-        self.original_label = ttk.Label(original_card,
-            text="Klik 'Pilih Gambar'\nuntuk memulai\n\n🖼️",
-            font=("Segoe UI", 12),
-            bootstyle="secondary",
-            anchor="center",
-            justify="center")
-        self.original_label.grid(row=0, column=0, sticky="nsew")
+    def __init__(self, export_path=None, window=10000):
+        self.export_path = export_path
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._sums = {}
+        self._peak_memory_mb = None
+        self.events = {}
+        self._lock = threading.Lock()
+        self._jsonl = export_path is not None and not export_path.endswith(".prom")
 
-        # Result image panel
-        result_card = ttk.LabelFrame(preview_container,
-            text="✨ Hasil Tanpa Background", padding=15, bootstyle="success")
-        result_card.grid(row=0, column=1, padx=(10, 0), sticky="nsew")
-        result_card.rowconfigure(0, weight=1)
-        result_card.columnconfigure(0, weight=1)
-        
-        self.result_label = ttk.Label(result_card,
-            text="Hasil akan muncul di sini\nsetelah diproses\n\n🤖",
-            font=("Segoe UI", 12),
-            bootstyle="secondary",
-            anchor="center",
-            justify="center")
-        self.result_label.grid(row=0, column=0, sticky="nsew")
+    def _add_sample(self, stage, seconds):
+        self._samples.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+        self._counts[stage] = self._counts.get(stage, 0) + 1
+        self._sums[stage] = self._sums.get(stage, 0.0) + seconds
 
-    def create_control_buttons(self, parent):
-        """Optimized control buttons."""
-        control_frame = ttk.Frame(parent)
-        control_frame.pack(fill=X, pady=(0, 15))
+    def record(self, record):
+        """Tambahkan record dari StageTimer.finish()."""
+        values = dict(record["stages"], total=record["total"])
+        with self._lock:
+            for stage, seconds in values.items():
+                self._add_sample(stage, seconds)
+            if record.get("process_peak_memory_mb") is not None:
+                self._peak_memory_mb = max(self._peak_memory_mb or 0.0, record["process_peak_memory_mb"])
+            if self._jsonl:
+                with open(self.export_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record) + "\n")
 
-        # Create buttons dengan single call
-        button_configs = [
-            ("🎯 Pilih Gambar", self.select_image, "primary", 20),
-            ("💾 Simpan Hasil", self.save_image, "success", 20),
-            ("🔄 Reset", self.reset_app, "warning-outline", 15)
-        ]
+    def record_stage(self, stage, seconds):
+        """Sampel satu tahap di luar pipeline per gambar (mis. export), tanpa memengaruhi total."""
+        with self._lock:
+            self._add_sample(stage, seconds)
+            if self._jsonl:
+                with open(self.export_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({"stage": stage, "seconds": seconds, "timestamp": time.time()}) + "\n")
 
-        self.btn_select, self.btn_save, self.btn_reset = [], [], []
-        buttons = []
-        
-        for text, command, style, width in button_configs:
-            btn = ttk.Button(control_frame, text=text, command=command, 
-                           bootstyle=style, width=width, padding=10)
-            btn.pack(side=LEFT, expand=True, padx=5)
-            buttons.append(btn)
-        
-        self.btn_select, self.btn_save, self.btn_reset = buttons
-        self.btn_save.config(state="disabled")
+    def record_event(self, name, seconds):
+        """Catat event satu kali, mis. waktu startup sampai jendela pertama."""
+        with self._lock:
+            self.events[name] = seconds
+            if self._jsonl:
+                with open(self.export_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({"event": name, "seconds": seconds, "timestamp": time.time()}) + "\n")
 
-    def create_status_bar(self, parent):
-        """Optimized status bar."""
-        status_frame = ttk.LabelFrame(parent, text="📊 Status", padding=10, bootstyle="info")
-        status_frame.pack(fill=X)
+    def percentiles(self, stage="total"):
+        """(p50, p95, p99) dalam detik untuk satu tahap; None jika belum ada data."""
+        with self._lock:
+            samples = list(self._samples.get(stage, ()))
+        if not samples:
+            return None
+        return tuple(float(value) for value in np.percentile(samples, [q * 100 for q in self.QUANTILES]))
 
-        self.status_label = ttk.Label(status_frame,
-            text="🚀 Selamat datang! Pilih gambar untuk memulai.",
-            font=("Segoe UI", 11))
-        self.status_label.pack(side=LEFT, fill=X, expand=True)
+    def summary(self):
+        """Ringkasan semua tahap: count, sum dan kuantil."""
+        with self._lock:
+            stages = list(self._samples)
+        result = {}
+        for stage in stages:
+            p50, p95, p99 = self.percentiles(stage)
+            result[stage] = {"count": self._counts[stage], "sum": self._sums[stage],
+                             "p50": p50, "p95": p95, "p99": p99}
+        return result
 
-        self.progress_bar = ttk.Progressbar(status_frame, 
-            mode='indeterminate', bootstyle="info-striped")
+    def status_text(self):
+        """Teks singkat untuk status bar."""
+        values = self.percentiles("total")
+        if values is None:
+            return ""
+        return "p50 {:.2f}s · p95 {:.2f}s · p99 {:.2f}s".format(*values)
 
-    def select_image(self):
-        """Optimized image selection dengan file validation."""
-        supported_formats = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff'}
-        
-        file_path = filedialog.askopenfilename(
-            title="Pilih sebuah gambar",
+    def to_prometheus(self):
+        """Format text exposition Prometheus (tipe summary)."""
+        lines = ["# HELP removebg_stage_seconds Durasi per tahap pipeline.",
+                 "# TYPE removebg_stage_seconds summary"]
+        for stage, stats in self.summary().items():
+            for quantile in self.QUANTILES:
+                value = stats[f"p{int(round(quantile * 100))}"]
+                lines.append(f'removebg_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {value:.6f}')
+            lines.append(f'removebg_stage_seconds_sum{{stage="{stage}"}} {stats["sum"]:.6f}')
+            lines.append(f'removebg_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+        if self.events:
+            lines.append("# HELP removebg_event_seconds Waktu sejak proses mulai sampai event startup.")
+            lines.append("# TYPE removebg_event_seconds gauge")
+            for name, seconds in self.events.items():
+                lines.append(f'removebg_event_seconds{{event="{name}"}} {seconds:.6f}')
+        if self._peak_memory_mb is not None:
+            lines.append("# HELP removebg_process_peak_memory_megabytes Peak RSS proses (seumur proses), "
+                         "tertinggi yang dilaporkan.")
+            lines.append("# TYPE removebg_process_peak_memory_megabytes gauge")
+            lines.append(f"removebg_process_peak_memory_megabytes {self._peak_memory_mb:.1f}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        """Tulis snapshot Prometheus (JSON-lines sudah ditulis per record)."""
+        if self.export_path and not self._jsonl:
+            temp_file = self.export_path + '.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.write(self.to_prometheus())
+            os.replace(temp_file, self.export_path)
+
+
+class MaskCache:
+    """Cache mask alpha di disk, content-addressed, dengan batas ukuran dan eviksi LRU."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_SIZE_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._scan())
+
+    @staticmethod
+    def make_key(input_bytes, model_name, options=None):
+        """Hash isi file + nama model + opsi, sehingga file identik selalu cocok."""
+        digest = hashlib.sha256(input_bytes)
+        digest.update(b"\0" + model_name.encode("utf-8"))
+        digest.update(b"\0" + json.dumps(options or {}, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def _scan(self):
+        """Daftar (path, size, mtime) semua entri cache."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".png"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:  # Dihapus proses lain
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def get(self, key):
+        """Ambil mask (array alpha) dari cache; None jika tidak ada."""
+        path = self._path(key)
+        try:
+            with Image.open(path) as cached:
+                alpha = np.asarray(cached.convert("L"))
+            os.utime(path)  # Tandai sebagai baru dipakai (LRU)
+            return alpha
+        except (FileNotFoundError, OSError):
+            return None
+
+    def put(self, key, alpha):
+        """Simpan mask dengan atomic write, lalu evict entri lama bila melebihi budget."""
+        path = self._path(key)
+        temp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            Image.fromarray(alpha, "L").save(temp_file, 'PNG')
+            size = os.path.getsize(temp_file)
+            os.replace(temp_file, path)
+        except Exception:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+        with self._lock:
+            self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Hapus entri yang paling lama tidak dipakai sampai di bawah budget."""
+        entries = sorted(self._scan(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._total_bytes = total
+
+    def clear(self):
+        """Kosongkan seluruh cache."""
+        with self._lock:
+            for path, _, _ in self._scan():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._total_bytes = 0
+
+
+EXIF_ORIENTATION_TAG = 0x0112
+
+
+def load_image(input_bytes):
+    """Decode gambar satu kali; orientasi EXIF hanya diterapkan bila perlu."""
+    image = Image.open(io.BytesIO(input_bytes))
+    # exif_transpose selalu membuat salinan, jadi lewati untuk orientasi normal
+    if image.getexif().get(EXIF_ORIENTATION_TAG, 1) != 1:
+        image = ImageOps.exif_transpose(image)
+    else:
+        image.load()
+    return image
+
+
+def to_rgb_array(image):
+    """Buffer piksel RGB (H, W, 3) dari gambar yang sudah di-decode."""
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return np.asarray(image)
+
+
+def predict_alpha(session, image):
+    """Inference langsung ke session (tanpa encode PNG di remove()), hasil array alpha."""
+    mask = session.predict(image)[0]
+    return np.asarray(mask if mask.mode == "L" else mask.convert("L"))
+
+
+class StubSession:
+    """Session palsu untuk benchmark offline: mask dari luminansi di resolusi model.
+
+    Meniru bentuk biaya rembg (resize ke input model, lalu mask di-upscale ke
+    ukuran asli) tanpa file ONNX atau koneksi internet. Presisi fp16/int8
+    ditiru dengan mengkuantisasi luminansi agar harness perbandingan bisa diuji.
+    """
+
+    model_size = (320, 320)
+    QUANT_STEPS = {"fp32": 1, "fp16": 2, "int8": 8}
+
+    def __init__(self, precision="fp32"):
+        self.step = self.QUANT_STEPS[precision]
+
+    def predict(self, img, *args, **kwargs):
+        small = np.asarray(img.convert("L").resize(self.model_size, Image.Resampling.BILINEAR), dtype=np.float32)
+        small = np.round(small / self.step) * self.step
+        mask = np.where(np.abs(small - np.median(small)) > 16, 255, 0).astype(np.uint8)
+        return [Image.fromarray(mask, "L").resize(img.size, Image.Resampling.LANCZOS)]
+
+
+class RuntimeOptions:
+    """Knob ONNX Runtime: jumlah thread intra/inter-op, level optimisasi graph, mode eksekusi.
+
+    Nilai thread 0 berarti default ONNX Runtime (semua core).
+    """
+
+    GRAPH_OPTIMIZATION_LEVELS = {
+        "disable": "ORT_DISABLE_ALL",
+        "basic": "ORT_ENABLE_BASIC",
+        "extended": "ORT_ENABLE_EXTENDED",
+        "all": "ORT_ENABLE_ALL",
+    }
+    EXECUTION_MODES = {"sequential": "ORT_SEQUENTIAL", "parallel": "ORT_PARALLEL"}
+
+    def __init__(self, intra_op_threads=0, inter_op_threads=0, graph_optimization="all",
+                 execution_mode="sequential"):
+        if graph_optimization not in self.GRAPH_OPTIMIZATION_LEVELS:
+            raise ValueError(f"graph_optimization tidak dikenal: {graph_optimization}")
+        if execution_mode not in self.EXECUTION_MODES:
+            raise ValueError(f"execution_mode tidak dikenal: {execution_mode}")
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.graph_optimization = graph_optimization
+        self.execution_mode = execution_mode
+
+    @classmethod
+    def for_workers(cls, workers, **kwargs):
+        """Bagi core CPU rata ke setiap worker agar tidak oversubscribe."""
+        threads = max(1, (os.cpu_count() or 1) // max(1, workers))
+        kwargs.setdefault("intra_op_threads", threads)
+        kwargs.setdefault("inter_op_threads", 1)
+        return cls(**kwargs)
+
+    def key(self):
+        return (self.intra_op_threads, self.inter_op_threads, self.graph_optimization, self.execution_mode)
+
+    def build(self):
+        """onnxruntime.SessionOptions sesuai knob ini."""
+        import onnxruntime as ort
+
+        sess_opts = ort.SessionOptions()
+        sess_opts.intra_op_num_threads = self.intra_op_threads
+        sess_opts.inter_op_num_threads = self.inter_op_threads
+        sess_opts.graph_optimization_level = getattr(
+            ort.GraphOptimizationLevel, self.GRAPH_OPTIMIZATION_LEVELS[self.graph_optimization])
+        sess_opts.execution_mode = getattr(ort.ExecutionMode, self.EXECUTION_MODES[self.execution_mode])
+        return sess_opts
+
+    def __repr__(self):
+        return (f"RuntimeOptions(intra_op_threads={self.intra_op_threads}, "
+                f"inter_op_threads={self.inter_op_threads}, graph_optimization={self.graph_optimization!r}, "
+                f"execution_mode={self.execution_mode!r})")
+
+
+def _find_session_class(model_name):
+    """Kelas session rembg untuk nama model."""
+    # Import ditunda: rembg menarik onnxruntime, scipy, dan pymatting (detik-an)
+    from rembg.sessions import sessions_class
+
+    for session_class in sessions_class:
+        if session_class.name() == model_name:
+            return session_class
+    raise ValueError(f"Model tidak dikenal: {model_name}")
+
+
+def split_model_name(model_name):
+    """'isnet-general-use:int8' -> ('isnet-general-use', 'int8'); tanpa sufiks berarti fp32."""
+    base, _, precision = model_name.partition(":")
+    precision = precision or "fp32"
+    if precision not in MODEL_PRECISIONS:
+        raise ValueError(f"Presisi model tidak dikenal: {precision} (pilihan: {', '.join(MODEL_PRECISIONS)})")
+    return base, precision
+
+
+def quantize_model(source_path, target_path, precision):
+    """Tulis varian ONNX fp16/int8 dari model fp32 (atomic: file .tmp lalu os.replace)."""
+    tmp_path = f"{target_path}.{os.getpid()}.tmp"
+    try:
+        if precision == "int8":
+            # Kuantisasi dinamis: bobot int8, aktivasi dikuantisasi saat runtime (tanpa data kalibrasi)
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(source_path, tmp_path, weight_type=QuantType.QUInt8)
+        else:
+            try:
+                import onnx
+                from onnxconverter_common import float16
+            except ImportError as e:
+                raise RuntimeError("Varian fp16 memerlukan paket 'onnx' dan 'onnxconverter-common'") from e
+            # Input/output tetap float32 agar preprocessing rembg tidak berubah
+            onnx.save(float16.convert_float_to_float16(onnx.load(source_path), keep_io_types=True), tmp_path)
+        os.replace(tmp_path, target_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def model_path(model_name):
+    """Path file ONNX model; varian fp16/int8 disimpan di samping model asli dan dibuat sekali."""
+    base, precision = split_model_name(model_name)
+    source_path = _find_session_class(base).download_models()
+    if precision == "fp32":
+        return source_path
+    root, ext = os.path.splitext(source_path)
+    target_path = f"{root}.{precision}{ext}"
+    if not os.path.exists(target_path):
+        start_time = time.perf_counter()
+        quantize_model(source_path, target_path, precision)
+        print(f"Varian {precision} untuk {base} dibuat: {time.perf_counter() - start_time:.2f} seconds")
+    return target_path
+
+
+def create_session(model_name=DEFAULT_MODEL_NAME, options=None):
+    """Session rembg dengan RuntimeOptions, atau StubSession untuk nama model 'stub'."""
+    base, precision = split_model_name(model_name)
+    if base == STUB_MODEL_NAME:
+        return StubSession(precision)
+    # new_session() tidak menerima SessionOptions, jadi kelas session dibuat langsung
+    options = options or RuntimeOptions()
+    session_class = _find_session_class(base)
+    if precision != "fp32":
+        # BaseSession memuat file dari download_models(); arahkan ke file varian
+        path = model_path(model_name)
+        session_class = type(f"{session_class.__name__}_{precision}", (session_class,),
+                             {"download_models": classmethod(lambda cls, *args, **kwargs: path)})
+    return session_class(base, options.build())
+
+
+def estimate_session_memory_mb(model_name):
+    """Perkiraan memori session: ukuran file ONNX x faktor (bobot + arena runtime)."""
+    if split_model_name(model_name)[0] == STUB_MODEL_NAME:
+        return 0.0
+    try:
+        return os.path.getsize(model_path(model_name)) / (1024 * 1024) * MODEL_MEMORY_FACTOR
+    except Exception:
+        return 0.0
+
+
+class SessionManager:
+    """Pool session multi-model dengan eviksi LRU berdasarkan jumlah dan perkiraan memori."""
+
+    def __init__(self, max_models=DEFAULT_MAX_MODELS, max_memory_mb=DEFAULT_MODEL_MEMORY_MB, options=None):
+        self.max_models = max_models
+        self.max_memory_mb = max_memory_mb
+        self.options = options or RuntimeOptions()
+        self._sessions = OrderedDict()  # key -> (session, memory_mb)
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name=DEFAULT_MODEL_NAME, options=None):
+        """Session untuk model; dimuat sekali, pemanggil paralel menunggu load yang sama."""
+        options = options or self.options
+        key = (model_name, options.key())
+        with self._lock:
+            if key in self._sessions:
+                self._sessions.move_to_end(key)
+                return self._sessions[key][0]
+            future = self._loading.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = self._loading[key] = Future()
+        if not is_owner:
+            return future.result()
+
+        try:
+            session = create_session(model_name, options)
+            memory_mb = estimate_session_memory_mb(model_name)
+        except BaseException as e:
+            with self._lock:
+                self._loading.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._loading.pop(key, None)
+            self._sessions[key] = (session, memory_mb)
+            self._evict()
+        future.set_result(session)
+        return session
+
+    def _evict(self):
+        """Buang session paling lama tidak dipakai; session terbaru selalu dipertahankan."""
+        while len(self._sessions) > 1 and (
+                len(self._sessions) > self.max_models or self.memory_mb() > self.max_memory_mb):
+            evicted_key, _ = self._sessions.popitem(last=False)
+            print(f"Session evicted: {evicted_key[0]}")
+
+    def memory_mb(self):
+        return sum(memory_mb for _, memory_mb in self._sessions.values())
+
+    def loaded_models(self):
+        with self._lock:
+            return [key[0] for key in self._sessions]
+
+    def is_loaded(self, model_name, options=None):
+        with self._lock:
+            return (model_name, (options or self.options).key()) in self._sessions
+
+
+def compute_mask(input_bytes, image, session, model_name=DEFAULT_MODEL_NAME, cache=None, timer=None,
+                 options=None):
+    """Array alpha untuk gambar; inference dilewati jika mask ada di cache.
+
+    options tambahan (mis. ukuran proxy) ikut menjadi bagian kunci cache.
+    """
+    timer = timer if timer is not None else StageTimer()
+    key = None
+    if cache is not None:
+        with timer.stage("cache_lookup"):
+            key = MaskCache.make_key(input_bytes, model_name, dict(MASK_OPTIONS, **(options or {})))
+            alpha = cache.get(key)
+        if alpha is not None and alpha.shape == (image.height, image.width):
+            return alpha
+
+    with timer.stage("inference"):
+        alpha = predict_alpha(session, image)
+    if cache is not None:
+        with timer.stage("cache_store"):
+            cache.put(key, alpha)
+    return alpha
+
+
+# --- MASK COMPOSITING (NumPy) ---
+WHITE = (255, 255, 255)
+
+
+def composite_transparent(rgb, alpha):
+    """RGBA transparan: alpha dari mask ditempel sebagai channel keempat.
+
+    Seperti naive_cutout rembg, RGB di bawah alpha 0 dinolkan: latar yang
+    dihapus tidak bisa dipulihkan dari file dan PNG jauh lebih kecil.
+    """
+    rgba = np.dstack((rgb, alpha))
+    rgba[alpha == 0] = 0
+    return rgba
+
+
+def _blend(rgb, alpha, background):
+    """out = fg * a + bg * (1 - a) dengan aritmetika integer, dibulatkan."""
+    a = alpha[..., None].astype(np.uint16)
+    out = rgb.astype(np.uint16) * a
+    out += np.asarray(background, dtype=np.uint16) * (255 - a)
+    out += 127
+    out //= 255
+    return out.astype(np.uint8)
+
+
+def composite_color(rgb, alpha, color=WHITE):
+    """Gambar di atas warna solid."""
+    return _blend(rgb, alpha, np.array(color[:3], dtype=np.uint8))
+
+
+@lru_cache(maxsize=8)
+def _load_background(path, size):
+    """Background di-resize (cover + center crop) ke ukuran hasil, di-cache per ukuran."""
+    with Image.open(path) as background:
+        fitted = ImageOps.fit(background.convert("RGB"), size, Image.Resampling.LANCZOS)
+    array = np.asarray(fitted, dtype=np.uint8)
+    array.setflags(write=False)
+    return array
+
+
+def composite_image(rgb, alpha, background_path, full_size=None, rows=None):
+    """Gambar di atas gambar background.
+
+    Untuk strip dari gambar besar, full_size adalah ukuran hasil penuh dan
+    rows (awal, akhir) baris background yang dipakai.
+    """
+    height, width = alpha.shape
+    background = _load_background(background_path, full_size or (width, height))
+    if rows is not None:
+        background = background[rows[0]:rows[1]]
+    return _blend(rgb, alpha, background)
+
+
+def parse_variant(spec):
+    """Parse spesifikasi varian output.
+
+    'transparent' -> PNG transparan, 'white'/'#f5f5f5'/'red' -> warna solid,
+    'bg=studio.jpg' -> gambar background.
+    """
+    if spec == "transparent":
+        return "no_bg", None
+    if spec.startswith("bg="):
+        path = spec[3:]
+        name = "bg-" + os.path.splitext(os.path.basename(path))[0]
+        return name, path
+    color = ImageColor.getrgb(spec)[:3]
+    return spec.lstrip("#"), color
+
+
+def composite_variant(rgb, alpha, background, full_size=None, rows=None):
+    """Array hasil satu varian (RGBA untuk transparan, RGB untuk latar)."""
+    if background is None:
+        return composite_transparent(rgb, alpha)
+    if isinstance(background, str):
+        return composite_image(rgb, alpha, background, full_size, rows)
+    return composite_color(rgb, alpha, background)
+
+
+def render_variant(rgb, alpha, background):
+    """Render satu varian dari mask yang sama; tidak ada inference ulang."""
+    result = composite_variant(rgb, alpha, background)
+    return Image.fromarray(result, "RGBA" if result.shape[-1] == 4 else "RGB")
+
+
+# --- LARGE IMAGES (RESOLUTION-ADAPTIVE) ---
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+GRAY_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32) / 255
+
+
+def is_large_image(image, threshold_mp=LARGE_IMAGE_MP):
+    """True jika gambar (cukup header, belum di-decode) melewati ambang megapixel."""
+    return image.width * image.height > threshold_mp * 1_000_000
+
+
+def load_proxy(input_bytes, max_side=DEFAULT_PROXY_SIDE):
+    """Decode gambar langsung di resolusi proxy.
+
+    thumbnail() memakai draft() JPEG (decode 1/2..1/8) dan reduce(), jadi
+    piksel resolusi penuh tidak pernah dibuat untuk JPEG.
+    """
+    proxy = Image.open(io.BytesIO(input_bytes))
+    orientation = proxy.getexif().get(EXIF_ORIENTATION_TAG, 1)
+    proxy.thumbnail((max_side, max_side), Image.Resampling.LANCZOS, reducing_gap=2.0)
+    if proxy.mode != "RGB":
+        proxy = proxy.convert("RGB")
+    if orientation in ORIENTATION_TRANSPOSE:
+        proxy = proxy.transpose(ORIENTATION_TRANSPOSE[orientation])
+    return proxy
+
+
+def _box_filter_1d(values, radius, axis):
+    """Mean filter jendela (2r+1) sepanjang satu axis, dinormalisasi di tepi."""
+    length = values.shape[axis]
+    cumulative = np.cumsum(values, axis=axis, dtype=np.float64)
+    pad = [(0, 0)] * values.ndim
+    pad[axis] = (1, 0)
+    cumulative = np.pad(cumulative, pad)
+    index = np.arange(length)
+    upper = np.minimum(index + radius + 1, length)
+    lower = np.maximum(index - radius, 0)
+    sums = np.take(cumulative, upper, axis=axis) - np.take(cumulative, lower, axis=axis)
+    shape = [1] * values.ndim
+    shape[axis] = length
+    return (sums / (upper - lower).reshape(shape)).astype(np.float32)
+
+
+def box_filter(values, radius):
+    return _box_filter_1d(_box_filter_1d(values, radius, 0), radius, 1)
+
+
+def guided_filter(guide, source, radius, eps):
+    """Guided filter (He et al.): tepi alpha mengikuti tepi gambar resolusi penuh."""
+    mean_guide = box_filter(guide, radius)
+    mean_source = box_filter(source, radius)
+    covariance = box_filter(guide * source, radius) - mean_guide * mean_source
+    variance = box_filter(guide * guide, radius) - mean_guide * mean_guide
+    a = covariance / (variance + eps)
+    b = mean_source - a * mean_guide
+    return box_filter(a, radius) * guide + box_filter(b, radius)
+
+
+class AlphaUpsampler:
+    """Upsample alpha proxy ke resolusi penuh per strip, dengan refinement edge-aware."""
+
+    def __init__(self, proxy_alpha, full_size, eps=1e-3):
+        self.proxy = proxy_alpha.astype(np.float32) / 255
+        self.width, self.height = full_size
+        proxy_height, proxy_width = self.proxy.shape
+        # Radius ~ satu piksel proxy di resolusi penuh
+        self.radius = max(1, int(round(max(self.width / proxy_width, self.height / proxy_height))))
+        self.margin = 2 * self.radius  # box filter dipakai dua kali
+        self.eps = eps
+        self.x0, self.x1, self.wx = self._coordinates(self.width, proxy_width)
+
+    @staticmethod
+    def _coordinates(full_length, proxy_length, start=0, stop=None):
+        """Indeks tetangga dan bobot interpolasi bilinear untuk setiap piksel penuh."""
+        stop = full_length if stop is None else stop
+        source = (np.arange(start, stop, dtype=np.float32) + 0.5) * proxy_length / full_length - 0.5
+        source = np.clip(source, 0, proxy_length - 1)
+        lower = np.floor(source).astype(np.intp)
+        upper = np.minimum(lower + 1, proxy_length - 1)
+        return lower, upper, source - lower
+
+    def bilinear_rows(self, start, stop):
+        y0, y1, wy = self._coordinates(self.height, self.proxy.shape[0], start, stop)
+        top = self.proxy[y0][:, self.x0] * (1 - self.wx) + self.proxy[y0][:, self.x1] * self.wx
+        bottom = self.proxy[y1][:, self.x0] * (1 - self.wx) + self.proxy[y1][:, self.x1] * self.wx
+        return top * (1 - wy[:, None]) + bottom * wy[:, None]
+
+    def strip(self, start, stop, extended_start, rgb_extended=None):
+        """Alpha uint8 untuk baris [start, stop).
+
+        rgb_extended adalah piksel baris [extended_start, stop + margin) yang
+        dipakai sebagai guide; None berarti bilinear saja tanpa refinement.
+        """
+        extended_stop = extended_start + (len(rgb_extended) if rgb_extended is not None else stop - extended_start)
+        alpha = self.bilinear_rows(extended_start, extended_stop)
+        if rgb_extended is not None:
+            guide = rgb_extended.astype(np.float32) @ GRAY_WEIGHTS
+            alpha = guided_filter(guide, alpha, self.radius, self.eps)
+        alpha = alpha[start - extended_start:stop - extended_start]
+        return (np.clip(alpha, 0.0, 1.0) * 255 + 0.5).astype(np.uint8)
+
+
+def iter_adaptive_strips(image, proxy_alpha, tile_rows=DEFAULT_TILE_ROWS, refine=True):
+    """(start, stop, rgb, alpha) per strip resolusi penuh.
+
+    Buffer kerja (guide, alpha float, komposit) hanya sebesar satu strip, tetapi
+    image sumber sudah ter-decode penuh (PIL tidak bisa decode JPEG per baris).
+    """
+    width, height = image.size
+    upsampler = AlphaUpsampler(proxy_alpha, image.size)
+    margin = upsampler.margin if refine else 0
+    for start in range(0, height, tile_rows):
+        stop = min(height, start + tile_rows)
+        extended_start = max(0, start - margin)
+        extended_stop = min(height, stop + margin)
+        region = image.crop((0, extended_start, width, extended_stop))
+        rgb_extended = to_rgb_array(region)
+        alpha = upsampler.strip(start, stop, extended_start, rgb_extended if refine else None)
+        yield start, stop, rgb_extended[start - extended_start:stop - extended_start], alpha
+
+
+def compute_adaptive_mask(input_bytes, image, session, model_name=DEFAULT_MODEL_NAME, cache=None,
+                          timer=None, proxy_side=DEFAULT_PROXY_SIDE, tile_rows=DEFAULT_TILE_ROWS, on_proxy=None):
+    """Alpha resolusi penuh dari inference pada proxy, disusun strip demi strip.
+
+    on_proxy(proxy, proxy_alpha) dipanggil sebelum refinement, untuk tampilan progresif.
+    """
+    timer = timer if timer is not None else StageTimer()
+    with timer.stage("proxy"):
+        proxy = load_proxy(input_bytes, proxy_side)
+    proxy_alpha = compute_mask(input_bytes, proxy, session, model_name, cache, timer,
+                               options={"proxy_side": proxy_side})
+    if on_proxy is not None:
+        on_proxy(proxy, proxy_alpha)
+    alpha = np.empty((image.height, image.width), dtype=np.uint8)
+    with timer.stage("refine"):
+        for start, stop, _, strip_alpha in iter_adaptive_strips(image, proxy_alpha, tile_rows):
+            alpha[start:stop] = strip_alpha
+    return alpha
+
+
+class StreamingPNGWriter:
+    """Tulis PNG baris demi baris (filter Up + zlib streaming) tanpa menampung seluruh gambar."""
+
+    COLOR_TYPES = {3: 2, 4: 6}  # RGB, RGBA
+
+    def __init__(self, path, width, height, channels, compress_level=6):
+        self.path = path
+        self.width = width
+        self.channels = channels
+        self.temp_file = f"{path}.{os.getpid()}.tmp"
+        self._file = open(self.temp_file, 'wb')
+        self._compressor = zlib.compressobj(compress_level)
+        self._previous_row = np.zeros(width * channels, dtype=np.uint8)
+        self._file.write(b"\x89PNG\r\n\x1a\n")
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, self.COLOR_TYPES[channels], 0, 0, 0))
+
+    def _chunk(self, chunk_type, data):
+        self._file.write(struct.pack(">I", len(data)))
+        self._file.write(chunk_type)
+        self._file.write(data)
+        self._file.write(struct.pack(">I", zlib.crc32(chunk_type + data) & 0xFFFFFFFF))
+
+    def write(self, rows):
+        """Tambahkan strip (h, W, C) uint8."""
+        rows = np.ascontiguousarray(rows).reshape(len(rows), self.width * self.channels)
+        previous = np.vstack((self._previous_row[None, :], rows[:-1]))
+        filtered = np.empty((len(rows), rows.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = 2  # Filter "Up"
+        np.subtract(rows, previous, out=filtered[:, 1:])
+        self._previous_row = rows[-1].copy()
+        data = self._compressor.compress(filtered.tobytes())
+        if data:
+            self._chunk(b"IDAT", data)
+
+    def close(self):
+        self._chunk(b"IDAT", self._compressor.flush())
+        self._chunk(b"IEND", b"")
+        self._file.close()
+        os.replace(self.temp_file, self.path)
+        return self.path
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self.temp_file):
+            os.remove(self.temp_file)
+
+
+class ArrayJPEGWriter:
+    """Kumpulkan strip RGB ke satu buffer lalu encode JPEG sekali.
+
+    JPEG tidak bisa di-encode streaming di PIL, jadi writer ini memegang
+    H x W x 3 byte sampai close(); admission control ikut menghitungnya.
+    """
+
+    def __init__(self, path, width, height, quality=95):
+        self.path = path
+        self.quality = quality
+        self._pixels = np.empty((height, width, 3), dtype=np.uint8)
+        self._row = 0
+
+    def write(self, rows):
+        self._pixels[self._row:self._row + len(rows)] = rows
+        self._row += len(rows)
+
+    def close(self):
+        atomic_save(Image.fromarray(self._pixels, "RGB"), self.path, 'JPEG', quality=self.quality)
+        self._pixels = None
+        return self.path
+
+    def abort(self):
+        self._pixels = None
+
+
+# --- ALPHA MATTING (UNCERTAINTY BAND) ---
+# band: lebar band tepi (px), tile: sisi tile, method: guided (NumPy) atau closed_form (pymatting)
+MATTING_QUALITIES = {
+    "fast": {"band": 4, "tile": 256, "method": "closed_form"},
+    "balanced": {"band": 10, "tile": 256, "method": "closed_form"},
+    "best": {"band": 16, "tile": 512, "method": "closed_form"},
+}
+MATTING_CHOICES = ("off",) + tuple(MATTING_QUALITIES)
+MATTING_THRESHOLDS = (15, 240)  # Alpha di antara keduanya dianggap tidak pasti
+
+
+def _dilate(mask, radius):
+    return box_filter(mask.astype(np.float32), radius) > 1e-6
+
+
+def uncertainty_band(alpha, band, thresholds=MATTING_THRESHOLDS):
+    """Mask bool area tepi yang tidak pasti: alpha setengah transparan dan transisi fg/bg, diperlebar band px."""
+    low, high = thresholds
+    uncertain = (alpha > low) & (alpha < high)
+    # Tepi tajam (mask hampir biner) juga perlu matting, mis. rambut yang terpotong model
+    edges = _dilate(alpha >= high, 1) & _dilate(alpha <= low, 1)
+    return _dilate(uncertain | edges, band)
+
+
+def _closed_form_matte(rgb, alpha, band):
+    """Closed-form matting (Levin et al.) via pymatting; None jika tile tidak punya fg dan bg pasti."""
+    from pymatting import estimate_alpha_cf, jacobi
+    known_foreground = (alpha >= 128) & ~band
+    if not known_foreground.any() or not (~band & ~known_foreground).any():
+        return None
+    trimap = np.where(band, 0.5, known_foreground.astype(np.float64))
+    # Preconditioner Jacobi: untuk tile kecil lebih cepat dari ichol dan tanpa peringatan gagal dekomposisi
+    return estimate_alpha_cf(rgb.astype(np.float64) / 255, trimap, preconditioner=jacobi)
+
+
+def _guided_matte(rgb, alpha, radius):
+    guide = rgb.astype(np.float32) @ GRAY_WEIGHTS
+    return guided_filter(guide, alpha.astype(np.float32) / 255, radius, 1e-4)
+
+
+def _matte_tile(rgb, alpha, bounds, settings):
+    """Matting satu tile dengan konteks di sekelilingnya; hanya piksel di dalam band yang berubah."""
+    top, bottom, left, right = bounds
+    margin = settings["band"]
+    height, width = alpha.shape
+    # Band dihitung per tile: konteks solver selebar margin, ditambah margin lagi untuk dilatasi
+    pad = 2 * margin + 1
+    by0, by1 = max(0, top - pad), min(height, bottom + pad)
+    bx0, bx1 = max(0, left - pad), min(width, right + pad)
+    region = alpha[by0:by1, bx0:bx1]
+    low, high = MATTING_THRESHOLDS
+    if not (((region > low) & (region < high)).any() or ((region <= low).any() and (region >= high).any())):
+        return None  # Tile sepenuhnya fg atau bg pasti
+    band = uncertainty_band(region, margin)
+    core_band = band[top - by0:bottom - by0, left - bx0:right - bx0]
+    if not core_band.any():
+        return None
+
+    y0, y1 = max(0, top - margin), min(height, bottom + margin)
+    x0, x1 = max(0, left - margin), min(width, right + margin)
+    tile_rgb, tile_alpha = rgb[y0:y1, x0:x1], alpha[y0:y1, x0:x1]
+    tile_band = band[y0 - by0:y1 - by0, x0 - bx0:x1 - bx0]
+
+    refined = None
+    if settings["method"] == "closed_form":
+        refined = _closed_form_matte(tile_rgb, tile_alpha, tile_band)
+    if refined is None:
+        refined = _guided_matte(tile_rgb, tile_alpha, margin)
+    refined = np.clip(refined[top - y0:bottom - y0, left - x0:right - x0] * 255 + 0.5, 0, 255).astype(np.uint8)
+    return bounds, np.where(core_band, refined, alpha[top:bottom, left:right])
+
+
+def refine_alpha(rgb, alpha, quality="balanced", workers=None):
+    """Alpha matting hanya di band tepi yang tidak pasti, per tile secara paralel.
+
+    Tile yang seluruhnya fg/bg pasti dilewati, jadi biaya sebanding dengan
+    panjang tepi objek, bukan luas gambar. Tanpa pymatting, closed_form turun
+    ke guided filter.
+    """
+    settings = dict(MATTING_QUALITIES[quality])
+    if settings["method"] == "closed_form":
+        try:
+            import pymatting  # noqa: F401
+        except ImportError:
+            print("pymatting tidak tersedia, matting memakai guided filter")
+            settings["method"] = "guided"
+
+    height, width = alpha.shape
+    tile = settings["tile"]
+    tiles = [(top, min(top + tile, height), left, min(left + tile, width))
+             for top in range(0, height, tile) for left in range(0, width, tile)]
+
+    refined = alpha.copy()
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        for result in pool.map(lambda bounds: _matte_tile(rgb, alpha, bounds, settings), tiles):
+            if result is not None:
+                (top, bottom, left, right), values = result
+                refined[top:bottom, left:right] = values
+    return refined
+
+
+# --- MEMORY ADMISSION CONTROL ---
+# Perkiraan byte per pixel jalur penuh: decode RGB (3) + array RGB (3) + mask (1)
+# + komposit RGBA (4) + buffer resize/encode (~5)
+FULL_PATH_BYTES_PER_PIXEL = 16
+# Jalur strip batch: decode RGB penuh (PIL menyimpan RGB 4 B/px), satu salinan
+# sementara (transpose EXIF / fromarray saat close JPEG), dan byte file input
+LOW_MEMORY_BYTES_PER_PIXEL = 9
+# ArrayJPEGWriter memegang H x W x 3 per varian JPEG sampai close()
+JPEG_WRITER_BYTES_PER_PIXEL = 3
+DEFAULT_MEMORY_BUDGET_FRACTION = 0.5
+FALLBACK_MEMORY_BUDGET_MB = 4096
+
+
+def total_memory_mb():
+    """RAM fisik node dalam MB; None jika tidak tersedia."""
+    if sys.platform == "win32":
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                        ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(status)
+        if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return None
+        return status.ullTotalPhys / (1024 * 1024)
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def default_memory_budget_mb():
+    """Budget default: sebagian RAM fisik, sisanya untuk OS, session model, dan GUI."""
+    total = total_memory_mb()
+    return total * DEFAULT_MEMORY_BUDGET_FRACTION if total else FALLBACK_MEMORY_BUDGET_MB
+
+
+def read_image_size(path):
+    """(width, height) dari header file; pixel belum di-decode."""
+    with Image.open(path) as image:
+        return image.size
+
+
+def estimate_job_memory_mb(size, low_memory=False, proxy_side=DEFAULT_PROXY_SIDE, tile_rows=DEFAULT_TILE_ROWS,
+                           jpeg_variants=0):
+    """Perkiraan puncak memori buffer gambar untuk satu job, dari ukuran header.
+
+    low_memory=True berarti jalur strip batch (_process_large_file), termasuk
+    buffer ArrayJPEGWriter untuk setiap varian JPEG.
+    """
+    width, height = size
+    if not low_memory:
+        return width * height * FULL_PATH_BYTES_PER_PIXEL / (1024 * 1024)
+    proxy_pixels = width * height * min(1.0, proxy_side / max(width, height)) ** 2
+    working_pixels = proxy_pixels + width * min(tile_rows, height)
+    full_bytes_per_pixel = LOW_MEMORY_BYTES_PER_PIXEL + jpeg_variants * JPEG_WRITER_BYTES_PER_PIXEL
+    return (width * height * full_bytes_per_pixel
+            + working_pixels * FULL_PATH_BYTES_PER_PIXEL) / (1024 * 1024)
+
+
+def plan_admission(size, budget_mb, threshold_mp=LARGE_IMAGE_MP, proxy_side=DEFAULT_PROXY_SIDE,
+                   tile_rows=DEFAULT_TILE_ROWS, jpeg_variants=0, strip_output=True):
+    """(perkiraan MB, low_memory): gambar besar atau yang tidak muat di budget memakai jalur proxy.
+
+    strip_output=False untuk pemanggil yang tetap membuat RGB, alpha, dan komposit
+    resolusi penuh (GUI, watch): proxy hanya menghemat inference, jadi job dibebani
+    biaya jalur penuh.
+    """
+    low_memory = (size[0] * size[1] > threshold_mp * 1_000_000
+                  or estimate_job_memory_mb(size) > budget_mb)
+    memory_mb = estimate_job_memory_mb(size, low_memory and strip_output, proxy_side, tile_rows, jpeg_variants)
+    return memory_mb, low_memory
+
+
+class MemoryBudget:
+    """Admission control: job baru mulai hanya jika perkiraan memorinya masih muat di budget.
+
+    Job yang lebih besar dari seluruh budget dihitung sebesar budget, jadi
+    tetap berjalan tetapi sendirian.
+    """
+
+    def __init__(self, budget_mb):
+        self.budget_mb = budget_mb
+        self.in_use_mb = 0.0
+        self.peak_mb = 0.0
+        self._holders = 0
+        self._condition = threading.Condition()
+
+    def _cost(self, memory_mb):
+        return min(memory_mb, self.budget_mb)
+
+    def try_acquire(self, memory_mb):
+        with self._condition:
+            cost = self._cost(memory_mb)
+            if self._holders and self.in_use_mb + cost > self.budget_mb:
+                return False
+            self._holders += 1
+            self.in_use_mb += cost
+            self.peak_mb = max(self.peak_mb, self.in_use_mb)
+            return True
+
+    def acquire(self, memory_mb, check_cancelled=None, poll_interval=0.2):
+        """Tunggu sampai muat; check_cancelled() boleh melempar untuk membatalkan penantian."""
+        with self._condition:
+            while not self.try_acquire(memory_mb):
+                self._condition.wait(poll_interval)
+                if check_cancelled is not None:
+                    check_cancelled()
+
+    def release(self, memory_mb):
+        with self._condition:
+            self._holders -= 1
+            self.in_use_mb = self.in_use_mb - self._cost(memory_mb) if self._holders else 0.0
+            self._condition.notify_all()
+
+
+# --- STARTUP ---
+class StartupOrchestrator:
+    """Startup paralel: model dimuat bersamaan dengan validasi lisensi, UI tampil lebih dulu.
+
+    Status setiap komponen ("pending", "ready", "failed") dilacak terpisah dan
+    waktu startup (first_window, ready, first_result) dicatat ke MetricsRegistry.
+    """
+
+    COMPONENTS = ("license", "model")
+    LABELS = {"license": "Lisensi", "model": "Model AI"}
+
+    def __init__(self, metrics=None, model_name=DEFAULT_MODEL_NAME, session_manager=None):
+        self.metrics = metrics or MetricsRegistry()
+        self.model_name = model_name
+        self.session_manager = session_manager or SessionManager()
+        self.state = {component: "pending" for component in self.COMPONENTS}
+        self.model_future = None
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def start_model_loading(self):
+        """Mulai import rembg + new_session di thread daemon.
+
+        Thread daemon (bukan ThreadPoolExecutor) agar proses bisa keluar saat
+        jendela ditutup atau lisensi gagal di tengah download model pertama.
+        """
+        self.model_future = Future()
+
+        def load():
+            if not self.model_future.set_running_or_notify_cancel():
+                return
+            try:
+                self.model_future.set_result(self.session_manager.get(self.model_name))
+            except BaseException as e:
+                self.model_future.set_exception(e)
+
+        threading.Thread(target=load, name="model-loader", daemon=True).start()
+        self.model_future.add_done_callback(
+            lambda future: self.set_state("model", "failed" if future.exception() else "ready"))
+        return self.model_future
+
+    def add_listener(self, listener):
+        """listener(component, state); state yang sudah selesai langsung dikirim ulang."""
+        with self._lock:
+            self._listeners.append(listener)
+            finished = [(component, state) for component, state in self.state.items() if state != "pending"]
+        for component, state in finished:
+            listener(component, state)
+
+    def set_state(self, component, state):
+        with self._lock:
+            self.state[component] = state
+            listeners = list(self._listeners)
+        self.mark(f"{component}_{state}")
+        for listener in listeners:
+            listener(component, state)
+
+    @property
+    def ready(self):
+        return all(state == "ready" for state in self.state.values())
+
+    def status_text(self):
+        """Teks status per komponen untuk UI."""
+        icons = {"pending": "⏳", "ready": "✅", "failed": "❌"}
+        return "   ".join(f"{self.LABELS[component]} {icons[state]}" for component, state in self.state.items())
+
+    def mark(self, event):
+        """Catat waktu sejak proses mulai untuk satu event startup."""
+        seconds = time.perf_counter() - PROCESS_START
+        self.metrics.record_event(event, seconds)
+        print(f"Startup {event}: {seconds:.2f} seconds")
+
+
+# --- GUI JOB QUEUE ---
+class JobCancelled(Exception):
+    """Job dibatalkan oleh pengguna (pembatalan kooperatif di antara tahap)."""
+
+
+class Job:
+    """Satu gambar di antrian GUI: status, hasil, dan flag pembatalan."""
+
+    STATES = ("queued", "running", "done", "failed", "cancelled")
+    _ids = itertools.count(1)
+
+    def __init__(self, path, model_name, matting="off"):
+        self.id = next(self._ids)
+        self.path = path
+        self.model_name = model_name
+        self.matting = matting
+        self.state = "queued"
+        self.result = None  # (source_rgb, alpha, output_image_pil)
+        self.record = None
+        self.error = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def active(self):
+        return self.state in ("queued", "running")
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def check_cancelled(self):
+        """Dipanggil worker di antara tahap; hentikan job jika sudah dibatalkan."""
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+
+class JobScheduler:
+    """Pool worker terbatas untuk job GUI; perubahan status dikirim ke thread Tk via root.after.
+
+    process(job) dijalankan di worker dan mengembalikan hasil job. Hanya
+    max_retained job terakhir yang menyimpan hasil di memori.
+    """
+
+    def __init__(self, root, process, max_workers=2, on_update=None, max_retained=10):
+        self.root = root
+        self.process = process
+        self.on_update = on_update
+        self.jobs = OrderedDict()
+        self._retained = deque()
+        self.max_retained = max_retained
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gui-job")
+
+    def submit(self, path, model_name, matting="off"):
+        job = Job(path, model_name, matting)
+        self.jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        self._notify(job)
+        return job
+
+    def _run(self, job):
+        try:
+            job.check_cancelled()
+            job.state = "running"
+            self._notify(job)
+            job.result = self.process(job)
+            job.state = "done"
+        except JobCancelled:
+            job.state = "cancelled"
+        except Exception as e:
+            job.error = e
+            job.state = "failed"
+        self._notify(job)
+
+    def _notify(self, job):
+        if self.on_update:
+            # Kirim status saat ini; callback Tk bisa berjalan setelah job berubah lagi
+            state = job.state
+            self.root.after(0, lambda: self.on_update(job, state))
+
+    def retain(self, job):
+        """Dipanggil di thread Tk saat job selesai: buang hasil job lama di luar batas."""
+        self._retained.append(job)
+        while len(self._retained) > self.max_retained:
+            self._retained.popleft().result = None
+
+    def cancel(self, job_ids=None):
+        """Batalkan job tertentu (atau semua job aktif); job yang sedang jalan berhenti di tahap berikutnya."""
+        for job_id in (self.jobs if job_ids is None else job_ids):
+            job = self.jobs.get(job_id)
+            if job is not None and job.active:
+                job.cancel()
+
+    def clear(self):
+        self.cancel()
+        self.jobs.clear()
+        self._retained.clear()
+
+    @property
+    def active_count(self):
+        return sum(1 for job in self.jobs.values() if job.active)
+
+    def status_text(self):
+        running = sum(1 for job in self.jobs.values() if job.state == "running")
+        queued = sum(1 for job in self.jobs.values() if job.state == "queued")
+        return f"🤖 Memproses {running} gambar, {queued} dalam antrian..."
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# --- PREVIEW ---
+PREVIEW_CACHE_ITEMS = 32
+PREVIEW_MAX_SIDE = 1024  # Sisi terpanjang gambar dasar pratinjau
+
+
+def render_preview(image, alpha, max_side=PREVIEW_MAX_SIDE):
+    """Komposit transparan cepat di skala pratinjau, untuk tampilan progresif sebelum hasil penuh.
+
+    image boleh lebih kecil dari alpha (mis. gambar dasar PreviewEngine); alpha diskalakan ke ukurannya.
+    """
+    scale = min(1.0, max_side / max(image.size))
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    if image.mode not in ("RGB", "RGBA", "L"):
+        image = image.convert("RGB")
+    small = image.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0) if scale < 1 else image
+    small_alpha = Image.fromarray(alpha, "L").resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+    return render_variant(to_rgb_array(small), np.asarray(small_alpha), None)
+
+
+class PreviewEngine:
+    """Pratinjau cepat: decode langsung di skala kecil dan thumbnail dibuat di thread latar.
+
+    Gambar dasar seukuran pratinjau disimpan di LRU (referensi kuat), sehingga
+    render ulang saat jendela di-resize tidak membaca gambar asli lagi.
+    """
+
+    def __init__(self, root, max_items=PREVIEW_CACHE_ITEMS, max_side=PREVIEW_MAX_SIDE):
+        self.root = root
+        self.max_items = max_items
+        self.max_side = max_side
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._requests = {}  # label -> (token, source, key)
+        self._tokens = itertools.count(1)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preview")
+
+    def _load_base(self, source):
+        """Gambar dasar pratinjau; JPEG memakai draft (skala DCT), format lain Image.reduce."""
+        if isinstance(source, str):
+            with Image.open(source) as img:
+                # reducing_gap=1.0: draft JPEG sedekat mungkin ke ukuran target (decode 1/2, 1/4, 1/8)
+                img.thumbnail((self.max_side, self.max_side), Image.Resampling.LANCZOS, reducing_gap=1.0)
+                img = ImageOps.exif_transpose(img)
+        else:
+            scale = min(1.0, self.max_side / max(source.size))
+            size = (max(1, round(source.width * scale)), max(1, round(source.height * scale)))
+            # resize() membuat gambar baru; sumber penuh tidak perlu di-copy
+            img = source.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0) if scale < 1 else source.copy()
+        return img
+
+    @staticmethod
+    def file_key(path):
+        return ("file", path, os.stat(path).st_mtime_ns)
+
+    def base_image(self, source, key=None):
+        """Gambar dasar dari LRU atau dimuat ulang; key None berarti tidak di-cache."""
+        if key is None:
+            return self._load_base(source)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        img = self._load_base(source)
+        with self._lock:
+            self._cache[key] = img
+            while len(self._cache) > self.max_items:
+                self._cache.popitem(last=False)
+        return img
+
+    def render(self, label, source, key=None):
+        """Tampilkan source (path atau PIL Image) di label tanpa memblokir thread Tk."""
+        if isinstance(source, str) and key is None:
+            key = self.file_key(source)
+        token = next(self._tokens)
+        self._requests[label] = (token, source, key)
+        # Get label dimensions
+        width = max(1, (label.winfo_width() or 400) - 20)
+        height = max(1, (label.winfo_height() or 400) - 20)
+        self._executor.submit(self._render, label, token, source, key, (width, height))
+
+    def _render(self, label, token, source, key, size):
+        try:
+            display_img = self.base_image(source, key).copy()
+            display_img.thumbnail(size, Image.Resampling.LANCZOS)
+        except Exception as e:
+            error = e
+            self.root.after(0, lambda: self._apply_error(label, token, error))
+            return
+        self.root.after(0, lambda: self._apply(label, token, display_img))
+
+    def _apply(self, label, token, display_img):
+        if self._requests.get(label, (None,))[0] != token:
+            return  # Sudah ada permintaan yang lebih baru untuk label ini
+        # PhotoImage harus dibuat di thread Tk
+        photo_img = ImageTk.PhotoImage(display_img)
+        label.config(image=photo_img, text="")
+        label.image = photo_img  # Keep reference
+
+    def _apply_error(self, label, token, error):
+        if self._requests.get(label, (None,))[0] == token:
+            label.config(image='', text=f"Gagal memuat pratinjau:\n{error}")
+
+    def refresh(self, label):
+        """Render ulang pratinjau terakhir label dengan ukuran label saat ini (dari cache)."""
+        request = self._requests.get(label)
+        if request is not None:
+            _, source, key = request
+            self.render(label, source, key)
+
+    def forget(self, label):
+        """Abaikan render yang masih berjalan untuk label (mis. label dikosongkan)."""
+        self._requests.pop(label, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+        self._requests.clear()
+
+
+class BackgroundRemoverApp:
+    """Optimized Background Remover Application."""
+    
+    def __init__(self, root, startup=None):
+        self.root = root
+        self.root.title("✨ AI Background Remover Pro")
+        self.root.geometry("900x700")
+        self.root.minsize(800, 600)
+
+        # Initialize variables
+        self.input_path = None
+        self.output_image_pil = None
+        self.source_rgb = None
+        self.output_alpha = None
+        self.preview = PreviewEngine(root)
+        self.mask_cache = self._create_mask_cache()
+        self._first_result_reported = False
+
+        # Startup paralel: model mungkin sudah dimuat sejak sebelum jendela dibuat
+        if startup is None:
+            startup = StartupOrchestrator()
+            startup.start_model_loading()
+        self.startup = startup
+        self.model_name = startup.model_name
+        self.metrics = startup.metrics
+        self.session_manager = startup.session_manager
+        self.memory_budget = MemoryBudget(default_memory_budget_mb())
+        self.scheduler = JobScheduler(root, self.process_job, on_update=self.on_job_update)
+        self.export_engine = ExportEngine(metrics=self.metrics)
+        self._live_job_id = None  # Job yang progresnya sedang ditampilkan
+
+        # Set icon dengan error handling
+        self._set_icon()
+        
+        # Lazy load AI model
+        self._initialize_ai_model()
+        
+        # Create UI
+        self.create_widgets()
+        self.toggle_controls(processing=False)
+        self.root.after_idle(lambda: self.startup.mark("first_window"))
+
+    def _set_icon(self):
+        """Set application icon dengan error handling."""
+        try:
+            icon_path = self.get_resource_path('icon.ico')
+            self.root.iconbitmap(icon_path)
+        except Exception as e:
+            print(f"Icon not found: {e}")
+
+    def _create_mask_cache(self):
+        """Cache mask di disk; aplikasi tetap jalan tanpa cache jika gagal."""
+        try:
+            return MaskCache()
+        except OSError as e:
+            print(f"Mask cache disabled: {e}")
+            return None
+
+    def _initialize_ai_model(self):
+        """Initialize AI model dengan progress feedback."""
+        # Show loading status per komponen
+        self.status_label_temp = ttk.Label(self.root, 
+            text=self.startup.status_text(), font=("Segoe UI", 12))
+        self.status_label_temp.pack(pady=20)
+
+        # Listener dipanggil dari thread loader; pindahkan ke thread Tk
+        self.startup.add_listener(
+            lambda component, state: self.root.after(0, lambda: self._on_component_state(component, state)))
+
+    def _on_component_state(self, component, state):
+        """Update UI ketika lisensi/model selesai disiapkan."""
+        if component == "model" and state == "failed":
+            error_msg = (f"Gagal memuat model AI: {self.startup.model_future.exception()}\n\n"
+                       "Aplikasi memerlukan koneksi internet saat pertama kali dijalankan "
+                       "untuk mengunduh model. Silakan periksa koneksi Anda dan coba lagi.")
+            messagebox.showerror("Model AI Error", error_msg)
+            self.root.destroy()
+            return
+        if self.startup.ready:
+            self._on_model_loaded()
+        elif hasattr(self, 'status_label_temp'):
+            self.status_label_temp.config(text=self.startup.status_text())
+
+    def _on_model_loaded(self):
+        """Callback ketika model AI dan lisensi siap."""
+        if hasattr(self, 'status_label_temp'):
+            self.status_label_temp.destroy()
+            del self.status_label_temp
+        self.startup.mark("ready")
+        self.toggle_controls(processing=False, has_result=self.output_image_pil is not None)
+
+    def check_license(self, license_manager):
+        """Validasi lisensi setelah jendela tampil; model terus dimuat paralel."""
+        def on_done(is_valid):
+            if is_valid:
+                self.startup.set_state("license", "ready")
+            else:
+                self.startup.set_state("license", "failed")
+                self.root.destroy()
+
+        license_manager.validate_async(on_done)
+
+    @lru_cache(maxsize=1)
+    def get_resource_path(self, relative_path):
+        """Cached resource path."""
+        try:
+            base_path = sys._MEIPASS
+        except Exception:
+            base_path = os.path.abspath(".")
+        return os.path.join(base_path, relative_path)
+
+    def create_widgets(self):
+        """Optimized widget creation."""
+        # Use single main frame
+        main_frame = ttk.Frame(self.root, padding=20)
+        main_frame.pack(fill=BOTH, expand=True)
+
+        # Create all sections
+        self.create_header(main_frame)
+        self.create_preview_panels(main_frame)
+        self.create_queue_panel(main_frame)
+        self.create_control_buttons(main_frame)
+        self.create_status_bar(main_frame)
+
+    def create_header(self, parent):
+        """Optimized header creation."""
+        header_frame = ttk.Frame(parent)
+        header_frame.pack(fill=X, pady=(0, 20))
+        
+        # Use single configuration call
+        title_label = ttk.Label(header_frame, 
+            text="🎨 AI Background Remover Pro", 
+            font=("Segoe UI", 24, "bold"), 
+            bootstyle="light")
+        title_label.pack()
+        
+        subtitle_label = ttk.Label(header_frame,
+            text="Hapus background gambar dengan satu klik, didukung oleh AI.",
+            font=("Segoe UI", 11),
+            bootstyle="light")
+        subtitle_label.pack(pady=(5,0))
+        
+        ttk.Separator(header_frame, orient=HORIZONTAL).pack(fill=X, pady=15)
+
+    def create_preview_panels(self, parent):
+        """Optimized preview panels dengan lazy loading."""
+        preview_container = ttk.Frame(parent)
+        preview_container.pack(fill=BOTH, expand=True, pady=(0, 20))
+        preview_container.columnconfigure((0, 1), weight=1)
+        preview_container.rowconfigure(0, weight=1)
+
+        # Original image panel
+        original_card = ttk.LabelFrame(preview_container, 
+            text="📸 Gambar Asli", padding=15, bootstyle="primary")
+        original_card.grid(row=0, column=0, padx=(0, 10), sticky="nsew")
+        original_card.rowconfigure(0, weight=1)
+        original_card.columnconfigure(0, weight=1)
+        
+        self.original_label = ttk.Label(original_card,
+            text="Klik 'Pilih Gambar'\nuntuk memulai\n\n🖼️",
+            font=("Segoe UI", 12),
+            bootstyle="secondary",
+            anchor="center",
+            justify="center")
+        self.original_label.grid(row=0, column=0, sticky="nsew")
+        self.original_label.bind("<Configure>", self._on_preview_resize)
+
+        # Result image panel
+        result_card = ttk.LabelFrame(preview_container,
+            text="✨ Hasil Tanpa Background", padding=15, bootstyle="success")
+        result_card.grid(row=0, column=1, padx=(10, 0), sticky="nsew")
+        result_card.rowconfigure(0, weight=1)
+        result_card.columnconfigure(0, weight=1)
+        
+        self.result_label = ttk.Label(result_card,
+            text="Hasil akan muncul di sini\nsetelah diproses\n\n🤖",
+            font=("Segoe UI", 12),
+            bootstyle="secondary",
+            anchor="center",
+            justify="center")
+        self.result_label.grid(row=0, column=0, sticky="nsew")
+        self.result_label.bind("<Configure>", self._on_preview_resize)
+
+    def create_control_buttons(self, parent):
+        """Optimized control buttons."""
+        control_frame = ttk.Frame(parent)
+        control_frame.pack(fill=X, pady=(0, 15))
+
+        # Create buttons dengan single call
+        button_configs = [
+            ("🎯 Tambah Gambar", self.select_image, "primary", 20),
+            ("💾 Simpan Hasil", self.save_image, "success", 20),
+            ("🔄 Reset", self.reset_app, "warning-outline", 15)
+        ]
+
+        self.btn_select, self.btn_save, self.btn_reset = [], [], []
+        buttons = []
+        
+        for text, command, style, width in button_configs:
+            btn = ttk.Button(control_frame, text=text, command=command, 
+                           bootstyle=style, width=width, padding=10)
+            btn.pack(side=LEFT, expand=True, padx=5)
+            buttons.append(btn)
+        
+        self.btn_select, self.btn_save, self.btn_reset = buttons
+        self.btn_save.config(state="disabled")
+        self.create_export_menu(control_frame)
+
+        # Pilihan model; model yang pernah dipakai tetap hangat di SessionManager
+        self.model_var = tk.StringVar(value=self.model_name)
+        self.model_combo = ttk.Combobox(control_frame, textvariable=self.model_var,
+            values=MODEL_CHOICES, state="readonly", width=22)
+        self.model_combo.pack(side=LEFT, padx=5)
+        self.model_combo.bind("<<ComboboxSelected>>", self.on_model_selected)
+
+        # Kualitas matting tepi (rambut/bulu); "off" = mask model apa adanya
+        ttk.Label(control_frame, text="Matting:").pack(side=LEFT, padx=(10, 0))
+        self.matting_var = tk.StringVar(value="off")
+        self.matting_combo = ttk.Combobox(control_frame, textvariable=self.matting_var,
+            values=MATTING_CHOICES, state="readonly", width=9)
+        self.matting_combo.pack(side=LEFT, padx=5)
+
+    def on_model_selected(self, event=None):
+        """Ganti model; session dimuat saat gambar berikutnya diproses."""
+        self.model_name = self.model_var.get()
+        if self.session_manager.is_loaded(self.model_name):
+            self.status_label.config(text=f"🧠 Model {self.model_name} siap.")
+        else:
+            self.status_label.config(
+                text=f"🧠 Model {self.model_name} akan dimuat saat gambar berikutnya diproses.")
+
+    def create_status_bar(self, parent):
+        """Optimized status bar."""
+        status_frame = ttk.LabelFrame(parent, text="📊 Status", padding=10, bootstyle="info")
+        status_frame.pack(fill=X)
+
+        self.status_label = ttk.Label(status_frame,
+            text="🚀 Selamat datang! Pilih gambar untuk memulai.",
+            font=("Segoe UI", 11))
+        self.status_label.pack(side=LEFT, fill=X, expand=True)
+
+        # Histogram waktu proses (p50/p95/p99) dari MetricsRegistry
+        self.metrics_label = ttk.Label(status_frame, text="",
+            font=("Segoe UI", 9), bootstyle="secondary")
+        self.metrics_label.pack(side=RIGHT)
+
+        self.progress_bar = ttk.Progressbar(status_frame, 
+            mode='indeterminate', bootstyle="info-striped")
+
+    def create_queue_panel(self, parent):
+        """Panel antrian job: status per gambar, klik baris untuk melihat hasilnya."""
+        queue_frame = ttk.LabelFrame(parent, text="📋 Antrian", padding=10, bootstyle="secondary")
+        queue_frame.pack(fill=X, pady=(0, 15))
+
+        self.queue_tree = ttk.Treeview(queue_frame, columns=("file", "status", "time"),
+            show="headings", height=4, selectmode="extended")
+        for column, heading, width in (("file", "File", 420), ("status", "Status", 120), ("time", "Waktu", 90)):
+            self.queue_tree.heading(column, text=heading)
+            self.queue_tree.column(column, width=width, stretch=column == "file")
+        self.queue_tree.pack(side=LEFT, fill=X, expand=True)
+        self.queue_tree.bind("<<TreeviewSelect>>", self.on_job_selected)
+
+        self.btn_cancel = ttk.Button(queue_frame, text="⛔ Batalkan", command=self.cancel_jobs,
+            bootstyle="danger-outline", width=12)
+        self.btn_cancel.pack(side=RIGHT, padx=(10, 0))
+
+    def select_image(self):
+        """Pilih satu atau beberapa gambar; semuanya masuk antrian tanpa menunggu job lain."""
+        file_paths = filedialog.askopenfilenames(
+            title="Pilih gambar",
+            filetypes=[
+                ("Image files", "*.jpg *.jpeg *.png *.webp *.bmp *.tiff"),
+                ("All files", "*.*")
+            ]
+        )
+        
+        if not file_paths:
+            return
+
+        rejected = []
+        for file_path in file_paths:
+            # Validate file extension
+            file_ext = os.path.splitext(file_path.lower())[1]
+            if file_ext not in SUPPORTED_FORMATS:
+                rejected.append(f"{os.path.basename(file_path)}: format {file_ext} tidak didukung")
+                continue
+
+            # Validate file size (max 50MB)
+            try:
+                file_size = os.path.getsize(file_path) / (1024 * 1024)  # MB
+            except Exception as e:
+                rejected.append(f"{os.path.basename(file_path)}: tidak dapat membaca file ({e})")
+                continue
+            if file_size > MAX_FILE_SIZE_MB:
+                rejected.append(f"{os.path.basename(file_path)}: {file_size:.1f}MB, maksimal {MAX_FILE_SIZE_MB}MB")
+                continue
+
+            self.scheduler.submit(file_path, self.model_name, self.matting_var.get())
+
+        if rejected:
+            messagebox.showwarning("Sebagian File Dilewati",
+                "File berikut tidak diproses:\n" + "\n".join(rejected) +
+                f"\n\nFormat yang didukung: {', '.join(SUPPORTED_FORMATS)}")
+
+    def cancel_jobs(self):
+        """Batalkan job terpilih di antrian, atau semua job aktif jika tidak ada yang dipilih."""
+        selected = [int(item) for item in self.queue_tree.selection()]
+        self.scheduler.cancel(selected or None)
+
+    def process_job(self, job):
+        """Background removal untuk satu job (dijalankan di worker pool).
+
+        Admission control: perkiraan memori dari header file; job menunggu
+        sampai muat di budget, gambar yang terlalu besar memakai jalur proxy.
+        """
+        memory_mb, low_memory = plan_admission(read_image_size(job.path), self.memory_budget.budget_mb,
+                                               strip_output=False)
+        self.memory_budget.acquire(memory_mb, job.check_cancelled)
+        try:
+            return self._process_job(job, low_memory)
+        finally:
+            self.memory_budget.release(memory_mb)
+
+    def _process_job(self, job, low_memory):
+        timer = StageTimer(os.path.basename(job.path))
+
+        # Read file dengan buffer optimization
+        with timer.stage("read"):
+            with open(job.path, 'rb') as f:
+                input_bytes = f.read()
+
+        # Mask dari cache disk bila file yang sama pernah diproses
+        with timer.stage("decode"):
+            image = load_image(input_bytes)
+        job.check_cancelled()
+        # Model lain dimuat/diambil dari pool LRU di thread ini, bukan di thread Tk
+        with timer.stage("session"):
+            session = self.session_manager.get(job.model_name)
+        job.check_cancelled()
+
+        def publish_preview(preview_image, preview_alpha):
+            # Pratinjau progresif: tampil segera setelah inference, sebelum komposit penuh
+            with timer.stage("preview"):
+                preview = render_preview(preview_image, preview_alpha)
+            latency = timer.elapsed()
+            self.root.after(0, lambda: self.on_job_preview(job, preview, latency))
+
+        if low_memory:
+            # Segmentasi pada proxy, mask di-upsample dengan refinement edge-aware
+            alpha = compute_adaptive_mask(input_bytes, image, session, job.model_name,
+                                          cache=self.mask_cache, timer=timer, on_proxy=publish_preview)
+        else:
+            alpha = compute_mask(input_bytes, image, session, job.model_name, cache=self.mask_cache, timer=timer)
+            # Gambar dasar pratinjau asli biasanya sudah ada di LRU, jadi tidak perlu resize gambar penuh
+            publish_preview(self.preview.base_image(job.path, PreviewEngine.file_key(job.path)), alpha)
+        job.check_cancelled()
+        source_rgb = to_rgb_array(image)
+
+        if job.matting != "off":
+            # Matting hanya di band tepi; pratinjau cepat di atas sudah tampil
+            with timer.stage("matting"):
+                alpha = refine_alpha(source_rgb, alpha, job.matting)
+            job.check_cancelled()
+
+        # Simpan buffer asli + mask; semua komposit (PNG, JPEG putih, dst.) dibuat dari sini
+        with timer.stage("composite"):
+            output_image_pil = render_variant(source_rgb, alpha, None)
+
+        job.record = timer.finish()
+        self.metrics.record(job.record)
+        print(f"Processing time: {job.record['total']:.2f} seconds "
+              f"({format_stages(job.record['stages'])})")
+        return source_rgb, alpha, output_image_pil
+
+    def on_job_preview(self, job, preview, latency):
+        """Tampilkan pratinjau cepat job yang sedang diikuti; hasil penuh menyusul."""
+        if job.id not in self.scheduler.jobs or self._live_job_id not in (None, job.id) or not job.active:
+            return
+        if self._live_job_id is None:
+            self._follow_job(job)
+        self.display_image(self.result_label, preview, key=("preview", job.id))
+        self.status_label.config(
+            text=f"👀 Pratinjau siap dalam {latency:.2f} detik, menyempurnakan hasil resolusi penuh...")
+        print(f"Preview latency: {latency:.2f} seconds")
+
+    JOB_STATUS_TEXT = {"queued": "⏳ Antri", "running": "🤖 Diproses", "done": "✅ Selesai",
+                       "failed": "❌ Gagal", "cancelled": "⛔ Dibatalkan"}
+
+    def on_job_update(self, job, state):
+        """Callback di thread Tk untuk setiap perubahan status job."""
+        if job.id not in self.scheduler.jobs:
+            return  # Job sudah dihapus oleh reset
+        item = str(job.id)
+        elapsed = f"{job.record['total']:.2f}s" if state == "done" else ""
+        values = (os.path.basename(job.path), self.JOB_STATUS_TEXT[state], elapsed)
+        if self.queue_tree.exists(item):
+            self.queue_tree.item(item, values=values)
+        else:
+            self.queue_tree.insert("", END, iid=item, values=values)
+
+        if state == "done":
+            self.scheduler.retain(job)
+            # Jangan timpa job lain yang sedang diikuti; hasil ini tetap bisa dipilih di antrian
+            if self._live_job_id in (None, job.id):
+                self.show_job(job)
+                self.update_ui_after_processing()
+        elif state == "failed":
+            self.status_label.config(text=f"❌ Gagal memproses {os.path.basename(job.path)}: {job.error}")
+        elif state == "running" and self._live_job_id is None:
+            self._follow_job(job)
+        if state in ("done", "failed", "cancelled") and self._live_job_id == job.id:
+            self._live_job_id = None
+            if state != "done":
+                self.preview.forget(self.result_label)
+                self.result_label.config(image='', text=f"{self.JOB_STATUS_TEXT[state]}\n\n🤖")
+
+        if state in ("queued", "running"):
+            self.status_label.config(text=self.scheduler.status_text())
+        self.toggle_controls(processing=self.scheduler.active_count > 0,
+                             has_result=self.output_image_pil is not None)
+
+    def _follow_job(self, job):
+        """Ikuti job secara langsung di panel pratinjau: asli, pratinjau cepat, lalu hasil penuh."""
+        self._live_job_id = job.id
+        self.reset_app_state()
+        self.display_image(self.original_label, job.path)
+        self.preview.forget(self.result_label)
+        self.result_label.config(image='', text="Memproses...\n\n⏳")
+
+    def on_job_selected(self, event=None):
+        """Tampilkan hasil job yang dipilih di antrian."""
+        selection = self.queue_tree.selection()
+        job = self.scheduler.jobs.get(int(selection[-1])) if selection else None
+        if job is None or job.state != "done":
+            return
+        if job.result is None:
+            self.status_label.config(text="ℹ️ Hasil sudah dilepas dari memori, pilih gambar lagi untuk memproses ulang.")
+            return
+        self.show_job(job)
+
+    def show_job(self, job):
+        """Jadikan hasil job sebagai pratinjau aktif (hanya di thread Tk, tidak ada race antar worker)."""
+        self.input_path = job.path
+        self.source_rgb, self.output_alpha, self.output_image_pil = job.result
+        self.display_image(self.original_label, job.path)
+        self.display_image(self.result_label, self.output_image_pil, key=("result", job.id))
+        self.toggle_controls(processing=self.scheduler.active_count > 0, has_result=True)
+
+    def update_ui_after_processing(self):
+        """Optimized UI update setelah processing."""
+        if self.output_image_pil:
+            self.status_label.config(text="✅ Berhasil! Pratinjau siap. Silakan simpan gambar.")
+            self.metrics_label.config(text=self.metrics.status_text())
+            if not self._first_result_reported:
+                self._first_result_reported = True
+                self.startup.mark("first_result")
+            self.metrics.flush()
+
+    def create_export_menu(self, parent):
+        """Menu opsi export: format tambahan, versi web, dan trade-off kecepatan/ukuran."""
+        self.export_button = ttk.Menubutton(parent, text="⚙️ Export", bootstyle="success-outline")
+        menu = tk.Menu(self.export_button, tearoff=False)
+        self.export_button["menu"] = menu
+
+        menu.add_command(label="Format tambahan:", state="disabled")
+        self.export_extra_vars = {}
+        for extension, label in ((".png", "PNG transparan"), (".jpg", "JPEG latar putih"), (".webp", "WebP lossless")):
+            self.export_extra_vars[extension] = tk.BooleanVar(value=False)
+            menu.add_checkbutton(label=label, variable=self.export_extra_vars[extension])
+        self.export_web_var = tk.BooleanVar(value=False)
+        menu.add_checkbutton(label=f"Versi web (maks {WEB_EXPORT_MAX_SIDE}px)", variable=self.export_web_var)
+
+        menu.add_separator()
+        menu.add_command(label="Kompresi PNG / WebP:", state="disabled")
+        self.export_preset_var = tk.IntVar(value=1)
+        for index, (label, level, method) in enumerate(EXPORT_PRESETS):
+            menu.add_radiobutton(label=f"{label} (PNG level {level}, WebP method {method})",
+                                 variable=self.export_preset_var, value=index)
+        self.export_button.pack(side=LEFT, padx=5)
+
+    def export_specs(self, save_path):
+        """File yang ditulis untuk satu kali simpan: pilihan utama + format tambahan + versi web."""
+        _, png_level, webp_method = EXPORT_PRESETS[self.export_preset_var.get()]
+        base_path, primary_extension = os.path.splitext(save_path)
+        primary_extension = primary_extension.lower()
+        extensions = [primary_extension] + [extension for extension, var in self.export_extra_vars.items()
+                                            if var.get() and EXPORT_FORMATS[extension] != EXPORT_FORMATS.get(primary_extension)]
+        paths = [(save_path, None)] + [(base_path + extension, None) for extension in extensions[1:]]
+        if self.export_web_var.get():
+            paths += [(f"{base_path}_web{extension}", WEB_EXPORT_MAX_SIDE) for extension in extensions]
+        return [ExportSpec(path, max_side, png_level, webp_method) for path, max_side in paths]
+
+    def save_image(self):
+        """Simpan hasil ke satu atau beberapa format; encode berjalan di ExportEngine, bukan di thread Tk."""
+        if not self.output_image_pil:
+            messagebox.showwarning("Simpan Gagal", "Tidak ada gambar hasil untuk disimpan.")
+            return
+
+        # Generate default filename
+        file_name = os.path.basename(self.input_path)
+        base_name, _ = os.path.splitext(file_name)
+        output_filename = f"{base_name}_no_bg.png"
+
+        save_path = filedialog.asksaveasfilename(
+            title="Simpan Hasil Sebagai...",
+            initialfile=output_filename,
+            defaultextension=".png",
             filetypes=[
-                ("Image files", "*.jpg *.jpeg *.png *.webp *.bmp *.tiff"),
-                ("All files", "*.*")
+                ("PNG Image", "*.png"),
+                ("JPEG Image", "*.jpg"),
+                ("WebP Image", "*.webp")
             ]
         )
         
-        if not file_path:
+        if not save_path:
+            return
+        try:
+            specs = self.export_specs(save_path)
+        except ValueError as e:
+            messagebox.showerror("Save Error", str(e))
+            return
+
+        futures = self.export_engine.export(self.source_rgb, self.output_alpha, specs)
+        self.status_label.config(text=f"💾 Menyimpan {len(specs)} file...")
+        reported = []
+
+        def on_done(_):
+            self.root.after(0, check_done)
+
+        def check_done():
+            if reported or not all(future.done() for future in futures):
+                return
+            reported.append(True)
+            self._on_export_done(futures)
+
+        for future in futures:
+            future.add_done_callback(on_done)
+
+    def _on_export_done(self, futures):
+        """Laporkan hasil export (dipanggil di thread Tk)."""
+        saved, errors = [], []
+        for future in futures:
+            try:
+                saved.append(future.result())
+            except Exception as e:
+                errors.append(str(e))
+        if errors:
+            messagebox.showerror("Save Error", "Gagal menyimpan file:\n" + "\n".join(errors))
+        if saved:
+            lines = [f"{os.path.basename(path)} ({seconds:.2f} detik)" for path, seconds in saved]
+            print("Export: " + ", ".join(lines))
+            messagebox.showinfo("Sukses", f"Gambar berhasil disimpan di:\n{os.path.dirname(saved[0][0])}\n\n"
+                                + "\n".join(lines))
+            self.status_label.config(text=f"Gambar disimpan di {os.path.basename(saved[0][0])}")
+        self.metrics.flush()
+
+    def display_image(self, label, image_source, key=None):
+        """Pratinjau di label; decode dan thumbnail dikerjakan PreviewEngine di thread latar."""
+        try:
+            self.preview.render(label, image_source, key)
+        except Exception as e:
+            label.config(image='', text=f"Gagal memuat pratinjau:\n{e}")
+
+    def _on_preview_resize(self, event):
+        """Render ulang pratinjau setelah resize selesai (debounce), dari cache ukuran pratinjau."""
+        label = event.widget
+        size = (event.width, event.height)
+        if getattr(label, "_preview_size", None) == size:
             return
+        label._preview_size = size
+        if getattr(label, "_resize_job", None):
+            self.root.after_cancel(label._resize_job)
+        label._resize_job = self.root.after(150, lambda: self.preview.refresh(label))
+
+    def toggle_controls(self, processing: bool, has_result: bool = False):
+        """Optimized control state management; gambar baru tetap bisa ditambahkan saat job berjalan."""
+        if processing:
+            # Show progress
+            if not self.progress_bar.winfo_ismapped():
+                self.progress_bar.pack(side=RIGHT, padx=(10, 0))
+                self.progress_bar.start(10)  # Faster animation
+        else:
+            # Stop progress
+            self.progress_bar.stop()
+            self.progress_bar.pack_forget()
+
+        # Pilih gambar hanya aktif setelah lisensi dan model siap
+        self.btn_select.config(state="normal" if self.startup.ready else "disabled")
+        self.btn_reset.config(state="normal")
+        self.btn_save.config(state="normal" if has_result else "disabled")
+
+    def reset_app(self):
+        """Optimized app reset: batalkan semua job dan kosongkan antrian."""
+        self.scheduler.clear()
+        self._live_job_id = None
+        self.queue_tree.delete(*self.queue_tree.get_children())
+        self.reset_app_state()
+        
+        # Reset UI elements
+        self.original_label.config(image='', text="Klik 'Pilih Gambar'\nuntuk memulai\n\n🖼️")
+        self.original_label.image = None
+        self.result_label.config(image='', text="Hasil akan muncul di sini\nsetelah diproses\n\n🤖")
+        self.result_label.image = None
+        self.status_label.config(text="🚀 Selamat datang! Pilih gambar untuk memulai.")
+        
+        # Reset controls
+        self.toggle_controls(processing=False, has_result=False)
+        
+        # Clear preview cache
+        self.preview.clear()
+
+    def reset_app_state(self):
+        """Clean internal app state."""
+        self.input_path = None
+        self.output_image_pil = None
+        self.source_rgb = None
+        self.output_alpha = None
+        self.btn_save.config(state="disabled")
+
+
+# --- HEADLESS BATCH MODE ---
+_worker_session = None
+_worker_cache = None
+_worker_large_image = None
+_worker_matting = "off"
+
+
+def collect_input_files(source):
+    """Kumpulkan file gambar yang didukung dari direktori, pola glob, atau daftar path."""
+    if isinstance(source, (list, tuple)):
+        # Daftar eksplisit (mis. shard): file yang hilang tetap dikirim agar tercatat gagal
+        return [path for path in source if os.path.splitext(path.lower())[1] in SUPPORTED_FORMATS]
+    if os.path.isdir(source):
+        candidates = [os.path.join(source, name) for name in os.listdir(source)]
+    else:
+        candidates = glob.glob(source, recursive=True)
+    return sorted(path for path in candidates
+                  if os.path.isfile(path) and os.path.splitext(path.lower())[1] in SUPPORTED_FORMATS)
+
+
+def output_path_for(input_path, output_dir, suffix="_no_bg", ext=".png"):
+    """Nama file hasil, konsisten dengan default di save_image."""
+    base_name, _ = os.path.splitext(os.path.basename(input_path))
+    return os.path.join(output_dir, f"{base_name}{suffix}{ext}")
+
+
+def _init_batch_worker(model_name, runtime_options, cache_dir, cache_size_mb, large_image, matting="off"):
+    """Initializer worker process: setiap proses memegang session sendiri."""
+    global _worker_session, _worker_cache, _worker_large_image, _worker_matting
+    _worker_session = create_session(model_name, runtime_options)
+    _worker_large_image = large_image
+    _worker_matting = matting
+    if cache_dir:
+        _worker_cache = MaskCache(cache_dir, cache_size_mb * 1024 * 1024)
+
+
+def atomic_save(image, output_path, format, **params):
+    """Simpan gambar ke file sementara lalu os.replace, agar tidak ada output setengah jadi."""
+    temp_file = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        image.save(temp_file, format, **params)
+        os.replace(temp_file, output_path)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    return output_path
+
+
+def save_variant(variant_image, input_path, output_dir, name):
+    """Simpan satu varian: transparan sebagai PNG, latar solid/gambar sebagai JPEG."""
+    if variant_image.mode == 'RGBA':
+        return atomic_save(variant_image, output_path_for(input_path, output_dir, f"_{name}", ".png"), 'PNG')
+    return atomic_save(variant_image, output_path_for(input_path, output_dir, f"_{name}", ".jpg"),
+                       'JPEG', quality=95)
+
+
+class BatchJournal:
+    """Journal JSON-lines per file (pending/running/done/failed) untuk melanjutkan batch yang terhenti.
+
+    Entri terakhir untuk setiap path yang berlaku. File dianggap selesai hanya
+    jika ukuran/mtime (atau hash) input, konfigurasi job, dan semua output masih cocok.
+    """
+
+    FILE_NAME = ".removebg-journal.jsonl"
+
+    def __init__(self, path, config):
+        self.path = path
+        self.config = config
+        self.entries = {}
+        if os.path.exists(path):
+            self._load()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def read_entries(path):
+        """{path input: entri terakhir} dari file journal, tanpa membuka untuk ditulis."""
+        entries = {}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Baris terakhir terpotong saat crash
+                entries[entry["path"]] = entry
+        return entries
+
+    def _load(self):
+        self.entries = self.read_entries(self.path)
+        # Compact: tulis ulang satu entri per file secara atomic
+        temp_file = self.path + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(temp_file, self.path)
+
+    @staticmethod
+    def file_hash(input_path):
+        with open(input_path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def is_done(self, input_path):
+        """True jika file sudah diproses dengan input dan konfigurasi yang sama."""
+        entry = self.entries.get(os.path.abspath(input_path))
+        if not entry or entry["state"] != "done" or entry.get("config") != self.config:
+            return False
+        if not all(os.path.exists(path) for path in entry.get("outputs", [])):
+            return False
+        try:
+            stat = os.stat(input_path)
+            if entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+                return True
+            return entry.get("hash") == self.file_hash(input_path)
+        except OSError:
+            return False  # Input hilang: diproses ulang dan tercatat gagal
+
+    def record(self, input_path, state, input_hash=None, outputs=None, error=None):
+        """Tambahkan entri; input yang sudah dihapus tetap tercatat (tanpa size/mtime)."""
+        path = os.path.abspath(input_path)
+        try:
+            stat = os.stat(input_path)
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        except OSError:
+            size = mtime_ns = None
+        entry = {"path": path, "state": state, "size": size, "mtime_ns": mtime_ns,
+                 "hash": input_hash or self.entries.get(path, {}).get("hash"), "config": self.config,
+                 "time": datetime.now().isoformat(timespec="seconds")}
+        if outputs is not None:
+            entry["outputs"] = [os.path.abspath(output) for output in outputs]
+        if error is not None:
+            entry["error"] = error
+        self.entries[path] = entry
+        self._file.write(json.dumps(entry) + "\n")
+        if state in ("done", "failed"):
+            # Hanya status akhir yang perlu tahan crash; "running" cukup di buffer
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_variant_writer(input_path, output_dir, name, background, size):
+    """Writer strip untuk gambar besar: PNG streaming (transparan) atau JPEG."""
+    width, height = size
+    if background is None:
+        return StreamingPNGWriter(output_path_for(input_path, output_dir, f"_{name}", ".png"), width, height, 4)
+    return ArrayJPEGWriter(output_path_for(input_path, output_dir, f"_{name}", ".jpg"), width, height)
+
+
+def _process_large_file(input_bytes, image, input_path, output_dir, model_name, variants, timer):
+    """Gambar besar: inference pada proxy, lalu komposit dan encode strip demi strip.
+
+    Alpha matting tidak dijalankan di sini; _process_batch_file menandai
+    record dengan matting_skipped agar run_batch melaporkannya.
+
+    Puncak memori tetap O(W x H): decode RGB penuh (4 B/px di PIL) ditambah satu
+    buffer H x W x 3 per varian JPEG; yang dihemat adalah alpha, RGBA, dan buffer
+    encode PNG. estimate_job_memory_mb(low_memory=True) menghitung biaya ini.
+    """
+    proxy_side = _worker_large_image["proxy_side"]
+    with timer.stage("proxy"):
+        proxy = load_proxy(input_bytes, proxy_side)
+    proxy_alpha = compute_mask(input_bytes, proxy, _worker_session, model_name, cache=_worker_cache,
+                               timer=timer, options={"proxy_side": proxy_side})
+    del proxy
+
+    writers = [open_variant_writer(input_path, output_dir, name, background, image.size)
+               for name, background in variants]
+    try:
+        strips = iter_adaptive_strips(image, proxy_alpha, _worker_large_image["tile_rows"])
+        while True:
+            with timer.stage("refine"):
+                strip = next(strips, None)
+            if strip is None:
+                break
+            start, stop, rgb, alpha = strip
+            for writer, (_, background) in zip(writers, variants):
+                with timer.stage("composite"):
+                    result = composite_variant(rgb, alpha, background, image.size, (start, stop))
+                with timer.stage("encode"):
+                    writer.write(result)
+        with timer.stage("encode"):
+            return [writer.close() for writer in writers]
+    except BaseException:
+        for writer in writers:
+            writer.abort()
+        raise
+
+
+def _process_batch_file(input_path, output_dir, model_name, variants, mask_in=None, mask_out=None,
+                        low_memory=False):
+    """Proses satu file di dalam worker process: satu inference, banyak varian.
+
+    mask_in: mask near-duplicate (.npy) yang di-rescale alih-alih inference;
+    mask_out: simpan mask untuk dipakai file near-duplicate lain.
+    low_memory: paksa jalur proxy + strip (ditentukan admission control).
+    """
+    timer = StageTimer(input_path)
+    with timer.stage("read"):
+        with open(input_path, 'rb') as f:
+            input_bytes = f.read()
+        input_hash = hashlib.sha256(input_bytes).hexdigest()
+
+    with timer.stage("decode"):
+        image = load_image(input_bytes)
+    if low_memory or is_large_image(image, _worker_large_image["threshold_mp"]):
+        output_paths = _process_large_file(input_bytes, image, input_path, output_dir, model_name, variants, timer)
+        # Matting butuh alpha + RGB penuh, jadi tidak dijalankan di jalur strip; dihitung di summary
+        return output_paths, dict(timer.finish(), input_hash=input_hash, matting_skipped=_worker_matting != "off")
+
+    mask_reused = mask_in is not None and os.path.exists(mask_in)
+    if mask_reused:
+        with timer.stage("dedup"):
+            alpha = np.asarray(Image.fromarray(np.load(mask_in), "L").resize(image.size, Image.Resampling.BILINEAR))
+    else:
+        alpha = compute_mask(input_bytes, image, _worker_session, model_name, cache=_worker_cache, timer=timer)
+    if mask_out is not None:
+        np.save(mask_out, alpha)
+    with timer.stage("composite"):
+        rgb = to_rgb_array(image)
+    if _worker_matting != "off":
+        # Satu thread per worker process; paralelisme sudah dari jumlah worker
+        with timer.stage("matting"):
+            alpha = refine_alpha(rgb, alpha, _worker_matting, workers=1)
+
+    # Encode hanya sekali per varian, di tahap output
+    output_paths = []
+    for name, background in variants:
+        with timer.stage("composite"):
+            variant_image = render_variant(rgb, alpha, background)
+        with timer.stage("encode"):
+            output_paths.append(save_variant(variant_image, input_path, output_dir, name))
+    return output_paths, dict(timer.finish(), input_hash=input_hash, mask_reused=mask_reused)
+
+
+def run_batch(source, output_dir, workers=None, model_name=DEFAULT_MODEL_NAME,
+              cache_dir=DEFAULT_CACHE_DIR, cache_size_mb=DEFAULT_CACHE_SIZE_MB,
+              variants=("transparent",), metrics_path=None, verbose=True, runtime_options=None,
+              large_image=None, journal_path=None, resume=True, matting="off", dedup_threshold=None,
+              memory_budget_mb=None, stop_event=None):
+    """Headless batch processing dengan pool worker process (tanpa Tk).
+
+    large_image: dict threshold_mp/proxy_side/tile_rows untuk jalur gambar besar.
+    journal_path: journal progres (default di output_dir); dengan resume=True
+    file yang sudah selesai pada run sebelumnya dilewati.
+    dedup_threshold: aktifkan pre-pass pHash; near-duplicate memakai mask leader.
+    memory_budget_mb: budget RAM untuk buffer gambar (None = sebagian RAM fisik, 0 = tanpa batas);
+    file dikirim ke worker hanya jika perkiraan memorinya (dari header) masih muat.
+    stop_event: threading.Event; setelah di-set tidak ada file baru yang dikirim,
+    file yang belum mulai dibatalkan (kembali "pending"), dan summary["stopped"] True.
+    """
+    specs = list(variants)
+    variants = [parse_variant(spec) for spec in specs]
+    metrics = MetricsRegistry(metrics_path)
+    files = collect_input_files(source)
+    summary = {"total": len(files), "done": 0, "failed": 0, "skipped": 0, "dedup_saved": 0,
+               "low_memory": 0, "matting_skipped": 0, "errors": {}, "elapsed": 0.0, "stopped": False}
+    if not files:
+        print(f"Tidak ada gambar yang didukung di: {source}")
+        return summary
+
+    os.makedirs(output_dir, exist_ok=True)
+    journal_path = journal_path or os.path.join(output_dir, BatchJournal.FILE_NAME)
+    if not resume and os.path.exists(journal_path):
+        os.remove(journal_path)
+    journal = BatchJournal(journal_path, {"model": model_name, "variants": specs, "matting": matting,
+                                          "output_dir": os.path.abspath(output_dir)})
+    pending = [path for path in files if not journal.is_done(path)]
+    summary["skipped"] = len(files) - len(pending)
+    if summary["skipped"] and verbose:
+        print(f"Melanjutkan job: {summary['skipped']} file sudah selesai, {len(pending)} tersisa")
+    files = pending
+    if not files:
+        journal.close()
+        return summary
+
+    cpu_count = os.cpu_count() or 1
+    workers = max(1, min(workers or cpu_count, len(files)))
+    # Batasi thread ONNX per proses agar worker tidak saling berebut core
+    runtime_options = runtime_options or RuntimeOptions.for_workers(workers)
+    large_image = dict({"threshold_mp": LARGE_IMAGE_MP, "proxy_side": DEFAULT_PROXY_SIDE,
+                        "tile_rows": DEFAULT_TILE_ROWS}, **(large_image or {}))
+    jpeg_variants = sum(1 for _, background in variants if background is not None)
+    budget = None
+    if memory_budget_mb is None:
+        memory_budget_mb = default_memory_budget_mb()
+    if memory_budget_mb > 0:
+        # Setiap worker memegang session sendiri; sisanya untuk buffer gambar
+        session_mb = estimate_session_memory_mb(model_name) * workers
+        budget = MemoryBudget(max(memory_budget_mb - session_mb, 1.0))
+        if verbose:
+            print(f"Budget memori: {memory_budget_mb:.0f} MB ({session_mb:.0f} MB untuk session, "
+                  f"{budget.budget_mb:.0f} MB untuk gambar)")
+
+    start_time = time.perf_counter()
+    with journal, ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                      initargs=(model_name, runtime_options, cache_dir, cache_size_mb,
+                                                large_image, matting)) as pool:
+        groups = {}
+        dedup_dir = None
+        if dedup_threshold is not None:
+            hash_start = time.perf_counter()
+            hashes = [result for result in pool.map(_safe_perceptual_hash, files, chunksize=16) if result]
+            groups = plan_dedup(hashes, dedup_threshold)
+            if groups:
+                dedup_dir = tempfile.mkdtemp(prefix="removebg-dedup-")
+            if verbose:
+                print(f"Dedup pre-pass: {sum(len(group) for group in groups.values())} near-duplicate "
+                      f"dari {len(groups)} gambar, {time.perf_counter() - hash_start:.2f} seconds")
+        followers = {path for group in groups.values() for path in group}
+        mask_paths = {leader: os.path.join(dedup_dir, f"{index}.npy") for index, leader in enumerate(groups)}
+
+        ready = deque((path, None, mask_paths.get(path)) for path in files if path not in followers)
+        futures = {}
+        admitted = {}  # future -> perkiraan MB yang dipegang di budget
+        pending = set()
+
+        def submit_ready():
+            """Kirim file ke pool selama perkiraan memorinya masih muat di budget."""
+            while ready and not stopped():
+                path, mask_in, mask_out = ready[0]
+                memory_mb, low_memory = 0.0, False
+                if budget is not None:
+                    try:
+                        memory_mb, low_memory = plan_admission(
+                            read_image_size(path), budget.budget_mb, large_image["threshold_mp"],
+                            large_image["proxy_side"], large_image["tile_rows"], jpeg_variants)
+                    except Exception:
+                        pass  # Header tidak terbaca: error dilaporkan oleh worker
+                    if not budget.try_acquire(memory_mb):
+                        return
+                ready.popleft()
+                # "running" dicatat saat benar-benar dikirim ke pool, bukan saat antri
+                journal.record(path, "running")
+                summary["low_memory"] += 1 if low_memory else 0
+                future = pool.submit(_process_batch_file, path, output_dir, model_name, variants,
+                                     mask_in, mask_out, low_memory)
+                futures[future] = path
+                admitted[future] = memory_mb
+                pending.add(future)
+
+        def stopped():
+            if stop_event is None or not stop_event.is_set():
+                return False
+            if not summary["stopped"]:
+                summary["stopped"] = True
+                # File yang sedang diproses tetap ditunggu
+                cancelled = sum(future.cancel() for future in pending)
+                print(f"Batch dihentikan: {len(ready) + sum(map(len, groups.values())) + cancelled} "
+                      f"file tidak diproses")
+            return True
+
+        submit_ready()
+        while pending:
+            # Dengan stop_event, bangun berkala untuk memeriksanya
+            done, pending = wait(pending, timeout=None if stop_event is None else 1.0,
+                                 return_when=FIRST_COMPLETED)
+            stopped()
+            for future in done:
+                input_path = futures.pop(future)
+                memory_mb = admitted.pop(future)
+                if budget is not None:
+                    budget.release(memory_mb)
+                if future.cancelled():
+                    journal.record(input_path, "pending")
+                    continue
+                try:
+                    output_paths, record = future.result()
+                    journal.record(input_path, "done", record["input_hash"], output_paths)
+                    metrics.record(record)
+                    summary["done"] += 1
+                    summary["dedup_saved"] += 1 if record.get("mask_reused") else 0
+                    summary["matting_skipped"] += 1 if record.get("matting_skipped") else 0
+                    if verbose:
+                        print(f"[{summary['done'] + summary['failed']}/{len(files)}] "
+                              f"{os.path.basename(input_path)}: {record['total']:.2f} seconds "
+                              f"({format_stages(record['stages'])})")
+                except Exception as e:
+                    journal.record(input_path, "failed", error=str(e))
+                    summary["failed"] += 1
+                    summary["errors"][input_path] = str(e)
+                    print(f"[{summary['done'] + summary['failed']}/{len(files)}] "
+                          f"{os.path.basename(input_path)}: GAGAL - {e}")
+                # Near-duplicate baru dikirim setelah mask leader tersedia (jika leader gagal: inference biasa)
+                ready.extendleft((follower, mask_paths[input_path], None)
+                                 for follower in reversed(groups.pop(input_path, [])))
+            submit_ready()
+        if dedup_dir:
+            shutil.rmtree(dedup_dir, ignore_errors=True)
+
+    summary["elapsed"] = time.perf_counter() - start_time
+    summary["metrics"] = metrics.summary()
+    metrics.flush()
+    rate = summary["done"] / summary["elapsed"] if summary["elapsed"] else 0.0
+    if summary["matting_skipped"]:
+        print(f"Peringatan: matting '{matting}' tidak diterapkan pada {summary['matting_skipped']} gambar "
+              f"yang lewat jalur gambar besar/hemat memori")
+    if verbose:
+        print(f"Selesai: {summary['done']} berhasil, {summary['failed']} gagal, "
+              f"{summary['elapsed']:.2f} seconds ({rate:.2f} gambar/detik, {workers} worker)")
+        if dedup_threshold is not None:
+            print(f"Dedup: {summary['dedup_saved']} inference dihemat")
+        if budget is not None:
+            print(f"Memori: puncak perkiraan {budget.peak_mb:.0f}/{budget.budget_mb:.0f} MB, "
+                  f"{summary['low_memory']} gambar lewat jalur hemat memori")
+        if metrics.status_text():
+            print(f"Latency per gambar: {metrics.status_text()}")
+    return summary
+
+
+# --- NEAR-DUPLICATE DEDUP ---
+DEFAULT_DEDUP_THRESHOLD = 3  # Jarak Hamming maksimal antar pHash 64-bit
+DEDUP_ASPECT_TOLERANCE = 0.01  # Mask hanya di-rescale antar gambar dengan rasio sisi yang sama
+_DCT_MATRIX = np.sqrt(2 / 32) * np.cos(np.pi * np.outer(np.arange(32), 2 * np.arange(32) + 1) / 64)
+
+
+def perceptual_hash(image):
+    """pHash 64-bit: DCT 32x32 luminansi, 8x8 frekuensi rendah dibandingkan dengan mediannya."""
+    gray = np.asarray(image.convert("L").resize((32, 32), Image.Resampling.LANCZOS), dtype=np.float64)
+    low = (_DCT_MATRIX @ gray @ _DCT_MATRIX.T)[:8, :8].flatten()
+    bits = low > np.median(low[1:])  # Koefisien DC tidak ikut menentukan median
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+def file_perceptual_hash(path):
+    """(path, pHash, ukuran setelah orientasi EXIF) dengan decode draft skala kecil."""
+    with Image.open(path) as image:
+        width, height = image.size
+        if image.getexif().get(EXIF_ORIENTATION_TAG, 1) in (5, 6, 7, 8):
+            width, height = height, width
+        image.draft("RGB", (64, 64))
+        return path, perceptual_hash(ImageOps.exif_transpose(image)), (width, height)
+
+
+def _safe_perceptual_hash(path):
+    """Versi worker: file yang gagal di-hash cukup tidak ikut dedup (error dilaporkan saat diproses)."""
+    try:
+        return file_perceptual_hash(path)
+    except Exception:
+        return None
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+class PerceptualHashIndex:
+    """Index pHash untuk pencarian near-duplicate (jarak Hamming <= threshold).
+
+    Hash dipecah menjadi threshold+1 potongan; dua hash dalam jarak threshold
+    pasti sama persis di minimal satu potongan, jadi hanya bucket itu yang dicek.
+    """
+
+    def __init__(self, threshold=DEFAULT_DEDUP_THRESHOLD):
+        self.threshold = threshold
+        bounds = np.linspace(0, 64, threshold + 2).astype(int)
+        self._slices = list(zip(bounds[:-1], bounds[1:]))
+        self._buckets = [{} for _ in self._slices]
+
+    def _chunks(self, value):
+        return [(value >> int(start)) & ((1 << int(stop - start)) - 1) for start, stop in self._slices]
+
+    def add(self, value, item):
+        for bucket, chunk in zip(self._buckets, self._chunks(value)):
+            bucket.setdefault(chunk, []).append((value, item))
+
+    def find(self, value, accept=None):
+        """Item terdekat dalam threshold (dan lolos accept), atau None."""
+        best = None
+        for bucket, chunk in zip(self._buckets, self._chunks(value)):
+            for candidate, item in bucket.get(chunk, ()):
+                distance = hamming_distance(value, candidate)
+                if distance <= self.threshold and (best is None or distance < best[0]):
+                    if accept is None or accept(item):
+                        best = (distance, item)
+        return None if best is None else best[1]
+
+
+def plan_dedup(hashes, threshold=DEFAULT_DEDUP_THRESHOLD):
+    """{leader: [follower, ...]} dari daftar (path, pHash, size); follower memakai mask leader."""
+    index = PerceptualHashIndex(threshold)
+    sizes = {}
+    groups = {}
+    for path, value, size in hashes:
+        aspect = size[0] / size[1]
+        leader = index.find(value, accept=lambda item: abs(sizes[item][0] / sizes[item][1] - aspect)
+                            <= DEDUP_ASPECT_TOLERANCE * aspect)
+        if leader is None:
+            index.add(value, path)
+            sizes[path] = size
+        else:
+            groups.setdefault(leader, []).append(path)
+    return groups
+
+
+# --- DISTRIBUTED BATCH (SHARED WORK DIRECTORY) ---
+# Layout work_dir: job.json, shards/<id>.json, leases/<id>.<generasi>.lease,
+# journals/<id>.jsonl, metrics/<id>.<worker>.jsonl, results/<id>.json, summary.json
+DEFAULT_SHARD_SIZE = 200
+DEFAULT_LEASE_TTL = 300
+
+
+def write_json_atomic(path, data):
+    """Tulis JSON lewat file sementara + fsync + os.replace (aman di filesystem bersama)."""
+    temp_file = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, path)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+
+def read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def init_sharded_job(source, output_dir, work_dir, shard_size=DEFAULT_SHARD_SIZE, model_name=DEFAULT_MODEL_NAME,
+                     variants=("transparent",), matting="off", dedup_threshold=None, large_image=None):
+    """Bagi input menjadi shard di work_dir; path disimpan absolut agar sama di semua host."""
+    job_path = os.path.join(work_dir, "job.json")
+    if os.path.exists(job_path):
+        raise ValueError(f"Job sudah ada di {work_dir}; gunakan direktori kerja baru")
+    files = [os.path.abspath(path) for path in collect_input_files(source)]
+    if not files:
+        raise ValueError(f"Tidak ada gambar yang didukung di: {source}")
+    for name in ("shards", "leases", "journals", "metrics", "results"):
+        os.makedirs(os.path.join(work_dir, name), exist_ok=True)
+    shards = [files[start:start + shard_size] for start in range(0, len(files), shard_size)]
+    for shard_id, shard_files in enumerate(shards):
+        write_json_atomic(os.path.join(work_dir, "shards", f"{shard_id}.json"), shard_files)
+    # job.json ditulis terakhir: worker hanya mulai setelah semua shard tersedia
+    write_json_atomic(job_path, {
+        "created_at": time.time(), "source": source, "output_dir": os.path.abspath(output_dir),
+        "files": len(files), "shards": len(shards), "shard_size": shard_size, "model": model_name,
+        "variants": list(variants), "matting": matting, "dedup_threshold": dedup_threshold,
+        "large_image": large_image})
+    print(f"Job dibuat: {len(files)} gambar dalam {len(shards)} shard di {work_dir}")
+    return len(shards)
+
+
+class ShardLease:
+    """Lease satu shard: leases/<shard>.<generasi>.lease, generasi tertinggi yang berlaku.
+
+    Klaim berarti membuat generasi berikutnya dengan O_EXCL, jadi hanya satu
+    worker yang menang meski beberapa host mengklaim bersamaan. Lease yang
+    kedaluwarsa (worker mati) diambil alih dengan cara yang sama; TTL harus
+    jauh lebih besar dari selisih jam antar host.
+    """
+
+    def __init__(self, work_dir, shard_id, owner, ttl=DEFAULT_LEASE_TTL):
+        self.lease_dir = os.path.join(work_dir, "leases")
+        self.shard_id = shard_id
+        self.owner = owner
+        self.ttl = ttl
+        self.generation = None
+        self.expires_at = 0.0
+        self.lost = False
+        self.lost_event = threading.Event()  # Di-set saat lease hilang; run_batch berhenti mengirim file
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _path(self, generation):
+        return os.path.join(self.lease_dir, f"{self.shard_id}.{generation}.lease")
+
+    @staticmethod
+    def generations(lease_dir):
+        """{shard_id: generasi tertinggi} dari satu listdir."""
+        latest = {}
+        for name in os.listdir(lease_dir):
+            if not name.endswith(".lease"):
+                continue
+            shard, _, generation = name[:-len(".lease")].rpartition(".")
+            try:
+                shard, generation = int(shard), int(generation)
+            except ValueError:
+                continue
+            latest[shard] = max(latest.get(shard, 0), generation)
+        return latest
+
+    def _expires_at(self, generation):
+        path = self._path(generation)
+        try:
+            return read_json(path)["expires_at"]
+        except (OSError, ValueError, KeyError):
+            # File baru dibuat dan belum selesai ditulis: anggap berlaku sejak mtime
+            try:
+                return os.path.getmtime(path) + self.ttl
+            except OSError:
+                return 0.0
+
+    def _payload(self):
+        self.expires_at = time.time() + self.ttl
+        return {"owner": self.owner, "shard": self.shard_id, "expires_at": self.expires_at}
+
+    def try_claim(self, generation=0):
+        """Klaim shard jika belum di-lease atau lease generasi terakhir sudah kedaluwarsa."""
+        if generation and self._expires_at(generation) > time.time():
+            return False
+        try:
+            fd = os.open(self._path(generation + 1), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self._payload(), f)
+            f.flush()
+            os.fsync(f.fileno())
+        self.generation = generation + 1
+        if generation:
+            print(f"Shard {self.shard_id}: lease kedaluwarsa diambil alih (generasi {self.generation})")
+        return True
+
+    def renew(self):
+        """Perpanjang lease; False jika worker lain sudah mengambil alih (generasi lebih baru)."""
+        if os.path.exists(self._path(self.generation + 1)):
+            self._mark_lost()
+            return False
+        write_json_atomic(self._path(self.generation), self._payload())
+        return True
+
+    def _mark_lost(self):
+        self.lost = True
+        self.lost_event.set()
+
+    def start_heartbeat(self):
+        def beat():
+            while not self._stop_event.wait(self.ttl / 3):
+                try:
+                    if not self.renew():
+                        print(f"Shard {self.shard_id}: lease diambil alih worker lain, batch dihentikan")
+                        return
+                except OSError as e:
+                    print(f"Shard {self.shard_id}: gagal memperpanjang lease - {e}")
+                    if time.time() > self.expires_at:
+                        # Lease sudah kedaluwarsa: worker lain boleh mengambil alih
+                        print(f"Shard {self.shard_id}: lease kedaluwarsa, batch dihentikan")
+                        self._mark_lost()
+                        return
+
+        self._thread = threading.Thread(target=beat, daemon=True, name=f"lease-{self.shard_id}")
+        self._thread.start()
+
+    def release(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        if not self.lost:
+            for generation in range(1, self.generation + 1):
+                try:
+                    os.remove(self._path(generation))
+                except FileNotFoundError:
+                    pass
+
+
+def claim_next_shard(work_dir, shard_count, owner, ttl=DEFAULT_LEASE_TTL):
+    """(lease, sisa): lease shard yang berhasil diklaim atau None, dan jumlah shard yang belum selesai."""
+    done = {int(name[:-len(".json")]) for name in os.listdir(os.path.join(work_dir, "results"))
+            if name.endswith(".json") and name[:-len(".json")].isdigit()}
+    remaining = [shard_id for shard_id in range(shard_count) if shard_id not in done]
+    if not remaining:
+        return None, 0
+    generations = ShardLease.generations(os.path.join(work_dir, "leases"))
+    # Mulai dari posisi berbeda per worker agar host tidak berebut shard yang sama
+    offset = zlib.crc32(owner.encode("utf-8")) % len(remaining)
+    for shard_id in remaining[offset:] + remaining[:offset]:
+        lease = ShardLease(work_dir, shard_id, owner, ttl)
+        if lease.try_claim(generations.get(shard_id, 0)):
+            return lease, len(remaining)
+    return None, len(remaining)
+
+
+def run_shard_worker(work_dir, workers=None, lease_ttl=DEFAULT_LEASE_TTL, poll_interval=5.0,
+                     cache_dir=DEFAULT_CACHE_DIR, cache_size_mb=DEFAULT_CACHE_SIZE_MB, runtime_options=None,
+                     memory_budget_mb=None, verbose=True):
+    """Klaim dan proses shard sampai semua selesai; tetap menunggu lease host lain agar bisa mengambil alih."""
+    job = read_json(os.path.join(work_dir, "job.json"))
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    token = hashlib.sha256(f"{owner}:{time.time()}".encode("utf-8")).hexdigest()[:8]
+    processed = 0
+    while True:
+        lease, remaining = claim_next_shard(work_dir, job["shards"], owner, lease_ttl)
+        if lease is None:
+            if not remaining:
+                break
+            time.sleep(poll_interval)  # Semua shard sisa sedang di-lease host lain
+            continue
+
+        shard_id = lease.shard_id
+        print(f"Shard {shard_id}: diklaim oleh {owner} ({remaining} shard belum selesai)")
+        lease.start_heartbeat()
+        started_at = time.time()
+        try:
+            summary = run_batch(
+                read_json(os.path.join(work_dir, "shards", f"{shard_id}.json")), job["output_dir"],
+                workers=workers, model_name=job["model"], cache_dir=cache_dir, cache_size_mb=cache_size_mb,
+                variants=job["variants"], verbose=verbose, runtime_options=runtime_options,
+                large_image=job["large_image"], matting=job["matting"], dedup_threshold=job["dedup_threshold"],
+                memory_budget_mb=memory_budget_mb, stop_event=lease.lost_event,
+                # Journal per shard: worker pengganti melanjutkan tanpa mengulang file yang selesai
+                journal_path=os.path.join(work_dir, "journals", f"{shard_id}.jsonl"),
+                metrics_path=os.path.join(work_dir, "metrics", f"{shard_id}.{token}.jsonl"))
+            if lease.lost:
+                # Pemilik baru menyelesaikan shard dan menulis hasilnya
+                print(f"Shard {shard_id}: lease hilang, hasil tidak ditulis")
+                continue
+            metrics_files = sorted(glob.glob(os.path.join(work_dir, "metrics", f"{shard_id}.*.jsonl")))
+            write_json_atomic(os.path.join(work_dir, "results", f"{shard_id}.json"), {
+                "shard": shard_id, "owner": owner, "started_at": started_at, "finished_at": time.time(),
+                "summary": summary, "metrics_files": [os.path.basename(path) for path in metrics_files]})
+            processed += 1
+        finally:
+            lease.release()
+    print(f"Worker {owner} selesai: {processed} shard diproses")
+    return processed
+
+
+def merge_sharded_job(work_dir, metrics_path=None):
+    """Gabungkan hasil semua shard: total, error, throughput per worker, dan histogram metrics.
+
+    Jumlah berhasil/gagal diambil dari status terakhir tiap file di journal shard,
+    bukan dari summary pemilik terakhir, jadi file yang diselesaikan worker yang
+    mati sebelum diambil alih tetap terhitung.
+    """
+    job = read_json(os.path.join(work_dir, "job.json"))
+    metrics = MetricsRegistry(metrics_path)
+    merged = {"files": job["files"], "shards": job["shards"], "completed": 0, "missing": [],
+              "done": 0, "failed": 0, "skipped": 0, "dedup_saved": 0, "low_memory": 0, "matting_skipped": 0,
+              "errors": {}, "workers": {}, "elapsed": 0.0}
+    started, finished = [], []
+    for shard_id in range(job["shards"]):
+        journal_path = os.path.join(work_dir, "journals", f"{shard_id}.jsonl")
+        entries = BatchJournal.read_entries(journal_path) if os.path.exists(journal_path) else {}
+        for path in read_json(os.path.join(work_dir, "shards", f"{shard_id}.json")):
+            entry = entries.get(path, {})
+            if entry.get("state") == "done":
+                merged["done"] += 1
+            elif entry.get("state") == "failed":
+                merged["failed"] += 1
+                merged["errors"][path] = entry.get("error")
+        result_path = os.path.join(work_dir, "results", f"{shard_id}.json")
+        if not os.path.exists(result_path):
+            merged["missing"].append(shard_id)
+            continue
+        result = read_json(result_path)
+        summary = result["summary"]
+        merged["completed"] += 1
+        # skipped: file yang sudah selesai sebelum pemilik terakhir mulai (resume/ambil alih)
+        for name in ("skipped", "dedup_saved", "low_memory", "matting_skipped"):
+            merged[name] += summary.get(name, 0)
+        worker = merged["workers"].setdefault(result["owner"], {"shards": 0, "done": 0, "seconds": 0.0})
+        worker["shards"] += 1
+        worker["done"] += summary["done"]
+        worker["seconds"] += summary["elapsed"]
+        started.append(result["started_at"])
+        finished.append(result["finished_at"])
+        for name in result["metrics_files"]:
+            with open(os.path.join(work_dir, "metrics", name), 'r', encoding='utf-8') as f:
+                for line in f:
+                    record = json.loads(line)
+                    if "stages" in record:
+                        metrics.record(record)
+    if started:
+        merged["elapsed"] = max(finished) - min(started)
+    merged["images_per_sec"] = merged["done"] / merged["elapsed"] if merged["elapsed"] else 0.0
+    merged["metrics"] = metrics.summary()
+    metrics.flush()
+    write_json_atomic(os.path.join(work_dir, "summary.json"), merged)
+
+    print(f"Shard selesai: {merged['completed']}/{merged['shards']}"
+          + (f" (belum: {', '.join(map(str, merged['missing']))})" if merged["missing"] else ""))
+    print(f"Gambar: {merged['done']} berhasil, {merged['failed']} gagal "
+          f"({merged['skipped']} diselesaikan sebelum resume/ambil alih); "
+          f"{merged['elapsed']:.2f} seconds ({merged['images_per_sec']:.2f} gambar/detik)")
+    if merged["matting_skipped"]:
+        print(f"Peringatan: matting tidak diterapkan pada {merged['matting_skipped']} gambar jalur gambar besar")
+    for owner, worker in sorted(merged["workers"].items()):
+        print(f"  {owner}: {worker['shards']} shard, {worker['done']} gambar, {worker['seconds']:.2f} seconds")
+    if metrics.status_text():
+        print(f"Latency per gambar: {metrics.status_text()}")
+    return merged
+
+
+# --- EXPORT ENGINE ---
+EXPORT_FORMATS = {".png": "PNG", ".jpg": "JPEG", ".jpeg": "JPEG", ".webp": "WebP"}
+DEFAULT_PNG_COMPRESS_LEVEL = 6
+DEFAULT_WEBP_METHOD = 4
+# Trade-off kecepatan/ukuran: (label, PNG compress_level, WebP method)
+EXPORT_PRESETS = (("Cepat", 1, 0), ("Seimbang", DEFAULT_PNG_COMPRESS_LEVEL, DEFAULT_WEBP_METHOD), ("Kecil", 9, 6))
+WEB_EXPORT_MAX_SIDE = 1600
+
+
+class ExportSpec:
+    """Satu file export: format dari ekstensi, ukuran maksimum opsional, dan knob encode."""
+
+    def __init__(self, path, max_side=None, png_compress_level=DEFAULT_PNG_COMPRESS_LEVEL,
+                 webp_method=DEFAULT_WEBP_METHOD, jpeg_quality=95):
+        extension = os.path.splitext(path.lower())[1]
+        if extension not in EXPORT_FORMATS:
+            raise ValueError(f"Format export tidak didukung: {extension}")
+        self.path = path
+        self.format = EXPORT_FORMATS[extension]
+        self.max_side = max_side
+        self.png_compress_level = png_compress_level
+        self.webp_method = webp_method
+        self.jpeg_quality = jpeg_quality
+
+    @property
+    def background(self):
+        # JPEG tidak punya alpha: komposit di atas putih langsung dari mask
+        return WHITE if self.format == "JPEG" else None
+
+    def params(self):
+        """Argumen Image.save untuk format ini."""
+        if self.format == "JPEG":
+            return {"quality": self.jpeg_quality, "optimize": True}
+        if self.format == "WebP":
+            return {"lossless": True, "quality": 95, "method": self.webp_method}
+        return {"compress_level": self.png_compress_level}
+
+    def __repr__(self):
+        return f"ExportSpec({self.path!r}, {self.format}, max_side={self.max_side})"
+
+
+class ExportEngine:
+    """Encode satu hasil ke beberapa format/ukuran sekaligus di thread pool.
+
+    Encoder PIL (zlib, libjpeg, libwebp) melepas GIL, jadi beberapa format
+    ter-encode paralel. Waktu encode per format dicatat ke MetricsRegistry
+    sebagai tahap export_<format>.
+    """
+
+    def __init__(self, max_workers=None, metrics=None):
+        self.metrics = metrics
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or min(4, os.cpu_count() or 1),
+                                            thread_name_prefix="export")
+
+    def export(self, source_rgb, alpha, specs):
+        """Satu Future per spec, hasilnya (path, detik encode)."""
+        rendered = {}
+        lock = threading.RLock()
+
+        def render(background, max_side):
+            # Komposit per latar dibuat sekali, versi kecil di-resize dari versi penuh
+            with lock:
+                key = (background, max_side)
+                if key not in rendered:
+                    if max_side is None:
+                        rendered[key] = render_variant(source_rgb, alpha, background)
+                    else:
+                        full = render(background, None)
+                        scale = min(1.0, max_side / max(full.size))
+                        size = (max(1, round(full.width * scale)), max(1, round(full.height * scale)))
+                        rendered[key] = full.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+                return rendered[key]
+
+        def encode(spec):
+            image = render(spec.background, spec.max_side)
+            start = time.perf_counter()
+            atomic_save(image, spec.path, spec.format, **spec.params())
+            seconds = time.perf_counter() - start
+            if self.metrics is not None:
+                self.metrics.record_stage(f"export_{spec.format.lower()}", seconds)
+            return spec.path, seconds
+
+        return [self._executor.submit(encode, spec) for spec in specs]
+
+    def shutdown(self):
+        """Tunggu export yang masih berjalan agar file tidak terpotong saat aplikasi ditutup."""
+        self._executor.shutdown(wait=True)
+
+
+# --- HOT FOLDER (WATCH MODE) ---
+_STOP = object()
+
+
+class PipelineStage:
+    """Satu tahap pipeline streaming: ambil item dari inbox, proses, kirim ke outbox.
+
+    Queue dibatasi (maxsize), jadi tahap yang lambat otomatis menahan tahap
+    sebelumnya (backpressure) alih-alih menumpuk gambar di RAM.
+    """
+
+    def __init__(self, name, func, inbox, outbox=None, workers=1, on_error=None):
+        self.name = name
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.on_error = on_error
+        self._alive = workers
+        self._lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._run, name=f"{name}-{index}", daemon=True)
+                        for index in range(workers)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            item = self.inbox.get()
+            if item is _STOP:
+                # Teruskan ke worker lain; worker terakhir menghentikan tahap berikutnya
+                self.inbox.put(_STOP)
+                with self._lock:
+                    self._alive -= 1
+                    last = self._alive == 0
+                if last and self.outbox is not None:
+                    self.outbox.put(_STOP)
+                return
+            try:
+                result = self.func(item)
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(item, e)
+                continue
+            if self.outbox is not None:
+                self.outbox.put(result)
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+
+
+class HotFolderWatcher:
+    """Pantau direktori input dan alirkan gambar baru lewat decode → inference → composite → encode.
+
+    File diproses setelah ukuran/mtime-nya stabil di dua scan berturut-turut
+    (masih disalin). Session model dimuat sekali dan tetap hangat; progres
+    dicatat di BatchJournal sehingga file lama tidak diproses ulang setelah restart.
+    """
+
+    def __init__(self, input_dir, output_dir, model_name=DEFAULT_MODEL_NAME, variants=("transparent",),
+                 cache=None, runtime_options=None, poll_interval=1.0, queue_size=4, encode_workers=2,
+                 metrics=None, verbose=True, memory_budget_mb=None):
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.model_name = model_name
+        self.variants = [parse_variant(spec) for spec in variants]
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self.metrics = metrics or MetricsRegistry()
+        self.verbose = verbose
+        self.processed = 0
+        self.failed = 0
+        self._candidates = {}
+        self._submitted = {}
+        self._stop_event = threading.Event()
+        # Decode menunggu budget memori; dilepas setelah encode (atau saat gagal)
+        if memory_budget_mb is None:
+            memory_budget_mb = default_memory_budget_mb()
+        # 0 = tanpa batas, sama seperti batch
+        self.memory_budget = MemoryBudget(memory_budget_mb) if memory_budget_mb > 0 else None
+        self._lock = threading.Lock()  # journal dan penghitung dipakai beberapa thread encode
+        os.makedirs(output_dir, exist_ok=True)
+        self.journal = BatchJournal(os.path.join(output_dir, BatchJournal.FILE_NAME),
+                                    {"model": model_name, "variants": list(variants),
+                                     "output_dir": os.path.abspath(output_dir)})
+
+        start = time.perf_counter()
+        self.session = create_session(model_name, runtime_options)
+        print(f"Model {model_name} siap dalam {time.perf_counter() - start:.2f} seconds")
+
+        queues = [queue.Queue(maxsize=queue_size) for _ in range(4)]
+        self._inbox = queues[0]
+        self.stages = [
+            PipelineStage("decode", self._decode, queues[0], queues[1], on_error=self._fail),
+            PipelineStage("inference", self._infer, queues[1], queues[2], on_error=self._fail),
+            PipelineStage("composite", self._composite, queues[2], queues[3], on_error=self._fail),
+            PipelineStage("encode", self._encode, queues[3], workers=encode_workers, on_error=self._fail),
+        ]
+
+    def scan(self, require_stable=True):
+        """File yang siap diproses: stabil sejak scan sebelumnya, belum dikirim dan belum selesai."""
+        ready = []
+        current = {}
+        for path in collect_input_files(self.input_dir):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # Dihapus di antara listdir dan stat
+            signature = (stat.st_size, stat.st_mtime_ns)
+            current[path] = signature
+            if self._submitted.get(path) == signature:
+                continue
+            if require_stable and self._candidates.get(path) != signature:
+                continue
+            with self._lock:
+                done = self.journal.is_done(path)
+            if done:
+                self._submitted[path] = signature
+                continue
+            ready.append(path)
+            self._submitted[path] = signature
+        self._candidates = current
+        return ready
 
-        # Validate file extension
-        file_ext = os.path.splitext(file_path.lower())[1]
-        if file_ext not in supported_formats:
-            messagebox.showwarning("Format Tidak Didukung",
-                f"Format file {file_ext} tidak didukung.\nFormat yang didukung: {', '.join(supported_formats)}")
-            return
+    def _decode(self, item):
+        timer = item["timer"]
+        with timer.stage("admission"):
+            size = read_image_size(item["path"])
+            if self.memory_budget is None:
+                item["low_memory"] = size[0] * size[1] > LARGE_IMAGE_MP * 1_000_000
+            else:
+                memory_mb, item["low_memory"] = plan_admission(size, self.memory_budget.budget_mb,
+                                                               strip_output=False)
+                self.memory_budget.acquire(memory_mb)
+                item["memory_mb"] = memory_mb
+        with timer.stage("read"):
+            with open(item["path"], 'rb') as f:
+                item["input_bytes"] = f.read()
+            item["input_hash"] = hashlib.sha256(item["input_bytes"]).hexdigest()
+        with timer.stage("decode"):
+            item["image"] = load_image(item["input_bytes"])
+        return item
+
+    def _infer(self, item):
+        image, timer = item["image"], item["timer"]
+        if item["low_memory"]:
+            item["alpha"] = compute_adaptive_mask(item["input_bytes"], image, self.session, self.model_name,
+                                                  cache=self.cache, timer=timer)
+        else:
+            item["alpha"] = compute_mask(item["input_bytes"], image, self.session, self.model_name,
+                                         cache=self.cache, timer=timer)
+        del item["input_bytes"]
+        return item
+
+    def _composite(self, item):
+        with item["timer"].stage("composite"):
+            rgb = to_rgb_array(item.pop("image"))
+            alpha = item.pop("alpha")
+            item["results"] = [(name, render_variant(rgb, alpha, background)) for name, background in self.variants]
+        return item
+
+    def _encode(self, item):
+        input_path, timer = item["path"], item["timer"]
+        with timer.stage("encode"):
+            output_paths = [save_variant(result, input_path, self.output_dir, name)
+                            for name, result in item.pop("results")]
+        self._release(item)
+        record = timer.finish()
+        with self._lock:
+            self.journal.record(input_path, "done", item["input_hash"], output_paths)
+            self.processed += 1
+        self.metrics.record(record)
+        if self.verbose:
+            print(f"{os.path.basename(input_path)}: {record['total']:.2f} seconds ({format_stages(record['stages'])})")
+
+    def _release(self, item):
+        if "memory_mb" in item:
+            self.memory_budget.release(item.pop("memory_mb"))
 
-        # Validate file size (max 50MB)
+    def _fail(self, item, error):
+        self._release(item)
+        with self._lock:
+            self.failed += 1
+            self.journal.record(item["path"], "failed", error=str(error))
+        print(f"{os.path.basename(item['path'])}: GAGAL - {error}")
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self, once=False):
+        """Scan terus sampai stop() atau Ctrl+C; once=True memproses isi folder saat ini lalu selesai."""
+        for stage in self.stages:
+            stage.start()
+        print(f"Memantau {os.path.abspath(self.input_dir)} → {os.path.abspath(self.output_dir)}")
         try:
-            file_size = os.path.getsize(file_path) / (1024 * 1024)  # MB
-            if file_size > 50:
-                messagebox.showwarning("File Terlalu Besar",
-                    f"Ukuran file ({file_size:.1f}MB) terlalu besar.\nMaksimal 50MB.")
-                return
-        except Exception as e:
-            messagebox.showerror("Error", f"Tidak dapat membaca file: {e}")
-            return
+            while not self._stop_event.is_set():
+                for path in self.scan(require_stable=not once):
+                    # put() memblokir saat pipeline penuh (backpressure)
+                    self._inbox.put({"path": path, "timer": StageTimer(path)})
+                if once:
+                    break
+                self._stop_event.wait(self.poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._inbox.put(_STOP)
+            for stage in self.stages:
+                stage.join()
+            self.journal.close()
+            self.metrics.flush()
+            print(f"Watch selesai: {self.processed} berhasil, {self.failed} gagal")
 
-        self.reset_app_state()
-        self.input_path = file_path
-        
-        # Display image dengan optimalisasi
-        self.display_image(self.original_label, self.input_path)
 
-        # Update UI untuk processing
-        self.status_label.config(text="🤖 AI sedang bekerja, mohon tunggu...")
-        self.result_label.config(image='', text="Memproses...\n\n⏳")
-        self.toggle_controls(processing=True)
-        
-        # Start processing in background
-        threading.Thread(target=self.process_image_thread, daemon=True).start()
+# --- VIDEO / FRAME SEQUENCES ---
+VIDEO_FORMATS = ('.mp4', '.mov', '.avi', '.mkv', '.webm', '.m4v')
+ANIMATED_FORMATS = ('.gif',)
+DEFAULT_CHANGE_THRESHOLD = 0.02  # Rata-rata selisih luminansi (0-1) setelah alignment
+DEFAULT_MAX_REUSE = 15  # Paksa segmentasi ulang setiap N frame untuk membatasi drift
+MOTION_THUMBNAIL_SIDE = 128
+
+
+def motion_thumbnail(image, side=MOTION_THUMBNAIL_SIDE):
+    """Thumbnail luminansi kecil (float32 0-1) untuk deteksi perubahan antar frame."""
+    thumb = image.convert("L")
+    thumb.thumbnail((side, side), Image.Resampling.BILINEAR, reducing_gap=2.0)
+    return np.asarray(thumb, dtype=np.float32) / 255
+
+
+def estimate_shift(reference, current):
+    """Translasi global (dy, dx) dari reference ke current lewat phase correlation."""
+    height, width = reference.shape
+    window = np.outer(np.hanning(height), np.hanning(width)).astype(np.float32)
+    spectrum = np.fft.rfft2(current * window) * np.conj(np.fft.rfft2(reference * window))
+    spectrum /= np.abs(spectrum) + 1e-9
+    correlation = np.fft.irfft2(spectrum, s=reference.shape)
+    dy, dx = np.unravel_index(np.argmax(correlation), correlation.shape)
+    return (int(dy) - height if dy > height // 2 else int(dy)), (int(dx) - width if dx > width // 2 else int(dx))
+
+
+def shift_array(values, dy, dx):
+    """Geser array 2D sejauh (dy, dx); tepi yang kosong diisi nilai tepi terdekat."""
+    height, width = values.shape
+    rows = np.clip(np.arange(height) - dy, 0, height - 1)
+    cols = np.clip(np.arange(width) - dx, 0, width - 1)
+    return values[rows[:, None], cols[None, :]]
+
+
+class TemporalMaskPropagator:
+    """Pakai ulang mask keyframe untuk frame yang hampir identik, digeser mengikuti gerak kamera.
+
+    Inference penuh hanya dijalankan saat ganti adegan, selisih setelah
+    alignment melewati change_threshold, atau sudah max_reuse frame sejak keyframe.
+    """
+
+    def __init__(self, session, model_name=DEFAULT_MODEL_NAME, change_threshold=DEFAULT_CHANGE_THRESHOLD,
+                 max_reuse=DEFAULT_MAX_REUSE):
+        self.session = session
+        self.model_name = model_name
+        self.change_threshold = change_threshold
+        self.max_reuse = max_reuse
+        self.inferred = 0
+        self.reused = 0
+        self._key_thumb = None
+        self._key_alpha = None
+        self._since_key = 0
+
+    def _reuse_shift(self, image, thumb):
+        """(dy, dx) resolusi penuh jika mask keyframe bisa dipakai, None jika perlu inference."""
+        if (self._key_thumb is None or thumb.shape != self._key_thumb.shape
+                or self._key_alpha.shape != (image.height, image.width) or self._since_key >= self.max_reuse):
+            return None
+        dy, dx = estimate_shift(self._key_thumb, thumb)
+        height, width = thumb.shape
+        if abs(dy) > height // 4 or abs(dx) > width // 4:
+            return None  # Gerak terlalu besar, kemungkinan ganti adegan
+        residual = np.abs(shift_array(self._key_thumb, dy, dx) - thumb).mean()
+        if residual > self.change_threshold:
+            return None
+        return round(dy * image.height / height), round(dx * image.width / width)
+
+    def alpha_for(self, image, timer=None):
+        """(alpha, reused) untuk satu frame."""
+        timer = timer if timer is not None else StageTimer()
+        with timer.stage("motion"):
+            thumb = motion_thumbnail(image)
+            shift = self._reuse_shift(image, thumb)
+        if shift is not None:
+            self._since_key += 1
+            self.reused += 1
+            with timer.stage("propagate"):
+                return shift_array(self._key_alpha, *shift), True
+        with timer.stage("inference"):
+            alpha = predict_alpha(self.session, image)
+        self._key_thumb, self._key_alpha, self._since_key = thumb, alpha, 0
+        self.inferred += 1
+        return alpha, False
+
 
-    def process_image_thread(self):
-        """Optimized background removal processing."""
+def _require_ffmpeg():
+    if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+        raise RuntimeError("ffmpeg/ffprobe tidak ditemukan di PATH; diperlukan untuk file video")
+
+
+def _ffmpeg_frames(path):
+    """(iterator frame, fps) dari file video lewat pipe ffmpeg rawvideo, satu frame di memori."""
+    _require_ffmpeg()
+    probe = subprocess.run(["ffprobe", "-v", "error", "-select_streams", "v:0",
+                            "-show_entries", "stream=width,height,r_frame_rate", "-of", "json", path],
+                           capture_output=True, text=True, check=True)
+    stream = json.loads(probe.stdout)["streams"][0]
+    width, height = int(stream["width"]), int(stream["height"])
+    fps = float(Fraction(stream["r_frame_rate"]))
+
+    def frames():
+        process = subprocess.Popen(["ffmpeg", "-v", "error", "-i", path, "-f", "rawvideo", "-pix_fmt", "rgb24", "-"],
+                                   stdout=subprocess.PIPE)
+        frame_size = width * height * 3
         try:
-            start_time = time.time()
-            
-            # Read file dengan buffer optimization
-            with open(self.input_path, 'rb') as f:
-                input_bytes = f.read()
-            
-            # Process dengan session yang sudah di-cache
-            output_bytes = remove(input_bytes, session=self.session)
-            
-            # Convert ke PIL Image
-            self.output_image_pil = Image.open(io.BytesIO(output_bytes))
-            
-            process_time = time.time() - start_time
-            print(f"Processing time: {process_time:.2f} seconds")
-            
-            # Update UI di main thread
-            self.root.after(0, self.update_ui_after_processing)
+            while True:
+                buffer = process.stdout.read(frame_size)
+                if len(buffer) < frame_size:
+                    break
+                yield Image.frombuffer("RGB", (width, height), buffer, "raw", "RGB", 0, 1)
+        finally:
+            process.stdout.close()
+            process.wait()
 
-        except Exception as e:
-            error_message = f"Gagal memproses gambar: {e}"
-            self.root.after(0, lambda: messagebox.showerror("Processing Error", error_message))
-            self.root.after(0, lambda: self.status_label.config(text="❌ Gagal memproses gambar."))
-            self.root.after(0, lambda: self.toggle_controls(processing=False))
+    return frames(), fps
 
-    def update_ui_after_processing(self):
-        """Optimized UI update setelah processing."""
-        if self.output_image_pil:
-            self.display_image(self.result_label, self.output_image_pil)
-            self.status_label.config(text="✅ Berhasil! Pratinjau siap. Silakan simpan gambar.")
-            self.toggle_controls(processing=False, has_result=True)
 
-    def save_image(self):
-        """Optimized image saving dengan format options."""
-        if not self.output_image_pil:
-            messagebox.showwarning("Simpan Gagal", "Tidak ada gambar hasil untuk disimpan.")
-            return
+def open_frame_source(source, fps=None):
+    """(iterator frame, fps) dari direktori/glob gambar, GIF animasi, atau file video."""
+    extension = os.path.splitext(source.lower())[1]
+    if os.path.isfile(source) and extension in VIDEO_FORMATS:
+        frames, video_fps = _ffmpeg_frames(source)
+        return frames, fps or video_fps
+    if os.path.isfile(source) and extension in ANIMATED_FORMATS:
+        def frames():
+            with Image.open(source) as animation:
+                for frame in ImageSequence.Iterator(animation):
+                    yield frame.convert("RGB")
+        return frames(), fps or 25.0
 
-        # Generate default filename
-        file_name = os.path.basename(self.input_path)
-        base_name, _ = os.path.splitext(file_name)
-        output_filename = f"{base_name}_no_bg.png"
+    paths = collect_input_files(source)
+    if not paths:
+        raise ValueError(f"Tidak ada frame yang didukung di: {source}")
 
-        save_path = filedialog.asksaveasfilename(
-            title="Simpan Hasil Sebagai...",
-            initialfile=output_filename,
-            defaultextension=".png",
-            filetypes=[
-                ("PNG Image", "*.png"),
-                ("JPEG Image", "*.jpg"),
-                ("WebP Image", "*.webp")
-            ]
-        )
-        
-        if save_path:
+    def frames():
+        for path in paths:
+            with open(path, 'rb') as f:
+                yield load_image(f.read())
+    return frames(), fps or 25.0
+
+
+class FrameSequenceWriter:
+    """Tulis frame sebagai file bernomor (PNG transparan atau JPEG) di direktori output."""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+    def write(self, index, image):
+        if image.mode == 'RGBA':
+            atomic_save(image, os.path.join(self.output_dir, f"frame_{index:06d}.png"), 'PNG', compress_level=1)
+        else:
+            atomic_save(image, os.path.join(self.output_dir, f"frame_{index:06d}.jpg"), 'JPEG', quality=95)
+
+    def close(self):
+        return self.output_dir
+
+
+class FFmpegVideoWriter:
+    """Encode frame ke file video lewat pipe ffmpeg; .webm/.mov menyimpan alpha."""
+
+    CODECS = {
+        ".webm": ["-c:v", "libvpx-vp9", "-pix_fmt", "yuva420p"],
+        ".mov": ["-c:v", "prores_ks", "-profile:v", "4444", "-pix_fmt", "yuva444p10le"],
+    }
+    # Mode PIL -> pixel format rawvideo ffmpeg
+    PIX_FMTS = {"RGB": "rgb24", "RGBA": "rgba"}
+
+    def __init__(self, path, fps):
+        _require_ffmpeg()
+        self.path = path
+        self.fps = fps
+        self._process = None
+
+    def _open(self, image):
+        codec = self.CODECS.get(os.path.splitext(self.path.lower())[1])
+        if codec is None or image.mode != "RGBA":
+            codec = ["-c:v", "libx264", "-pix_fmt", "yuv420p"]
+        self._process = subprocess.Popen(
+            ["ffmpeg", "-v", "error", "-y", "-f", "rawvideo", "-pix_fmt", self.PIX_FMTS[image.mode],
+             "-s", f"{image.width}x{image.height}", "-r", f"{self.fps}", "-i", "-"] + codec + [self.path],
+            stdin=subprocess.PIPE)
+
+    def write(self, index, image):
+        if image.mode not in self.PIX_FMTS:
+            image = image.convert("RGB")
+        if self._process is None:
+            self._open(image)
+        self._process.stdin.write(image.tobytes())
+
+    def close(self):
+        if self._process is not None:
+            self._process.stdin.close()
+            if self._process.wait() != 0:
+                raise RuntimeError(f"ffmpeg gagal menulis {self.path}")
+        return self.path
+
+
+def run_video(source, output, model_name=DEFAULT_MODEL_NAME, variant="transparent",
+              change_threshold=DEFAULT_CHANGE_THRESHOLD, max_reuse=DEFAULT_MAX_REUSE, fps=None,
+              queue_size=8, runtime_options=None, metrics_path=None, verbose=True):
+    """Proses video/urutan frame secara streaming: decode → mask (dengan reuse) → composite → encode.
+
+    Tahap dihubungkan queue terbatas, jadi memori tetap datar berapa pun panjang klip.
+    """
+    _, background = parse_variant(variant)
+    frames, fps = open_frame_source(source, fps)
+    is_video_output = os.path.splitext(output.lower())[1] in VIDEO_FORMATS
+    writer = FFmpegVideoWriter(output, fps) if is_video_output else FrameSequenceWriter(output)
+    session = create_session(model_name, runtime_options)
+    propagator = TemporalMaskPropagator(session, model_name, change_threshold, max_reuse)
+    metrics = MetricsRegistry(metrics_path)
+    errors = []
+
+    def on_error(item, error):
+        errors.append(error)
+        print(f"Frame {item['index']}: GAGAL - {error}")
+
+    def mask(item):
+        item["alpha"], item["reused"] = propagator.alpha_for(item["image"], item["timer"])
+        return item
+
+    def composite(item):
+        with item["timer"].stage("composite"):
+            item["result"] = render_variant(to_rgb_array(item.pop("image")), item.pop("alpha"), background)
+        return item
+
+    def encode(item):
+        timer = item["timer"]
+        with timer.stage("encode"):
+            writer.write(item["index"], item.pop("result"))
+        metrics.record(timer.finish())
+        if verbose and item["index"] % 30 == 0:
+            print(f"Frame {item['index']}: {propagator.inferred} inference, {propagator.reused} reuse")
+
+    # Satu worker per tahap: urutan frame dan keyframe tetap terjaga
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(3)]
+    stages = [PipelineStage("mask", mask, queues[0], queues[1], on_error=on_error),
+              PipelineStage("composite", composite, queues[1], queues[2], on_error=on_error),
+              PipelineStage("encode", encode, queues[2], on_error=on_error)]
+    for stage in stages:
+        stage.start()
+
+    start_time = time.perf_counter()
+    count = 0
+    try:
+        for index, frame in enumerate(frames):
+            timer = StageTimer(f"frame_{index:06d}")
+            queues[0].put({"index": index, "image": frame, "timer": timer})
+            count += 1
+    finally:
+        queues[0].put(_STOP)
+        for stage in stages:
+            stage.join()
+        writer.close()
+        metrics.flush()
+
+    elapsed = time.perf_counter() - start_time
+    summary = {"frames": count, "inferred": propagator.inferred, "reused": propagator.reused,
+               "failed": len(errors), "elapsed": elapsed, "fps": count / elapsed if elapsed else 0.0}
+    if verbose:
+        print(f"Selesai: {count} frame, {propagator.inferred} inference, {propagator.reused} mask dipakai ulang, "
+              f"{elapsed:.2f} seconds ({summary['fps']:.1f} frame/detik)")
+    return summary
+
+
+# --- HTTP SERVICE (MICRO-BATCHING) ---
+# Model rembg dengan satu input/output gambar yang dimensi batch-nya dinamis
+BATCH_MODELS = {"u2net", "u2netp", "u2net_human_seg", "silueta", "isnet-general-use"}
+
+
+class _BatchFeed:
+    """Pengganti inner_session untuk memakai ulang predict() rembg di sekitar satu run batch.
+
+    Mode capture: run() menyimpan feed hasil normalize() lalu menghentikan
+    predict(); mode replay: run() mengembalikan output batch untuk gambar itu,
+    sehingga pre/postprocessing tetap milik session rembg.
+    """
+
+    class Captured(Exception):
+        pass
+
+    def __init__(self, inner_session, outputs=None):
+        self._inner_session = inner_session
+        self.outputs = outputs
+        self.feed = None
+
+    def __getattr__(self, name):
+        return getattr(self._inner_session, name)
+
+    def run(self, output_names, input_feed, *args, **kwargs):
+        if self.outputs is None:
+            self.feed = input_feed
+            raise self.Captured()
+        outputs, self.outputs = self.outputs, ()
+        if not outputs:
+            raise RuntimeError("predict() memanggil run() lebih dari sekali")
+        return outputs
+
+
+def _predict_with(session, image, feed):
+    """predict() session pada salinan dangkal dengan inner_session diganti feed."""
+    proxy = copy.copy(session)
+    proxy.inner_session = feed
+    mask = proxy.predict(image)[0]
+    return np.asarray(mask if mask.mode == "L" else mask.convert("L"))
+
+
+def batched_predict_alpha(session, images, model_name=DEFAULT_MODEL_NAME):
+    """Inference banyak gambar dalam satu panggilan ONNX; fallback per gambar jika tidak didukung.
+
+    Preprocessing dan postprocessing dijalankan oleh predict() session rembg
+    sendiri, jadi hasilnya identik dengan predict_alpha() per gambar.
+    """
+    if (split_model_name(model_name)[0] not in BATCH_MODELS or len(images) == 1
+            or getattr(session, "_batch_unsupported", False)):
+        return [predict_alpha(session, image) for image in images]
+
+    feeds = []
+    for image in images:
+        capture = _BatchFeed(session.inner_session)
+        try:
+            _predict_with(session, image, capture)
+        except _BatchFeed.Captured:
+            pass
+        feeds.append(capture.feed)
+    try:
+        batch_feed = {name: np.concatenate([feed[name] for feed in feeds]) for name in feeds[0]}
+        outputs = session.inner_session.run(None, batch_feed)
+        return [_predict_with(session, image, _BatchFeed(session.inner_session,
+                                                         [output[i:i + 1] for output in outputs]))
+                for i, image in enumerate(images)]
+    except Exception as e:
+        # Model dengan dimensi batch tetap (=1): ingat dan jangan coba lagi
+        print(f"Batch inference not supported by {model_name}, falling back: {e}")
+        session._batch_unsupported = True
+        return [predict_alpha(session, image) for image in images]
+
+
+class MicroBatcher:
+    """Kumpulkan request bersamaan menjadi micro-batch untuk satu session bersama.
+
+    Batch dijalankan saat mencapai max_batch_size atau max_wait_ms sejak item
+    pertama masuk, mana yang lebih dulu.
+    """
+
+    def __init__(self, session, model_name=DEFAULT_MODEL_NAME, max_batch_size=8, max_wait_ms=10):
+        self.session = session
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, image):
+        """Future berisi array alpha untuk gambar."""
+        future = Future()
+        self._queue.put((image, future))
+        return future
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
             try:
-                # Optimize save based on format
-                file_ext = os.path.splitext(save_path.lower())[1]
-                
-                if file_ext == '.jpg' or file_ext == '.jpeg':
-                    # Convert RGBA to RGB for JPEG
-                    if self.output_image_pil.mode == 'RGBA':
-                        rgb_image = Image.new('RGB', self.output_image_pil.size, (255, 255, 255))
-                        rgb_image.paste(self.output_image_pil, mask=self.output_image_pil.split()[-1])
-                        rgb_image.save(save_path, 'JPEG', quality=95, optimize=True)
-                    else:
-                        self.output_image_pil.save(save_path, 'JPEG', quality=95, optimize=True)
-                elif file_ext == '.webp':
-                    self.output_image_pil.save(save_path, 'WebP', quality=95, lossless=True)
-                else:  # PNG
-                    self.output_image_pil.save(save_path, 'PNG', optimize=True)
-                
-                messagebox.showinfo("Sukses", f"Gambar berhasil disimpan di:\n{save_path}")
-                self.status_label.config(text=f"Gambar disimpan di {os.path.basename(save_path)}")
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # Teruskan sinyal stop setelah batch ini
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            images = [image for image, _ in batch]
+            try:
+                alphas = batched_predict_alpha(self.session, images, self.model_name)
             except Exception as e:
-                messagebox.showerror("Save Error", f"Gagal menyimpan file: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), alpha in zip(batch, alphas):
+                future.set_result(alpha)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    @property
+    def average_batch_size(self):
+        return self.items / self.batches if self.batches else 0.0
+
+
+class RemovalRequestHandler(BaseHTTPRequestHandler):
+    """POST /remove?bg=<varian> (body: file gambar) -> PNG/JPEG; GET /health; GET /metrics.
+
+    Varian: transparent, warna, atau bg=<nama file> di --background-dir server.
+    """
+
+    server_version = "RemoveBgHTTP/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
 
-    def display_image(self, label, image_source):
-        """Optimized image display dengan caching."""
+    def _send_json(self, status, data):
+        self._send(status, json.dumps(data).encode("utf-8"), "application/json")
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/health":
+            batcher = self.server.batcher
+            self._send_json(200, {"status": "ok", "model": batcher.model_name, "batches": batcher.batches,
+                                  "average_batch_size": round(batcher.average_batch_size, 2)})
+        elif path == "/metrics":
+            self._send(200, self.server.metrics.to_prometheus().encode("utf-8"), "text/plain; version=0.0.4")
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/remove":
+            self._send_json(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0:
+            self._send_json(400, {"error": "body kosong"})
+            return
+        if length > MAX_FILE_SIZE_MB * 1024 * 1024:
+            self._send_json(413, {"error": f"maksimal {MAX_FILE_SIZE_MB}MB"})
+            return
         try:
-            # Generate cache key
-            if isinstance(image_source, str):
-                cache_key = f"file_{image_source}_{os.path.getmtime(image_source)}"
-                if cache_key in self._image_cache:
-                    img = self._image_cache[cache_key]
-                else:
-                    img = Image.open(image_source)
-                    self._image_cache[cache_key] = img
-            else:
-                img = image_source.copy()
+            variant = self.server.parse_variant(parse_qs(url.query).get("bg", ["transparent"])[0])
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
 
-            # Get label dimensions
-            label_width = label.winfo_width() or 400
-            label_height = label.winfo_height() or 400
-            
-            # Create thumbnail dengan high-quality resampling
-            display_img = img.copy()
-            display_img.thumbnail((label_width - 20, label_height - 20), Image.Resampling.LANCZOS)
-            
-            # Convert to PhotoImage
-            photo_img = ImageTk.PhotoImage(display_img)
-            label.config(image=photo_img, text="")
-            label.image = photo_img  # Keep reference
-            
+        try:
+            input_bytes = self.rfile.read(length)
+            body, content_type, record = self.server.process(input_bytes, variant)
+        except UnidentifiedImageError:
+            self._send_json(400, {"error": "body bukan gambar yang didukung"})
+            return
         except Exception as e:
-            label.config(image='', text=f"Gagal memuat pratinjau:\n{e}")
+            self._send_json(500, {"error": f"Gagal memproses gambar: {e}"})
+            return
+        self._send(200, body, content_type, {"X-Processing-Time": f"{record['total']:.3f}"})
 
-    def toggle_controls(self, processing: bool, has_result: bool = False):
-        """Optimized control state management."""
-        if processing:
-            # Disable all buttons
-            for btn in [self.btn_select, self.btn_save, self.btn_reset]:
-                btn.config(state="disabled")
-            
-            # Show progress
-            self.progress_bar.pack(side=RIGHT, padx=(10, 0))
-            self.progress_bar.start(10)  # Faster animation
+
+class RemovalHTTPServer(ThreadingHTTPServer):
+    """Server HTTP lokal: decode/encode di thread request, inference di MicroBatcher."""
+
+    daemon_threads = True
+
+    def __init__(self, address, batcher, cache=None, metrics=None, verbose=False, background_dir=None):
+        super().__init__(address, RemovalRequestHandler)
+        self.batcher = batcher
+        self.cache = cache
+        self.metrics = metrics or MetricsRegistry()
+        self.verbose = verbose
+        self.background_dir = os.path.abspath(background_dir) if background_dir else None
+
+    def parse_variant(self, spec):
+        """parse_variant untuk klien HTTP: bg= hanya nama file di background_dir, bukan path bebas."""
+        if not spec.startswith("bg="):
+            return parse_variant(spec)
+        name = spec[3:]
+        if self.background_dir is None:
+            raise ValueError("latar gambar tidak diaktifkan (jalankan serve dengan --background-dir)")
+        if not name or name.startswith(".") or "/" in name or "\\" in name or os.path.splitdrive(name)[0]:
+            raise ValueError("bg= hanya menerima nama file di direktori latar server")
+        path = os.path.join(self.background_dir, name)
+        if not os.path.isfile(path):
+            raise ValueError(f"latar tidak ditemukan: {name}")
+        return parse_variant("bg=" + path)
+
+    def _alpha(self, input_bytes, image, timer):
+        """Mask via cache atau micro-batch; gambar besar memakai proxy + upsample."""
+        large = is_large_image(image)
+        options = dict(MASK_OPTIONS, proxy_side=DEFAULT_PROXY_SIDE) if large else MASK_OPTIONS
+        key = MaskCache.make_key(input_bytes, self.batcher.model_name, options) if self.cache else None
+        model_input = image
+        if large:
+            with timer.stage("proxy"):
+                model_input = load_proxy(input_bytes, DEFAULT_PROXY_SIDE)
+
+        alpha = None
+        if self.cache is not None:
+            with timer.stage("cache_lookup"):
+                alpha = self.cache.get(key)
+            if alpha is not None and alpha.shape != (model_input.height, model_input.width):
+                alpha = None
+        if alpha is None:
+            with timer.stage("inference"):
+                alpha = self.batcher.submit(model_input).result()
+            if self.cache is not None:
+                with timer.stage("cache_store"):
+                    self.cache.put(key, alpha)
+        if large:
+            with timer.stage("refine"):
+                full_alpha = np.empty((image.height, image.width), dtype=np.uint8)
+                for start, stop, _, strip_alpha in iter_adaptive_strips(image, alpha):
+                    full_alpha[start:stop] = strip_alpha
+                alpha = full_alpha
+        return alpha
+
+    def process(self, input_bytes, variant):
+        """(body, content_type, record) untuk satu request."""
+        name, background = variant
+        timer = StageTimer(name)
+        with timer.stage("decode"):
+            image = load_image(input_bytes)
+        alpha = self._alpha(input_bytes, image, timer)
+        with timer.stage("composite"):
+            result = render_variant(to_rgb_array(image), alpha, background)
+        with timer.stage("encode"):
+            buffer = io.BytesIO()
+            if result.mode == "RGBA":
+                result.save(buffer, 'PNG')
+                content_type = "image/png"
+            else:
+                result.save(buffer, 'JPEG', quality=95)
+                content_type = "image/jpeg"
+        record = timer.finish()
+        self.metrics.record(record)
+        return buffer.getvalue(), content_type, record
+
+
+def run_server(host="127.0.0.1", port=8765, model_name=DEFAULT_MODEL_NAME, max_batch_size=8, max_wait_ms=10,
+               runtime_options=None, cache_dir=DEFAULT_CACHE_DIR, cache_size_mb=DEFAULT_CACHE_SIZE_MB,
+               metrics_path=None, verbose=False, background_dir=None):
+    """Jalankan layanan HTTP lokal sampai Ctrl+C; background_dir: sumber latar untuk bg=<nama file>."""
+    session = create_session(model_name, runtime_options)
+    batcher = MicroBatcher(session, model_name, max_batch_size, max_wait_ms)
+    cache = MaskCache(cache_dir, cache_size_mb * 1024 * 1024) if cache_dir else None
+    server = RemovalHTTPServer((host, port), batcher, cache, MetricsRegistry(metrics_path), verbose, background_dir)
+    print(f"Server berjalan di http://{host}:{server.server_address[1]} "
+          f"(model {model_name}, batch maks {max_batch_size}, tunggu maks {max_wait_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+        server.metrics.flush()
+
+
+# --- BENCHMARK SUITE ---
+BENCH_SIZES_MP = (0.5, 2, 8, 24, 50)
+
+
+def generate_synthetic_image(megapixels, seed=0, aspect=1.5):
+    """Gambar sintetis deterministik: latar gradien + objek elips bertekstur + noise.
+
+    Noise membuat ukuran file JPEG mendekati foto produk asli, bukan gradien
+    polos yang terkompresi jauh lebih kecil.
+    """
+    width = max(8, int(round((megapixels * 1_000_000 * aspect) ** 0.5)))
+    height = max(8, int(round(megapixels * 1_000_000 / width)))
+    rng = np.random.default_rng(seed)
+
+    y, x = np.ogrid[0:height, 0:width]
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+    pixels[...] = np.linspace(40, 200, width).astype(np.uint8)[None, :, None]
+    inside = ((x - width / 2) / (width * 0.3)) ** 2 + ((y - height / 2) / (height * 0.35)) ** 2 <= 1.0
+    pixels[inside] = rng.integers(0, 232, size=3, dtype=np.uint8)
+    pixels += rng.integers(0, 24, size=pixels.shape, dtype=np.uint8)
+    return Image.fromarray(pixels, "RGB")
+
+
+def encode_synthetic_image(image, fmt="JPEG"):
+    """Encode gambar sintetis ke bytes (seperti file yang dipilih pengguna)."""
+    buffer = io.BytesIO()
+    if fmt == "JPEG":
+        image.save(buffer, fmt, quality=95)
+    else:
+        image.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def _bench_cold_load(model_name):
+    """Dijalankan di proses baru: waktu new_session dari nol."""
+    start = time.perf_counter()
+    create_session(model_name)
+    return time.perf_counter() - start, peak_memory_mb()
+
+
+def _bench_peak_memory(model_name, megapixels, input_bytes):
+    """Dijalankan di proses baru: peak RSS untuk satu gambar ukuran tertentu."""
+    session = create_session(model_name)
+    baseline = peak_memory_mb()
+    image = load_image(input_bytes)
+    alpha = compute_mask(input_bytes, image, session, model_name)
+    encode_synthetic_image(render_variant(to_rgb_array(image), alpha, None), "PNG")
+    return {"size_mp": megapixels, "width": image.width, "height": image.height,
+            "file_mb": len(input_bytes) / (1024 * 1024),
+            "baseline_peak_mb": baseline, "peak_mb": peak_memory_mb()}
+
+
+def bench_cold_load(model_name, repeats=3):
+    """Cold session load, setiap percobaan di proses terpisah."""
+    samples = []
+    for _ in range(repeats):
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            samples.append(pool.submit(_bench_cold_load, model_name).result())
+    seconds = [item[0] for item in samples]
+    return {"repeats": repeats, "mean": float(np.mean(seconds)), "min": min(seconds),
+            "max": max(seconds), "peak_mb": max((item[1] or 0.0) for item in samples)}
+
+
+def bench_warm_latency(model_name, sizes_mp, repeats=5, seed=0):
+    """Latency satu gambar dengan session yang sudah hangat (tanpa cache mask)."""
+    session = create_session(model_name)
+    results = []
+    for megapixels in sizes_mp:
+        input_bytes = encode_synthetic_image(generate_synthetic_image(megapixels, seed))
+        metrics = MetricsRegistry()
+        for _ in range(repeats):
+            timer = StageTimer(f"{megapixels}MP")
+            with timer.stage("decode"):
+                image = load_image(input_bytes)
+            alpha = compute_mask(input_bytes, image, session, model_name, timer=timer)
+            with timer.stage("composite"):
+                output = render_variant(to_rgb_array(image), alpha, None)
+            with timer.stage("encode"):
+                encode_synthetic_image(output, "PNG")
+            metrics.record(timer.finish())
+        results.append({"size_mp": megapixels, "repeats": repeats, "stages": metrics.summary()})
+    return results
+
+
+def bench_throughput(model_name, worker_counts, images=16, megapixels=2, seed=0):
+    """Throughput batch (gambar/detik) untuk beberapa jumlah worker."""
+    results = []
+    with tempfile.TemporaryDirectory(prefix="removebg-bench-") as work_dir:
+        input_dir = os.path.join(work_dir, "input")
+        os.makedirs(input_dir)
+        for index in range(images):
+            generate_synthetic_image(megapixels, seed + index).save(
+                os.path.join(input_dir, f"bench_{index:04d}.jpg"), 'JPEG', quality=95)
+        for workers in worker_counts:
+            output_dir = os.path.join(work_dir, f"output_{workers}")
+            summary = run_batch(input_dir, output_dir, workers=workers, model_name=model_name,
+                                cache_dir=None, verbose=False, resume=False)
+            results.append({"workers": workers, "images": summary["done"], "failed": summary["failed"],
+                            "seconds": summary["elapsed"],
+                            "images_per_sec": summary["done"] / summary["elapsed"] if summary["elapsed"] else 0.0})
+    return results
+
+
+def bench_peak_memory(model_name, sizes_mp, seed=0):
+    """Peak RSS per ukuran gambar, masing-masing di proses baru agar tidak tercampur."""
+    results = []
+    for megapixels in sizes_mp:
+        # Gambar dibuat di proses induk agar generator tidak ikut terhitung
+        input_bytes = encode_synthetic_image(generate_synthetic_image(megapixels, seed))
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            results.append(pool.submit(_bench_peak_memory, model_name, megapixels, input_bytes).result())
+    return results
+
+
+def bench_export(sizes_mp, seed=0):
+    """Waktu encode dan ukuran file per format dan preset kompresi (trade-off kecepatan/ukuran)."""
+    results = []
+    for megapixels in sizes_mp:
+        image = generate_synthetic_image(megapixels, seed)
+        rgb = to_rgb_array(image)
+        alpha = predict_alpha(StubSession(), image)
+        variants = {background: render_variant(rgb, alpha, background) for background in (None, WHITE)}
+        for label, png_level, webp_method in EXPORT_PRESETS:
+            # JPEG tidak dipengaruhi preset, cukup diukur sekali
+            extensions = (".png", ".webp", ".jpg") if png_level == DEFAULT_PNG_COMPRESS_LEVEL else (".png", ".webp")
+            for extension in extensions:
+                spec = ExportSpec(f"bench{extension}", None, png_level, webp_method)
+                buffer = io.BytesIO()
+                start = time.perf_counter()
+                variants[spec.background].save(buffer, spec.format, **spec.params())
+                results.append({"size_mp": megapixels, "format": spec.format, "preset": label,
+                                "seconds": time.perf_counter() - start, "bytes": buffer.tell()})
+    return results
+
+
+def compare_benchmarks(current, baseline, tolerance=0.10):
+    """Bandingkan dengan hasil sebelumnya; kembalikan daftar regresi (lebih lambat/boros > tolerance)."""
+    regressions = []
+
+    def check(label, new, old, higher_is_better=False):
+        if not old or new is None:
+            return
+        change = (old - new) / old if higher_is_better else (new - old) / old
+        if change > tolerance:
+            regressions.append(f"{label}: {old:.4g} -> {new:.4g} ({change:+.0%})")
+
+    if "cold_load" in current and "cold_load" in baseline:
+        check("cold_load.mean", current["cold_load"]["mean"], baseline["cold_load"]["mean"])
+    old_latency = {item["size_mp"]: item for item in baseline.get("warm_latency", [])}
+    for item in current.get("warm_latency", []):
+        if item["size_mp"] in old_latency:
+            check(f"warm_latency[{item['size_mp']}MP].p50", item["stages"]["total"]["p50"],
+                  old_latency[item["size_mp"]]["stages"]["total"]["p50"])
+    old_throughput = {item["workers"]: item for item in baseline.get("throughput", [])}
+    for item in current.get("throughput", []):
+        if item["workers"] in old_throughput:
+            check(f"throughput[{item['workers']} workers]", item["images_per_sec"],
+                  old_throughput[item["workers"]]["images_per_sec"], higher_is_better=True)
+    old_memory = {item["size_mp"]: item for item in baseline.get("memory", [])}
+    for item in current.get("memory", []):
+        if item["size_mp"] in old_memory:
+            check(f"memory[{item['size_mp']}MP].peak_mb", item["peak_mb"], old_memory[item["size_mp"]]["peak_mb"])
+    old_export = {(item["size_mp"], item["format"], item["preset"]): item for item in baseline.get("export", [])}
+    for item in current.get("export", []):
+        key = (item["size_mp"], item["format"], item["preset"])
+        if key in old_export:
+            check(f"export[{item['size_mp']}MP {item['format']} {item['preset']}].seconds",
+                  item["seconds"], old_export[key]["seconds"])
+    return regressions
+
+
+def run_benchmarks(model_name=DEFAULT_MODEL_NAME, sizes_mp=BENCH_SIZES_MP, worker_counts=None,
+                   repeats=5, images=16, seed=0, suites=("cold", "warm", "throughput", "memory")):
+    """Jalankan suite benchmark; hasil berupa dict yang bisa di-dump sebagai JSON."""
+    cpu_count = os.cpu_count() or 1
+    if worker_counts is None:
+        worker_counts = sorted({1, max(1, cpu_count // 2), cpu_count})
+    results = {"meta": {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0], "platform": sys.platform, "cpu_count": cpu_count,
+        "model": model_name, "seed": seed, "sizes_mp": list(sizes_mp),
+    }}
+    if "cold" in suites:
+        print("Benchmark: cold session load...")
+        results["cold_load"] = bench_cold_load(model_name)
+    if "warm" in suites:
+        print("Benchmark: warm single-image latency...")
+        results["warm_latency"] = bench_warm_latency(model_name, sizes_mp, repeats, seed)
+    if "throughput" in suites:
+        print("Benchmark: batch throughput...")
+        results["throughput"] = bench_throughput(model_name, worker_counts, images, seed=seed)
+    if "memory" in suites:
+        print("Benchmark: peak memory per ukuran gambar...")
+        results["memory"] = bench_peak_memory(model_name, sizes_mp, seed)
+    if "export" in suites:
+        print("Benchmark: encode export per format...")
+        results["export"] = bench_export(sizes_mp, seed)
+    return results
+
+
+# --- MODEL COMPARISON (QUANTIZED VARIANTS) ---
+def mask_quality(reference, candidate, threshold=128):
+    """IoU (mask biner pada threshold) dan MAE (skala 0-1) mask kandidat terhadap referensi."""
+    reference_fg = reference >= threshold
+    candidate_fg = candidate >= threshold
+    union = np.logical_or(reference_fg, candidate_fg).sum()
+    iou = float(np.logical_and(reference_fg, candidate_fg).sum() / union) if union else 1.0
+    mae = float(np.abs(reference.astype(np.int16) - candidate).mean() / 255)
+    return iou, mae
+
+
+def _compare_model(model_name, paths, work_dir, is_reference, runtime_options):
+    """Dijalankan di proses baru: load session, mask setiap gambar, skor terhadap mask referensi.
+
+    Mask referensi disimpan/dibaca sebagai .npy di work_dir agar memori tetap datar.
+    """
+    start = time.perf_counter()
+    session = create_session(model_name, runtime_options)
+    load_seconds = time.perf_counter() - start
+    latencies, ious, maes = [], [], []
+    for index, path in enumerate(paths):
+        with open(path, 'rb') as f:
+            image = load_image(f.read())
+        if index == 0:
+            predict_alpha(session, image)  # Warm-up: alokasi arena ONNX tidak ikut latency
+        start = time.perf_counter()
+        alpha = predict_alpha(session, image)
+        latencies.append(time.perf_counter() - start)
+        mask_path = os.path.join(work_dir, f"{index}.npy")
+        if is_reference:
+            np.save(mask_path, alpha)
         else:
-            # Stop progress
-            self.progress_bar.stop()
-            self.progress_bar.pack_forget()
-            
-            # Enable appropriate buttons
-            self.btn_select.config(state="normal")
-            self.btn_reset.config(state="normal")
-            
-            if has_result:
-                self.btn_save.config(state="normal")
+            iou, mae = mask_quality(np.load(mask_path), alpha)
+            ious.append(iou)
+            maes.append(mae)
+    base, precision = split_model_name(model_name)
+    try:
+        file_mb = 0.0 if base == STUB_MODEL_NAME else os.path.getsize(model_path(model_name)) / (1024 * 1024)
+    except OSError:
+        file_mb = None
+    return {"model": model_name, "precision": precision, "images": len(paths), "file_mb": file_mb,
+            "load_seconds": load_seconds, "latency_p50": float(np.percentile(latencies, 50)),
+            "latency_mean": float(np.mean(latencies)), "peak_mb": peak_memory_mb(),
+            "iou_mean": float(np.mean(ious)) if ious else 1.0, "iou_min": min(ious) if ious else 1.0,
+            "mae_mean": float(np.mean(maes)) if maes else 0.0, "mae_max": max(maes) if maes else 0.0}
 
-    def reset_app(self):
-        """Optimized app reset."""
-        self.reset_app_state()
-        
-        # Reset UI elements
-        self.original_label.config(image='', text="Klik 'Pilih Gambar'\nuntuk memulai\n\n🖼️")
-        self.original_label.image = None
-        self.result_label.config(image='', text="Hasil akan muncul di sini\nsetelah diproses\n\n🤖")
-        self.result_label.image = None
-        self.status_label.config(text="🚀 Selamat datang! Pilih gambar untuk memulai.")
-        
-        # Reset controls
-        self.toggle_controls(processing=False, has_result=False)
-        
-        # Clear image cache
-        self._image_cache.clear()
 
-    def reset_app_state(self):
-        """Clean internal app state."""
-        self.input_path = None
-        self.output_image_pil = None
-        self.btn_save.config(state="disabled")
+def choose_model(results, max_mae=DEFAULT_COMPARE_MAX_MAE, min_iou=DEFAULT_COMPARE_MIN_IOU):
+    """Model dengan latency p50 terendah yang memenuhi batas kualitas (MAE rata-rata, IoU terburuk).
 
+    Batas None dilewati, tetapi jika keduanya None tidak ada rekomendasi.
+    """
+    if max_mae is None and min_iou is None:
+        return None
+    passing = [item for item in results if "error" not in item
+               and (max_mae is None or item["mae_mean"] <= max_mae)
+               and (min_iou is None or item["iou_min"] >= min_iou)]
+    return min(passing, key=lambda item: item["latency_p50"])["model"] if passing else None
+
+
+def compare_models(reference, models, baseline=DEFAULT_MODEL_NAME, runtime_options=None,
+                   max_mae=DEFAULT_COMPARE_MAX_MAE, min_iou=DEFAULT_COMPARE_MIN_IOU):
+    """Bandingkan varian model (mis. fp16/int8) dengan model baseline pada set gambar lokal.
+
+    Setiap model berjalan di proses terpisah agar load time dan peak RSS tidak tercampur.
+    """
+    paths = collect_input_files(reference)
+    if not paths:
+        raise ValueError(f"Tidak ada gambar referensi di: {reference}")
+    results = []
+    with tempfile.TemporaryDirectory(prefix="removebg-compare-") as work_dir:
+        for model_name in [baseline] + [name for name in models if name != baseline]:
+            print(f"Membandingkan {model_name} ({len(paths)} gambar)...")
+            try:
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    results.append(pool.submit(_compare_model, model_name, paths, work_dir,
+                                               model_name == baseline, runtime_options).result())
+            except Exception as e:
+                if model_name == baseline:
+                    raise
+                print(f"{model_name}: GAGAL - {e}")
+                results.append({"model": model_name, "error": str(e)})
+    return {"meta": {"timestamp": datetime.now().isoformat(timespec="seconds"), "reference": reference,
+                     "images": len(paths), "baseline": baseline, "max_mae": max_mae, "min_iou": min_iou},
+            "models": results, "recommended": choose_model(results, max_mae, min_iou)}
 
-# --- OPTIMIZED APPLICATION ENTRY POINT ---
-if __name__ == "__main__":
-    # Use threading untuk license validation agar tidak blocking
-    def validate_license_async():
-        temp_root = tk.Tk()
-        temp_root.withdraw()
-        
-        license_manager = LicenseManager(temp_root, app_identifier="RGB")
-        return license_manager.validate(), temp_root
 
-    # Validate license
+def print_model_comparison(comparison):
+    print(f"{'Model':<28} {'File MB':>8} {'Load s':>7} {'p50 s':>7} {'Peak MB':>8} {'IoU min':>8} {'MAE':>7}")
+    for item in comparison["models"]:
+        if "error" in item:
+            print(f"{item['model']:<28} GAGAL - {item['error']}")
+            continue
+        file_mb = "-" if item["file_mb"] is None else f"{item['file_mb']:.1f}"
+        peak_mb = "-" if item["peak_mb"] is None else f"{item['peak_mb']:.0f}"
+        print(f"{item['model']:<28} {file_mb:>8} {item['load_seconds']:>7.2f} {item['latency_p50']:>7.3f} "
+              f"{peak_mb:>8} {item['iou_min']:>8.4f} {item['mae_mean']:>7.4f}")
+    print(f"Rekomendasi: {comparison['recommended'] or 'tidak ada model yang memenuhi batas kualitas'}")
+
+
+def add_runtime_arguments(parser):
+    """Argumen knob ONNX Runtime (dipakai bersama beberapa subcommand)."""
+    group = parser.add_argument_group("ONNX Runtime")
+    group.add_argument("--intra-op-threads", type=int, default=None,
+                       help="Thread intra-op per session (default: core CPU / jumlah worker)")
+    group.add_argument("--inter-op-threads", type=int, default=None, help="Thread inter-op per session")
+    group.add_argument("--graph-opt", default="all", choices=list(RuntimeOptions.GRAPH_OPTIMIZATION_LEVELS),
+                       help="Level optimisasi graph")
+    group.add_argument("--execution-mode", default="sequential", choices=list(RuntimeOptions.EXECUTION_MODES))
+
+
+def runtime_options_from_args(args, workers=None):
+    """RuntimeOptions dari argumen CLI; None berarti pakai pembagian thread otomatis."""
+    if (args.intra_op_threads is None and args.inter_op_threads is None
+            and args.graph_opt == "all" and args.execution_mode == "sequential"):
+        return RuntimeOptions.for_workers(workers) if workers else None
+    kwargs = {"graph_optimization": args.graph_opt, "execution_mode": args.execution_mode}
+    if args.intra_op_threads is not None:
+        kwargs["intra_op_threads"] = args.intra_op_threads
+    if args.inter_op_threads is not None:
+        kwargs["inter_op_threads"] = args.inter_op_threads
+    return RuntimeOptions.for_workers(workers or args.workers or os.cpu_count() or 1, **kwargs)
+
+
+def parse_args(argv=None):
+    """Argumen command line; tanpa subcommand aplikasi berjalan dalam mode GUI."""
+    parser = argparse.ArgumentParser(description="AI Background Remover Pro")
+    parser.add_argument("--metrics", default=None, metavar="FILE",
+                        help="Mode GUI: export metrics startup dan proses (*.prom atau JSON-lines)")
+    parser.add_argument("-m", "--model", default=DEFAULT_MODEL_NAME, choices=MODEL_CHOICES,
+                        help="Mode GUI: model awal, termasuk varian terkuantisasi (mis. isnet-general-use:int8)")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch_parser = subparsers.add_parser("batch", help="Proses banyak gambar tanpa GUI")
+    batch_parser.add_argument("source", help="Direktori atau pola glob, mis. 'foto/*.jpg'")
+    batch_parser.add_argument("-o", "--output", default="output", help="Direktori hasil")
+    batch_parser.add_argument("-w", "--workers", type=int, default=None,
+                              help="Jumlah worker process (default: jumlah core CPU)")
+    batch_parser.add_argument("-m", "--model", default=DEFAULT_MODEL_NAME, help="Nama model rembg")
+    batch_parser.add_argument("-v", "--variants", nargs="+", default=["transparent"],
+                              help="Varian output: transparent, white, '#f5f5f5', bg=latar.jpg")
+    batch_parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Direktori cache mask")
+    batch_parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_CACHE_SIZE_MB,
+                              help="Batas ukuran cache mask (MB)")
+    batch_parser.add_argument("--no-cache", action="store_true", help="Nonaktifkan cache mask")
+    batch_parser.add_argument("--metrics", default=None, metavar="FILE",
+                              help="Export metrics: *.prom untuk Prometheus text, selain itu JSON-lines")
+    batch_parser.add_argument("--large-image-mp", type=float, default=LARGE_IMAGE_MP,
+                              help="Gambar di atas ukuran ini (megapixel) memakai inference proxy + strip")
+    batch_parser.add_argument("--proxy-side", type=int, default=DEFAULT_PROXY_SIDE,
+                              help="Sisi terpanjang proxy untuk segmentasi gambar besar")
+    batch_parser.add_argument("--tile-rows", type=int, default=DEFAULT_TILE_ROWS,
+                              help="Tinggi strip komposit untuk gambar besar")
+    batch_parser.add_argument("--matting", choices=MATTING_CHOICES, default="off",
+                              help="Alpha matting di band tepi (rambut/bulu); kualitas lebih tinggi lebih lambat")
+    batch_parser.add_argument("--dedup", action="store_true",
+                              help="Pakai ulang mask untuk near-duplicate (resize/re-encode) berdasarkan pHash")
+    batch_parser.add_argument("--dedup-threshold", type=int, default=DEFAULT_DEDUP_THRESHOLD,
+                              help="Jarak Hamming pHash maksimal untuk dianggap duplikat")
+    batch_parser.add_argument("--memory-budget-mb", type=float, default=None,
+                              help="Budget RAM untuk pemrosesan paralel (default: "
+                                   f"{DEFAULT_MEMORY_BUDGET_FRACTION * 100:.0f}%% RAM fisik, 0 = tanpa batas)")
+    batch_parser.add_argument("--journal", default=None, metavar="FILE",
+                              help=f"Journal progres job (default: <output>/{BatchJournal.FILE_NAME})")
+    batch_parser.add_argument("--no-resume", action="store_true",
+                              help="Abaikan journal lama dan proses ulang semua file")
+    add_runtime_arguments(batch_parser)
+
+    watch_parser = subparsers.add_parser("watch", help="Pantau folder dan proses gambar baru secara otomatis")
+    watch_parser.add_argument("input_dir", help="Direktori hot folder")
+    watch_parser.add_argument("-o", "--output", default="output", help="Direktori hasil")
+    watch_parser.add_argument("-m", "--model", default=DEFAULT_MODEL_NAME, help="Nama model rembg")
+    watch_parser.add_argument("-v", "--variants", nargs="+", default=["transparent"],
+                              help="Varian output: transparent, warna (white, #ff0000), atau bg=PATH")
+    watch_parser.add_argument("--poll-interval", type=float, default=1.0, help="Jeda antar scan (detik)")
+    watch_parser.add_argument("--queue-size", type=int, default=4,
+                              help="Kapasitas queue antar tahap (backpressure)")
+    watch_parser.add_argument("--encode-workers", type=int, default=2, help="Jumlah thread encode")
+    watch_parser.add_argument("--memory-budget-mb", type=float, default=None,
+                              help="Budget RAM untuk gambar di dalam pipeline (default: sebagian RAM fisik)")
+    watch_parser.add_argument("--once", action="store_true", help="Proses isi folder saat ini lalu berhenti")
+    watch_parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Direktori cache mask")
+    watch_parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_CACHE_SIZE_MB)
+    watch_parser.add_argument("--no-cache", action="store_true", help="Nonaktifkan cache mask")
+    watch_parser.add_argument("--metrics", default=None, metavar="FILE",
+                              help="Export metrics per gambar (JSON-lines) atau saat berhenti (*.prom)")
+    add_runtime_arguments(watch_parser)
+
+    video_parser = subparsers.add_parser("video", help="Proses video atau urutan frame dengan reuse mask")
+    video_parser.add_argument("source", help="File video (butuh ffmpeg), GIF animasi, direktori atau glob frame")
+    video_parser.add_argument("-o", "--output", default="output_frames",
+                              help="Direktori frame, atau file .webm/.mov (dengan alpha) / .mp4")
+    video_parser.add_argument("-m", "--model", default=DEFAULT_MODEL_NAME, help="Nama model rembg")
+    video_parser.add_argument("--variant", default="transparent",
+                              help="transparent, warna (white, #ff0000), atau bg=PATH")
+    video_parser.add_argument("--change-threshold", type=float, default=DEFAULT_CHANGE_THRESHOLD,
+                              help="Selisih antar frame (0-1) di atas nilai ini memicu inference ulang")
+    video_parser.add_argument("--max-reuse", type=int, default=DEFAULT_MAX_REUSE,
+                              help="Maksimal frame berturut-turut yang memakai ulang mask (0 = selalu inference)")
+    video_parser.add_argument("--fps", type=float, default=None, help="FPS output (default: dari sumber atau 25)")
+    video_parser.add_argument("--queue-size", type=int, default=8, help="Kapasitas queue antar tahap")
+    video_parser.add_argument("--metrics", default=None, metavar="FILE",
+                              help="Export metrics per frame (JSON-lines) atau ringkasan (*.prom)")
+    add_runtime_arguments(video_parser)
+
+    serve_parser = subparsers.add_parser("serve", help="Layanan HTTP lokal dengan micro-batching")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("-m", "--model", default=DEFAULT_MODEL_NAME, help="Nama model rembg")
+    serve_parser.add_argument("--max-batch-size", type=int, default=8, help="Jumlah gambar maksimal per batch")
+    serve_parser.add_argument("--max-wait-ms", type=float, default=10,
+                              help="Waktu tunggu maksimal untuk mengisi batch (ms)")
+    serve_parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Direktori cache mask")
+    serve_parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_CACHE_SIZE_MB)
+    serve_parser.add_argument("--no-cache", action="store_true", help="Nonaktifkan cache mask")
+    serve_parser.add_argument("--metrics", default=None, metavar="FILE",
+                              help="Export metrics saat berhenti (*.prom) atau per request (JSON-lines)")
+    serve_parser.add_argument("--verbose", action="store_true", help="Log setiap request")
+    serve_parser.add_argument("--background-dir", default=None,
+                              help="Direktori gambar latar untuk ?bg=bg=<nama file> (default: nonaktif)")
+    add_runtime_arguments(serve_parser)
+
+    bench_parser = subparsers.add_parser("bench", help="Benchmark pipeline (hasil JSON)")
+    bench_parser.add_argument("-o", "--output", default="bench.json", help="File hasil JSON")
+    bench_parser.add_argument("-m", "--model", default=DEFAULT_MODEL_NAME,
+                              help=f"Nama model rembg, atau '{STUB_MODEL_NAME}' untuk offline")
+    bench_parser.add_argument("--suites", nargs="+", default=["cold", "warm", "throughput", "memory"],
+                              choices=["cold", "warm", "throughput", "memory", "export"])
+    bench_parser.add_argument("--sizes", nargs="+", type=float, default=list(BENCH_SIZES_MP),
+                              help="Ukuran gambar sintetis (megapixel)")
+    bench_parser.add_argument("--workers", nargs="+", type=int, default=None,
+                              help="Jumlah worker yang diuji untuk throughput")
+    bench_parser.add_argument("--repeats", type=int, default=5)
+    bench_parser.add_argument("--images", type=int, default=16, help="Jumlah gambar untuk throughput")
+    bench_parser.add_argument("--seed", type=int, default=0)
+    bench_parser.add_argument("--compare", default=None, metavar="BASELINE_JSON",
+                              help="Bandingkan dengan hasil sebelumnya; exit 1 jika ada regresi")
+    bench_parser.add_argument("--tolerance", type=float, default=0.10)
+
+    cluster_parser = subparsers.add_parser("cluster", help="Batch terdistribusi lewat direktori kerja bersama")
+    cluster_subparsers = cluster_parser.add_subparsers(dest="cluster_command", required=True)
+    init_parser = cluster_subparsers.add_parser("init", help="Bagi input menjadi shard")
+    init_parser.add_argument("source", help="Direktori atau pola glob di filesystem bersama")
+    init_parser.add_argument("-o", "--output", default="output", help="Direktori hasil bersama")
+    init_parser.add_argument("--work-dir", required=True, help="Direktori kerja bersama (shard, lease, hasil)")
+    init_parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="Jumlah gambar per shard")
+    init_parser.add_argument("-m", "--model", default=DEFAULT_MODEL_NAME, help="Nama model rembg")
+    init_parser.add_argument("-v", "--variants", nargs="+", default=["transparent"],
+                             help="Varian output: transparent, white, '#f5f5f5', bg=latar.jpg")
+    init_parser.add_argument("--matting", choices=MATTING_CHOICES, default="off")
+    init_parser.add_argument("--dedup", action="store_true", help="Dedup pHash di dalam setiap shard")
+    init_parser.add_argument("--dedup-threshold", type=int, default=DEFAULT_DEDUP_THRESHOLD)
+    work_parser = cluster_subparsers.add_parser("work", help="Klaim dan proses shard sampai job selesai")
+    work_parser.add_argument("--work-dir", required=True, help="Direktori kerja bersama")
+    work_parser.add_argument("-w", "--workers", type=int, default=None,
+                             help="Jumlah worker process di host ini (default: jumlah core CPU)")
+    work_parser.add_argument("--lease-ttl", type=float, default=DEFAULT_LEASE_TTL,
+                             help="Masa berlaku lease (detik); lease worker mati diambil alih setelahnya")
+    work_parser.add_argument("--poll-interval", type=float, default=5.0,
+                             help="Jeda saat semua shard sisa sedang di-lease host lain")
+    work_parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Direktori cache mask lokal")
+    work_parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_CACHE_SIZE_MB)
+    work_parser.add_argument("--no-cache", action="store_true", help="Nonaktifkan cache mask")
+    work_parser.add_argument("--memory-budget-mb", type=float, default=None,
+                             help="Budget RAM host ini (default: sebagian RAM fisik, 0 = tanpa batas)")
+    add_runtime_arguments(work_parser)
+    merge_parser = cluster_subparsers.add_parser("merge", help="Gabungkan hasil dan metrics semua shard")
+    merge_parser.add_argument("--work-dir", required=True, help="Direktori kerja bersama")
+    merge_parser.add_argument("--metrics", default=None, metavar="FILE",
+                              help="Export metrics gabungan: *.prom atau JSON-lines")
+
+    compare_parser = subparsers.add_parser("compare", help="Bandingkan varian model (fp16/int8) vs model penuh")
+    compare_parser.add_argument("reference", help="Direktori atau glob gambar referensi lokal")
+    compare_parser.add_argument("-m", "--models", nargs="+",
+                                default=[f"{DEFAULT_MODEL_NAME}:{precision}" for precision in MODEL_PRECISIONS[1:]],
+                                help="Model yang diuji, mis. isnet-general-use:int8 u2netp")
+    compare_parser.add_argument("--baseline", default=DEFAULT_MODEL_NAME, help="Model referensi (presisi penuh)")
+    compare_parser.add_argument("-o", "--output", default="compare.json", help="File hasil JSON")
+    compare_parser.add_argument("--max-mae", type=float, default=DEFAULT_COMPARE_MAX_MAE,
+                                help="Batas MAE rata-rata (0-1) untuk rekomendasi")
+    compare_parser.add_argument("--min-iou", type=float, default=DEFAULT_COMPARE_MIN_IOU,
+                                help="Batas IoU terburuk untuk rekomendasi")
+    add_runtime_arguments(compare_parser)
+    return parser.parse_args(argv)
+
+
+def run_gui(metrics_path=None, model_name=DEFAULT_MODEL_NAME):
+    """Tampilkan jendela segera; lisensi dan model disiapkan secara paralel."""
+    startup = StartupOrchestrator(MetricsRegistry(metrics_path), model_name)
+    # Model mulai dimuat sebelum jendela dibuat, bersamaan dengan validasi lisensi
+    startup.start_model_loading()
+    import_gui_modules()
+
     try:
-        is_valid, temp_root = validate_license_async()
+        # Create optimized main application
+        root = ttk.Window(themename="darkly")
         
-        if is_valid:
-            temp_root.destroy()
-            
-            # Create optimized main application
-            root = ttk.Window(themename="darkly")
-            
-            # Set window properties untuk performance
-            root.resizable(True, True)
-            
-            # Initialize app
-            app = BackgroundRemoverApp(root)
-            
-            # Start main loop
-            root.mainloop()
-        else:
-            temp_root.destroy()
+        # Set window properties untuk performance
+        root.resizable(True, True)
+        
+        # Initialize app
+        app = BackgroundRemoverApp(root, startup=startup)
+
+        # Validasi lisensi setelah jendela tampil
+        license_manager = LicenseManager(root, app_identifier="RGB")
+        root.after(0, lambda: app.check_license(license_manager))
+        
+        # Start main loop
+        root.mainloop()
+        app.scheduler.shutdown()
+        app.export_engine.shutdown()
+        if startup.state["license"] == "failed":
             sys.exit()
             
     except Exception as e:
         print(f"Application startup error: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+
+
+# --- OPTIMIZED APPLICATION ENTRY POINT ---
+if __name__ == "__main__":
+    # Diperlukan agar worker process berjalan di build PyInstaller (Windows)
+    multiprocessing.freeze_support()
+
+    args = parse_args()
+    if args.command == "batch":
+        summary = run_batch(args.source, args.output, workers=args.workers, model_name=args.model,
+                            cache_dir=None if args.no_cache else args.cache_dir,
+                            cache_size_mb=args.cache_size_mb, variants=args.variants,
+                            metrics_path=args.metrics, runtime_options=runtime_options_from_args(args),
+                            large_image={"threshold_mp": args.large_image_mp, "proxy_side": args.proxy_side,
+                                         "tile_rows": args.tile_rows},
+                            journal_path=args.journal, resume=not args.no_resume, matting=args.matting,
+                            dedup_threshold=args.dedup_threshold if args.dedup else None,
+                            memory_budget_mb=args.memory_budget_mb)
+        sys.exit(1 if summary["failed"] else 0)
+    if args.command == "watch":
+        cache = None if args.no_cache else MaskCache(args.cache_dir, args.cache_size_mb * 1024 * 1024)
+        watcher = HotFolderWatcher(args.input_dir, args.output, args.model, args.variants, cache=cache,
+                                   runtime_options=runtime_options_from_args(args, workers=1),
+                                   poll_interval=args.poll_interval, queue_size=args.queue_size,
+                                   encode_workers=args.encode_workers, metrics=MetricsRegistry(args.metrics),
+                                   memory_budget_mb=args.memory_budget_mb)
+        watcher.run(once=args.once)
+        sys.exit(1 if watcher.failed else 0)
+    if args.command == "video":
+        summary = run_video(args.source, args.output, args.model, args.variant, args.change_threshold,
+                            args.max_reuse, args.fps, args.queue_size,
+                            runtime_options=runtime_options_from_args(args, workers=1), metrics_path=args.metrics)
+        sys.exit(1 if summary["failed"] else 0)
+    if args.command == "serve":
+        run_server(args.host, args.port, args.model, args.max_batch_size, args.max_wait_ms,
+                   runtime_options=runtime_options_from_args(args, workers=1),
+                   cache_dir=None if args.no_cache else args.cache_dir, cache_size_mb=args.cache_size_mb,
+                   metrics_path=args.metrics, verbose=args.verbose, background_dir=args.background_dir)
+        sys.exit(0)
+    if args.command == "bench":
+        results = run_benchmarks(args.model, args.sizes, args.workers, args.repeats, args.images,
+                                 args.seed, args.suites)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Hasil benchmark disimpan di {args.output}")
+        if args.compare:
+            with open(args.compare, 'r', encoding='utf-8') as f:
+                regressions = compare_benchmarks(results, json.load(f), args.tolerance)
+            for line in regressions:
+                print(f"REGRESI {line}")
+            sys.exit(1 if regressions else 0)
+        sys.exit(0)
+
+    if args.command == "cluster":
+        if args.cluster_command == "init":
+            init_sharded_job(args.source, args.output, args.work_dir, args.shard_size, args.model, args.variants,
+                             args.matting, args.dedup_threshold if args.dedup else None)
+        elif args.cluster_command == "work":
+            run_shard_worker(args.work_dir, args.workers, args.lease_ttl, args.poll_interval,
+                             cache_dir=None if args.no_cache else args.cache_dir, cache_size_mb=args.cache_size_mb,
+                             runtime_options=runtime_options_from_args(args), memory_budget_mb=args.memory_budget_mb)
+        else:
+            merged = merge_sharded_job(args.work_dir, args.metrics)
+            sys.exit(1 if merged["missing"] or merged["failed"] else 0)
+        sys.exit(0)
+    if args.command == "compare":
+        comparison = compare_models(args.reference, args.models, args.baseline,
+                                    runtime_options_from_args(args, workers=1), args.max_mae, args.min_iou)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(comparison, f, indent=2)
+        print_model_comparison(comparison)
+        print(f"Hasil perbandingan disimpan di {args.output}")
+        sys.exit(0)
+
+    run_gui(args.metrics, args.model)
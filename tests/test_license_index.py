@@ -0,0 +1,73 @@
+"""LicenseIndex di atas LocalWorksheet: lookup, rebuild index, dan konflik aktivasi."""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+class LicenseIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.worksheet = main.LocalWorksheet(rows=[["key", "uuid", "keterangan", "timestamp"]])
+        for i in range(1, 6):
+            self.worksheet.rows.append([f"KEY-{i}", "", "", ""])
+        self.index_path = os.path.join(self.tmp.name, "license-index.json")
+        self.index = main.LicenseIndex(self.worksheet, self.index_path)
+
+    def test_lookup_reads_single_row_after_index_is_built(self):
+        self.assertEqual(self.index.fetch_row("KEY-3"), (4, ["KEY-3"]))
+        calls = self.worksheet.api_calls
+        self.assertEqual(self.index.fetch_row("KEY-5"), (6, ["KEY-5"]))
+        self.assertEqual(self.worksheet.api_calls, calls + 1)
+
+    def test_index_is_persisted_without_raw_keys(self):
+        self.index.fetch_row("KEY-1")
+        with open(self.index_path, encoding="utf-8") as f:
+            self.assertNotIn("KEY-1", f.read())
+        reloaded = main.LicenseIndex(self.worksheet, self.index_path)
+        calls = self.worksheet.api_calls
+        self.assertEqual(reloaded.fetch_row("KEY-2"), (3, ["KEY-2"]))
+        self.assertEqual(self.worksheet.api_calls, calls + 1)
+
+    def test_unknown_key_is_not_found(self):
+        self.assertEqual(self.index.fetch_row("KEY-404"), (None, []))
+
+    def test_appended_key_is_fetched_incrementally(self):
+        self.index.fetch_row("KEY-1")
+        self.worksheet.rows.append(["KEY-6", "", "", ""])
+        self.assertEqual(self.index.fetch_row("KEY-6"), (7, ["KEY-6"]))
+
+    def test_index_is_rebuilt_when_rows_shift(self):
+        self.index.fetch_row("KEY-1")
+        del self.worksheet.rows[2]  # KEY-2 dihapus, baris di bawahnya naik satu
+        self.assertEqual(self.index.fetch_row("KEY-4"), (4, ["KEY-4"]))
+        self.assertEqual(self.index.fetch_row("KEY-2"), (None, []))
+
+    def test_activate_writes_uuid_once(self):
+        values = ["uuid-a", "RGB", "2024-01-01 10:00:00"]
+        self.assertEqual(self.index.activate("KEY-1", values), "activated")
+        self.assertEqual(self.worksheet.rows[1], ["KEY-1"] + values)
+        self.assertEqual(self.index.activate("KEY-1", ["uuid-b", "RGB", "x"]), "used")
+        self.assertEqual(self.index.activate("KEY-404", values), "not_found")
+
+    def test_activation_lost_to_concurrent_writer_fails(self):
+        batch_update = self.worksheet.batch_update
+
+        def racing_batch_update(updates):
+            # Mesin lain membaca baris kosong yang sama dan menulis setelah kita
+            batch_update(updates)
+            self.worksheet.rows[1][1:4] = ["uuid-b", "RGB", "2024-01-01 10:00:01"]
+
+        self.worksheet.batch_update = racing_batch_update
+        status = self.index.activate("KEY-1", ["uuid-a", "RGB", "2024-01-01 10:00:00"])
+        self.assertEqual(status, "used")
+        self.assertEqual(self.worksheet.rows[1][1], "uuid-b")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+"""Token lisensi offline: diuji dengan LocalWorksheet, tanpa Google Sheets."""
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+class LicenseTokenTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.worksheet = main.LocalWorksheet(rows=[["key", "uuid", "keterangan", "timestamp"]])
+        self.manager = self.make_manager()
+        self.local_data = {"key": "KEY-1", "key-1": self.manager.get_machine_uuid(),
+                           "keterangan": "RGB", "timestamp": "2024-01-01 10:00:00"}
+        self.worksheet.rows.append(["KEY-1", self.local_data["key-1"], "RGB", "2024-01-01 10:00:00"])
+
+    def make_manager(self, **kwargs):
+        manager = main.LicenseManager(None, "RGB", worksheet=self.worksheet, **kwargs)
+        manager.local_license_file = os.path.join(self.tmp.name, "license.json")
+        manager.license_index_file = os.path.join(self.tmp.name, "license-index.json")
+        manager.token_secret_file = os.path.join(self.tmp.name, "secret", "license-secret")
+        return manager
+
+    def issue_token(self):
+        self.manager.refresh_token(self.local_data)
+        return self.manager.get_local_license()
+
+    def test_fresh_token_is_valid_without_network(self):
+        data = self.issue_token()
+        calls = self.worksheet.api_calls
+        self.assertTrue(self.manager.has_valid_token(data))
+        self.assertEqual(self.worksheet.api_calls, calls)
+
+    def test_expired_token_is_rejected(self):
+        data = self.issue_token()
+        expires_at = data["token"]["payload"]["expires_at"]
+        with mock.patch.object(main.time, "time", return_value=expires_at + 1):
+            self.assertFalse(self.manager.has_valid_token(data))
+
+    def test_token_longer_than_ttl_is_rejected(self):
+        data = self.issue_token()
+        payload = dict(data["token"]["payload"], expires_at=4e9)
+        secret = self.manager._installation_secret()
+        data["token"] = {"payload": payload, "signature": self.manager._sign(payload, secret)}
+        self.assertFalse(self.manager.has_valid_token(data))
+
+    def test_tampered_token_is_rejected(self):
+        data = self.issue_token()
+        data["token"]["payload"]["key"] = "KEY-2"
+        data["key"] = "KEY-2"
+        self.assertFalse(self.manager.has_valid_token(data))
+
+    def test_token_cannot_be_forged_from_source_values(self):
+        data = self.issue_token()
+        payload = dict(data["token"]["payload"])
+        data["token"] = {"payload": payload, "signature": self.manager._sign(payload, b"")}
+        self.assertFalse(self.manager.has_valid_token(data))
+
+    def test_token_from_another_installation_is_rejected(self):
+        data = self.issue_token()
+        other = self.make_manager()
+        other.token_secret_file = os.path.join(self.tmp.name, "other-secret")
+        self.assertFalse(other.has_valid_token(data))
+
+    def test_fresh_token_skips_revalidation(self):
+        self.issue_token()
+        calls = self.worksheet.api_calls
+        with mock.patch.object(self.manager, "revalidate_in_background") as revalidate:
+            self.assertTrue(self.manager.validate())
+        revalidate.assert_not_called()
+        self.assertEqual(self.worksheet.api_calls, calls)
+
+    def test_token_past_half_ttl_is_revalidated(self):
+        data = self.issue_token()
+        issued_at = data["token"]["payload"]["issued_at"]
+        later = issued_at + self.manager.token_ttl * main.LICENSE_REVALIDATION_AFTER + 1
+        with mock.patch.object(main.time, "time", return_value=later), \
+                mock.patch.object(self.manager, "revalidate_in_background") as revalidate:
+            self.assertTrue(self.manager.validate())
+        revalidate.assert_called_once()
+
+    def test_revalidation_revokes_token_when_revoked_on_server(self):
+        data = self.issue_token()
+        self.worksheet.rows[1][1] = "other-machine"
+        self.manager.revalidate_in_background(data).join()
+        self.assertNotIn("token", self.manager.get_local_license())
+
+    def test_revalidation_extends_token_when_valid(self):
+        data = self.issue_token()
+        self.manager.revalidate_in_background(data).join()
+        refreshed = self.manager.get_local_license()
+        self.assertTrue(self.manager.has_valid_token(refreshed))
+
+    def test_repeated_failed_revalidation_revokes_token(self):
+        data = self.issue_token()
+        with mock.patch.object(self.worksheet, "get", side_effect=OSError("offline")):
+            for _ in range(main.LICENSE_MAX_REVALIDATION_FAILURES - 1):
+                self.manager.revalidate_in_background(data).join()
+                self.assertIn("token", self.manager.get_local_license())
+            self.manager.revalidate_in_background(data).join()
+        self.assertNotIn("token", self.manager.get_local_license())
+
+    def test_failed_revalidation_outside_grace_window_revokes_token(self):
+        data = self.issue_token()
+        with mock.patch.object(self.worksheet, "get", side_effect=OSError("offline")):
+            self.manager.revalidate_in_background(data).join()
+            later = time.time() + main.LICENSE_REVALIDATION_GRACE_SECONDS
+            with mock.patch.object(main.time, "time", return_value=later):
+                self.manager.revalidate_in_background(data).join()
+        self.assertNotIn("token", self.manager.get_local_license())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""Inference micro-batch: hasil batch harus sama dengan predict() per gambar."""
+import os
+import sys
+import unittest
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+class FakeInput:
+    name = "input.1"
+
+
+class FakeInnerSession:
+    """Pengganti onnxruntime.InferenceSession: output bergantung pada isi setiap gambar."""
+
+    def __init__(self, max_batch=None):
+        self.max_batch = max_batch
+        self.batch_sizes = []
+
+    def get_inputs(self):
+        return [FakeInput()]
+
+    def run(self, output_names, input_feed):
+        batch = input_feed["input.1"]
+        if self.max_batch is not None and len(batch) > self.max_batch:
+            raise ValueError("dimensi batch tetap")
+        self.batch_sizes.append(len(batch))
+        return [batch[:, :1] * 2.0 + batch[:, 1:2] - batch[:, 2:3] ** 2]
+
+
+class FakeDisSession:
+    """Meniru BaseSession.normalize dan DisSession.predict rembg."""
+
+    def __init__(self, inner_session):
+        self.inner_session = inner_session
+
+    def normalize(self, img, mean, std, size):
+        im = img.convert("RGB").resize(size, Image.Resampling.LANCZOS)
+        im_ary = np.array(im)
+        im_ary = im_ary / np.max(im_ary)
+        tmp_img = np.zeros((im_ary.shape[0], im_ary.shape[1], 3))
+        for channel in range(3):
+            tmp_img[:, :, channel] = (im_ary[:, :, channel] - mean[channel]) / std[channel]
+        tmp_img = tmp_img.transpose((2, 0, 1))
+        return {self.inner_session.get_inputs()[0].name: np.expand_dims(tmp_img, 0).astype(np.float32)}
+
+    def predict(self, img, *args, **kwargs):
+        ort_outs = self.inner_session.run(
+            None, self.normalize(img, (0.485, 0.456, 0.406), (1.0, 1.0, 1.0), (64, 64)))
+        pred = ort_outs[0][:, 0, :, :]
+        ma, mi = np.max(pred), np.min(pred)
+        pred = np.squeeze((pred - mi) / (ma - mi))
+        mask = Image.fromarray((pred * 255).astype("uint8"), mode="L")
+        return [mask.resize(img.size, Image.Resampling.LANCZOS)]
+
+
+def make_images():
+    rng = np.random.default_rng(7)
+    return [Image.fromarray(rng.integers(0, 256, (h, w, 3), dtype=np.uint8), "RGB")
+            for h, w in ((90, 120), (64, 64), (150, 80))]
+
+
+class BatchedPredictTest(unittest.TestCase):
+    def test_batched_result_matches_per_image_predict(self):
+        inner = FakeInnerSession()
+        session = FakeDisSession(inner)
+        images = make_images()
+        expected = [main.predict_alpha(session, image) for image in images]
+        inner.batch_sizes.clear()
+        alphas = main.batched_predict_alpha(session, images, "isnet-general-use")
+        self.assertEqual(inner.batch_sizes, [len(images)])
+        for alpha, reference in zip(alphas, expected):
+            np.testing.assert_array_equal(alpha, reference)
+
+    def test_fixed_batch_model_falls_back_to_per_image(self):
+        inner = FakeInnerSession(max_batch=1)
+        session = FakeDisSession(inner)
+        images = make_images()
+        alphas = main.batched_predict_alpha(session, images, "isnet-general-use")
+        self.assertTrue(session._batch_unsupported)
+        for alpha, image in zip(alphas, images):
+            np.testing.assert_array_equal(alpha, main.predict_alpha(session, image))
+
+    def test_session_is_not_modified(self):
+        inner = FakeInnerSession()
+        session = FakeDisSession(inner)
+        main.batched_predict_alpha(session, make_images(), "u2net")
+        self.assertIs(session.inner_session, inner)
+
+
+if __name__ == "__main__":
+    unittest.main()
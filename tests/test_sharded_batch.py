@@ -0,0 +1,137 @@
+"""Protokol batch terdistribusi: lease shard, ambil alih, berhenti saat lease hilang, dan merge."""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+RUN_OPTIONS = {"workers": 1, "cache_dir": None, "memory_budget_mb": 0, "verbose": False}
+
+
+class ShardTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.work_dir = os.path.join(self.tmp.name, "work")
+        self.output_dir = os.path.join(self.tmp.name, "output")
+        input_dir = os.path.join(self.tmp.name, "input")
+        os.makedirs(input_dir)
+        rng = np.random.default_rng(3)
+        self.files = []
+        for index in range(5):
+            path = os.path.join(input_dir, f"p{index}.png")
+            Image.fromarray(rng.integers(0, 256, (24, 32, 3), dtype=np.uint8), "RGB").save(path)
+            self.files.append(path)
+
+    def init_job(self, files, shard_size=3):
+        with mock.patch("builtins.print"):
+            return main.init_sharded_job(files, self.output_dir, self.work_dir, shard_size=shard_size,
+                                         model_name="stub")
+
+    def write_lease(self, shard_id, generation, owner, expires_at):
+        path = os.path.join(self.work_dir, "leases", f"{shard_id}.{generation}.lease")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"owner": owner, "shard": shard_id, "expires_at": expires_at}, f)
+
+    def read_result(self, shard_id):
+        return main.read_json(os.path.join(self.work_dir, "results", f"{shard_id}.json"))
+
+
+class ShardLeaseTest(ShardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.init_job(self.files)
+
+    def test_only_one_of_two_competing_leases_wins(self):
+        first = main.ShardLease(self.work_dir, 0, "host-a")
+        second = main.ShardLease(self.work_dir, 0, "host-b")
+        self.assertTrue(first.try_claim(0))
+        self.assertFalse(second.try_claim(0))
+        self.assertFalse(second.try_claim(1))  # Lease generasi 1 masih berlaku
+        self.assertEqual(main.ShardLease.generations(os.path.join(self.work_dir, "leases")), {0: 1})
+
+    def test_claim_next_shard_skips_leased_and_finished_shards(self):
+        self.write_lease(0, 1, "host-a", time.time() + 60)
+        main.write_json_atomic(os.path.join(self.work_dir, "results", "1.json"), {"shard": 1})
+        lease, remaining = main.claim_next_shard(self.work_dir, 2, "host-b")
+        self.assertIsNone(lease)
+        self.assertEqual(remaining, 1)
+
+    def test_expired_lease_is_taken_over_and_old_owner_loses_it(self):
+        old = main.ShardLease(self.work_dir, 0, "host-a", ttl=60)
+        self.assertTrue(old.try_claim(0))
+        self.write_lease(0, 1, "host-a", time.time() - 1)  # Worker lama berhenti memperpanjang
+        with mock.patch("builtins.print"):
+            lease, _ = main.claim_next_shard(self.work_dir, 1, "host-b")
+        self.assertEqual((lease.shard_id, lease.generation), (0, 2))
+        self.assertFalse(old.renew())
+        self.assertTrue(old.lost_event.is_set())
+        old.release()
+        self.assertTrue(os.path.exists(os.path.join(self.work_dir, "leases", "0.2.lease")))
+
+    def test_release_removes_lease_files(self):
+        lease = main.ShardLease(self.work_dir, 0, "host-a")
+        self.assertTrue(lease.try_claim(0))
+        lease.release()
+        self.assertEqual(main.ShardLease.generations(os.path.join(self.work_dir, "leases")), {})
+
+
+class ShardWorkerTest(ShardTestCase):
+    def test_lost_lease_stops_run_batch(self):
+        self.init_job(self.files)
+        lease = main.ShardLease(self.work_dir, 0, "host-a")
+        self.assertTrue(lease.try_claim(0))
+        self.write_lease(0, 2, "host-b", time.time() + 60)
+        self.assertFalse(lease.renew())
+        with mock.patch("builtins.print"):
+            summary = main.run_batch(self.files, self.output_dir, model_name="stub",
+                                     stop_event=lease.lost_event, **RUN_OPTIONS)
+        self.assertTrue(summary["stopped"])
+        self.assertEqual(summary["done"], 0)
+
+    def test_worker_that_lost_its_lease_does_not_write_result(self):
+        self.init_job(self.files, shard_size=len(self.files))
+
+        def lose_lease(lease):
+            # Worker lain mengambil alih segera setelah klaim, lalu menyelesaikan shard
+            self.write_lease(0, lease.generation + 1, "host-b", time.time() + 60)
+            lease.renew()
+            threading.Timer(0.5, main.write_json_atomic, args=(
+                os.path.join(self.work_dir, "results", "0.json"), {"shard": 0, "owner": "host-b"})).start()
+
+        with mock.patch.object(main.ShardLease, "start_heartbeat", lose_lease), mock.patch("builtins.print"):
+            processed = main.run_shard_worker(self.work_dir, poll_interval=0.1, **RUN_OPTIONS)
+        self.assertEqual(processed, 0)
+        self.assertEqual(self.read_result(0)["owner"], "host-b")
+
+    def test_merge_counts_files_finished_before_takeover(self):
+        missing = os.path.join(self.tmp.name, "input", "missing.png")
+        self.init_job(self.files + [missing])
+        shard = main.read_json(os.path.join(self.work_dir, "shards", "0.json"))
+        # Worker pertama menyelesaikan dua file shard 0 lalu mati dengan lease kedaluwarsa
+        with mock.patch("builtins.print"):
+            main.run_batch(shard[:2], self.output_dir, model_name="stub",
+                           journal_path=os.path.join(self.work_dir, "journals", "0.jsonl"), **RUN_OPTIONS)
+        self.write_lease(0, 1, "host-a", time.time() - 1)
+
+        with mock.patch("builtins.print"):
+            self.assertEqual(main.run_shard_worker(self.work_dir, poll_interval=0.1, **RUN_OPTIONS), 2)
+            merged = main.merge_sharded_job(self.work_dir)
+        self.assertEqual(self.read_result(0)["summary"]["done"], 1)
+        self.assertEqual((merged["completed"], merged["missing"]), (2, []))
+        self.assertEqual((merged["done"], merged["failed"], merged["skipped"]), (5, 1, 2))
+        self.assertEqual(list(merged["errors"]), [missing])
+
+
+if __name__ == "__main__":
+    unittest.main()